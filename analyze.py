@@ -0,0 +1,160 @@
+# Batch position analysis: positions in (notation.py), one JSON line per position out.
+#
+#     python analyze.py positions.txt --time 2 --lines 3 --workers 4 > analysis.jsonl
+#     echo "........................ O 9 9 1 1 -" | python analyze.py - --depth 6
+#
+# Input has one position per line; blank lines and lines starting with # are skipped.
+# Each position gets --time seconds and at most --depth plies, and is searched by
+# iterative deepening over its root actions (a move plus its removal, or arming a bomb):
+# while fewer than --lines actions have exact scores every action gets a full window, then
+# the rest only need to beat the worst of those, so each extra line costs little. Output:
+#     {"line": 3, "position": "...", "best": "D6-D7xA1", "score": 215, "depth": 7,
+#      "nodes": 81234, "seconds": 2.0, "lines": [{"move": "D6-D7xA1", "score": 215,
+#      "pv": ["D6-D7xA1", "F4-F6", ...]}, ...]}
+# Scores are from the side to move's point of view; a line that cannot be read gets
+# {"line": n, "position": "...", "error": "..."} instead.
+import argparse
+import json
+import os
+import sys
+import time
+
+import notation
+
+_worker_game = None
+_settings = None
+
+
+def _game():
+    global _worker_game
+    if _worker_game is None:
+        from main import NineMensMorris
+        _worker_game = NineMensMorris()
+        _worker_game.quiet = True
+        _worker_game.opening_book = None
+    return _worker_game
+
+
+def analyze(game, state, player, lines=1, time_limit=1.0, max_depth=20):
+    # Multi-line search of `state` with `player` to move; returns the output record (without "line").
+    # time_limit None searches to max_depth without a clock.
+    from main import PROVEN_SCORE
+    from parallel_search import root_actions
+    game.load_compact(state)
+    maximizing = player == 2
+    sign = 1 if maximizing else -1
+    start = time.time()
+    record = {'position': notation.format_position(state, player), 'best': None, 'score': None,
+              'depth': 0, 'nodes': 0, 'seconds': 0.0, 'lines': []}
+    if game.is_game_over():
+        record['score'] = sign * game.evaluate_board()
+        return record
+    actions = root_actions(game, maximizing)
+    if not actions:
+        record['score'] = -PROVEN_SCORE   # stuck: the side to move loses
+        return record
+    deadline = start + time_limit if time_limit is not None else None
+    game.tt.new_search()
+    best_lines = None
+    for depth in range(1, max_depth + 1):
+        # (mover's score, exact, action, pv) per action at this depth.
+        scored = []
+        completed = True
+        for action in actions:
+            exact_scores = sorted((s for s, exact, _, _ in scored if exact), reverse=True)
+            threshold = exact_scores[lines - 1] if len(exact_scores) >= lines else None
+            if threshold is None: alpha, beta = float('-inf'), float('inf')
+            elif maximizing: alpha, beta = threshold, float('inf')
+            else: alpha, beta = float('-inf'), -threshold
+            mark = len(game._journal)
+            move, remove_pos = action
+            game.make_move(move, player)
+            if remove_pos is not None: game._remove_piece(remove_pos)
+            # Depth 1 always completes so there is an answer.
+            result = game.bounded_search(depth - 1, alpha, beta, not maximizing, deadline if depth > 1 else None, ply=1)
+            record['nodes'] += game.nodes
+            pv = [action] + list(game._pv_table[1]) if result is not None else []
+            game.undo_to(mark)
+            if result is None:
+                completed = False; break
+            score = sign * result[0]
+            scored.append((score, threshold is None or score > threshold, action, pv))
+        if not completed: break
+        scored.sort(key=lambda item: (item[1], item[0]), reverse=True)
+        best_lines = scored[:lines]
+        record['depth'] = depth
+        # Next depth starts from the best actions found at this one.
+        actions = [action for _, _, action, _ in scored]
+        if len(actions) == 1 or all(abs(score) >= PROVEN_SCORE for score, _, _, _ in best_lines): break
+    record['lines'] = [{'move': notation.format_move(action), 'score': score,
+                        'pv': [notation.format_move(full_move) for full_move in pv if full_move]}
+                       for score, exact, action, pv in best_lines if exact]
+    record['best'] = record['lines'][0]['move']
+    record['score'] = record['lines'][0]['score']
+    record['seconds'] = round(time.time() - start, 3)
+    return record
+
+
+def _analyze_task(task):
+    number, text = task
+    game = _game()
+    if _settings['eval'] != 'default':
+        import evalprofile
+        game.eval_profile = evalprofile.get_profile(_settings['eval'])
+    try:
+        state, player = notation.parse_position(text)
+    except ValueError as e:
+        return {'line': number, 'position': text, 'error': str(e)}
+    record = analyze(game, state, player, _settings['lines'], _settings['time'], _settings['depth'])
+    return {'line': number, **record}
+
+
+def _init_worker(settings):
+    global _settings
+    _settings = settings
+
+
+def _positions(stream):
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if line and not line.startswith("#"): yield number, line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse positions given in notation.py notation, one per line.")
+    parser.add_argument("input", help="position file, or - for standard input")
+    parser.add_argument("-o", "--output", help="JSON lines file to write (default standard output)")
+    parser.add_argument("--time", type=float, default=1.0, help="search seconds per position (default 1)")
+    parser.add_argument("--depth", type=int, default=20, help="deepest search in plies (default 20)")
+    parser.add_argument("--lines", type=int, default=1, help="best lines to report per position (default 1)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="parallel search processes")
+    parser.add_argument("--eval", default="default", help="evaluation profile (evalprofile.py)")
+    args = parser.parse_args(argv)
+    if args.lines < 1: parser.error("--lines must be at least 1")
+    if args.time <= 0: parser.error("--time must be positive")
+    import evalprofile
+    try:
+        evalprofile.get_profile(args.eval)
+    except ValueError as e:
+        parser.error(str(e))
+    settings = {'time': args.time, 'depth': args.depth, 'lines': args.lines, 'eval': args.eval}
+    source = sys.stdin if args.input == "-" else open(args.input)
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        if args.workers > 1:
+            from multiprocessing import Pool
+            with Pool(args.workers, initializer=_init_worker, initargs=(settings,)) as pool:
+                for record in pool.imap(_analyze_task, _positions(source)):
+                    out.write(json.dumps(record) + "\n"); out.flush()
+        else:
+            _init_worker(settings)
+            for task in _positions(source):
+                out.write(json.dumps(_analyze_task(task)) + "\n"); out.flush()
+    finally:
+        if source is not sys.stdin: source.close()
+        if out is not sys.stdout: out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
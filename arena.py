@@ -0,0 +1,285 @@
+# Headless self-play arena: N games between two engine settings, no I/O or sleeps.
+#
+#     python arena.py --games 200 --engine-a depth=4 --engine-b depth=3 --workers 4
+#     python arena.py --games 10000 --record selfplay.nmr   # also append every game (gamerecord.py)
+#
+# Engines alternate sides game by game, and each pair of games starts from the same
+# random opening, so colour and opening luck cancel out. Scores are from engine A's side.
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+from bitboard import bits
+
+MAX_PLIES = 300     # game adjudicated a draw after this many plies
+REPETITIONS = 3     # ... or once a position recurs this often
+Z95 = 1.959964
+
+
+class Engine:
+    # Search settings for one side of a match.
+    def __init__(self, name="engine", time_limit=None, node_limit=None, max_depth=4,
+                 book=True, tablebase=True, bombs=True, tt_mb=16, algorithm='alphabeta', cache=None,
+                 eval_profile='default'):
+        self.name = name
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.max_depth = max_depth
+        self.book = book
+        self.tablebase = tablebase
+        self.bombs = bombs
+        self.tt_mb = tt_mb
+        self.algorithm = algorithm
+        self.cache = cache
+        self.eval_profile = eval_profile
+
+    def __repr__(self):
+        return (f"{self.name}(depth={self.max_depth}, time={self.time_limit}, nodes={self.node_limit}, "
+                f"book={int(self.book)}, tb={int(self.tablebase)}, bombs={int(self.bombs)}, search={self.algorithm}"
+                + (f", eval={self.eval_profile}" if self.eval_profile != 'default' else "")
+                + (f", cache={self.cache})" if self.cache else ")"))
+
+
+def parse_engine(spec, name):
+    # "depth=4,time=0.5,nodes=20000,book=0,tb=0,bombs=0,tt=16,search=pvs,cache=pc.bin,eval=tuned" -> Engine
+    import evalprofile
+    from main import SEARCH_ALGORITHMS
+    keys = {"depth": ("max_depth", int), "time": ("time_limit", float), "nodes": ("node_limit", int),
+            "book": ("book", lambda v: v != "0"), "tb": ("tablebase", lambda v: v != "0"),
+            "bombs": ("bombs", lambda v: v != "0"), "tt": ("tt_mb", int), "search": ("algorithm", str),
+            "cache": ("cache", str), "eval": ("eval_profile", str)}
+    engine = Engine(name)
+    for item in filter(None, spec.split(",")):
+        key, _, value = item.partition("=")
+        if key not in keys: raise ValueError(f"unknown engine setting {key!r}")
+        attr, convert = keys[key]
+        setattr(engine, attr, convert(value))
+    if engine.algorithm not in SEARCH_ALGORITHMS:
+        raise ValueError(f"unknown search {engine.algorithm!r}; choose from {', '.join(SEARCH_ALGORITHMS)}")
+    evalprofile.get_profile(engine.eval_profile)   # fail before any game starts
+    return engine
+
+
+_caches = {}   # persistent position caches opened by this process, by path
+
+
+def _position_cache(path):
+    import poscache
+    if path not in _caches: _caches[path] = poscache.PositionCache(path)
+    return _caches[path]
+
+
+class _Side:
+    # An engine's per-game state: its own transposition table, so engines never share one.
+    def __init__(self, engine):
+        import ttable
+        self.engine = engine
+        self.tt = ttable.TranspositionTable(size_mb=engine.tt_mb)
+
+    def configure(self, game):
+        import evalprofile
+        import opening_book
+        import tablebase
+        engine = self.engine
+        game.tt = self.tt
+        game.search_time_limit = engine.time_limit
+        game.search_node_limit = engine.node_limit
+        game.max_search_depth = engine.max_depth
+        game.search_algorithm = engine.algorithm
+        game.eval_profile = evalprofile.get_profile(engine.eval_profile)
+        game.position_cache = _position_cache(engine.cache) if engine.cache else None
+        game.opening_book = opening_book.default_book() if engine.book else None
+        game.tablebase = tablebase.default_tablebase() if engine.tablebase else None
+
+
+def play_game(engine_a, engine_b, a_first, seed, random_plies=2, max_plies=MAX_PLIES):
+    # Plays one game; returns (result for A: 1 / 0.5 / 0, plies, A latencies, B latencies,
+    # (move details, detonated) per ply, winner).
+    from main import NineMensMorris
+    random.seed(seed)
+    game = NineMensMorris()
+    game.quiet = True
+    sides = {1: _Side(engine_a if a_first else engine_b), 2: _Side(engine_b if a_first else engine_a)}
+    latencies = {1: [], 2: []}
+    seen = {}
+    moves = []
+    player, plies = 1, 0
+    while plies < max_plies:
+        detonated = game._handle_bomb_updates_and_detonations(player)
+        game.update_phase()
+        if game.is_game_over(): break
+        key = game.position_key(player == 2)
+        seen[key] = seen.get(key, 0) + 1
+        if seen[key] >= REPETITIONS: break
+        if plies < random_plies:
+            # Shared random opening moves, same for both games of a pair; a mill takes a random piece.
+            if game.make_move(random.choice(game.get_valid_moves(player)), player):
+                removable = bits(game.removal_mask(player))
+                if removable: game.perform_removal(random.choice(removable), player)
+        else:
+            side = sides[player]
+            side.configure(game)
+            if not side.engine.bombs:
+                if player == 1: game.player_bomb_available = False
+                else: game.ai_bomb_available = False
+            start = time.perf_counter()
+            played = game.engine_turn(player)
+            latencies[player].append(time.perf_counter() - start)
+            if played is None:
+                # Stuck with no move and no bomb: the side to move loses.
+                game.winner = "AI" if player == 1 else "Player"
+                break
+        moves.append((game.last_player_move if player == 1 else game.last_ai_move, detonated))
+        player = 3 - player
+        plies += 1
+    if game.winner is None: game.is_game_over()
+    a_side = 1 if a_first else 2
+    if game.winner is None: result = 0.5
+    else: result = 1.0 if (game.winner == "Player") == (a_side == 1) else 0.0
+    return result, plies, latencies[a_side], latencies[3 - a_side], moves, game.winner
+
+
+def _play_task(task):
+    return task, play_game(*task)
+
+
+def _wilson(k, n):
+    # 95% Wilson score interval for a proportion k / n.
+    if n == 0: return 0.0, 1.0
+    p = k / n
+    denom = 1 + Z95 * Z95 / n
+    centre = (p + Z95 * Z95 / (2 * n)) / denom
+    half = Z95 * math.sqrt(p * (1 - p) / n + Z95 * Z95 / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def _elo(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+def _percentiles(samples, points=(50, 90, 99)):
+    if not samples: return {p: 0.0 for p in points + (100,)}
+    ordered = sorted(samples)
+    out = {p: ordered[min(len(ordered) - 1, int(math.ceil(p / 100 * len(ordered))) - 1)] for p in points}
+    out[100] = ordered[-1]
+    return out
+
+
+class MatchResult:
+    def __init__(self, engine_a, engine_b):
+        self.engine_a, self.engine_b = engine_a, engine_b
+        self.results = []
+        self.plies = []
+        self.latencies_a = []
+        self.latencies_b = []
+        self.elapsed = 0.0
+
+    def add(self, game):
+        result, plies, latencies_a, latencies_b = game[:4]
+        self.results.append(result)
+        self.plies.append(plies)
+        self.latencies_a.extend(latencies_a)
+        self.latencies_b.extend(latencies_b)
+
+    @property
+    def games(self):
+        return len(self.results)
+
+    def wdl(self):
+        wins = sum(1 for r in self.results if r == 1.0)
+        losses = sum(1 for r in self.results if r == 0.0)
+        return wins, self.games - wins - losses, losses
+
+    def score_interval(self):
+        # Mean score for A with a 95% normal-approximation interval over per-game scores.
+        n = self.games
+        if n == 0: return 0.5, 0.0, 1.0
+        mean = sum(self.results) / n
+        variance = sum((r - mean) ** 2 for r in self.results) / max(1, n - 1)
+        half = Z95 * math.sqrt(variance / n)
+        return mean, max(0.0, mean - half), min(1.0, mean + half)
+
+    def summary(self):
+        wins, draws, losses = self.wdl()
+        n = self.games
+        lines = [f"A: {self.engine_a!r}", f"B: {self.engine_b!r}"]
+        rate = n / self.elapsed if self.elapsed else float('inf')
+        lines.append(f"{n} games in {self.elapsed:.1f}s ({rate:.2f} games/s, {rate * 3600:.0f} games/h), "
+                     f"{sum(self.plies) / max(1, n):.1f} plies/game")
+        for label, k in (("wins", wins), ("draws", draws), ("losses", losses)):
+            lo, hi = _wilson(k, n)
+            lines.append(f"  A {label:<6} {k:>6}  {k / max(1, n):6.1%}  [95% CI {lo:6.1%} .. {hi:6.1%}]")
+        mean, lo, hi = self.score_interval()
+        lines.append(f"  A score  {mean:6.1%}  [95% CI {lo:6.1%} .. {hi:6.1%}]  "
+                     f"Elo {_elo(mean):+.0f} [{_elo(lo):+.0f} .. {_elo(hi):+.0f}]")
+        for label, samples in (("A", self.latencies_a), ("B", self.latencies_b)):
+            pct = _percentiles(samples)
+            lines.append(f"  {label} move latency ms: p50 {pct[50] * 1000:.1f}  p90 {pct[90] * 1000:.1f}  "
+                         f"p99 {pct[99] * 1000:.1f}  max {pct[100] * 1000:.1f}  ({len(samples)} moves)")
+        return "\n".join(lines)
+
+
+def run_match(engine_a, engine_b, games=100, workers=1, seed=0, random_plies=2, max_plies=MAX_PLIES, progress=None,
+              record=None):
+    # Plays `games` games (in colour-swapped pairs) and returns a MatchResult. With `record`,
+    # every game is appended to that game record file, tagged with its opening seed.
+    tasks = [(engine_a, engine_b, i % 2 == 0, seed * 1_000_003 + i // 2, random_plies, max_plies) for i in range(games)]
+    match = MatchResult(engine_a, engine_b)
+    writer = None
+    if record:
+        import gamerecord
+        writer = gamerecord.GameWriter(record)
+
+    def finished(task, game):
+        match.add(game)
+        if writer: writer.write(game[4], gamerecord.RESULTS[game[5]], tag=task[3])
+        if progress: progress(match)
+
+    start = time.time()
+    try:
+        if workers > 1:
+            from multiprocessing import Pool
+            with Pool(workers) as pool:
+                for task, game in pool.imap_unordered(_play_task, tasks): finished(task, game)
+        else:
+            for task in tasks: finished(*_play_task(task))
+    finally:
+        if writer: writer.close()
+    match.elapsed = time.time() - start
+    return match
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play engine-vs-engine matches without the UI.")
+    parser.add_argument("--games", type=int, default=100, help="number of games (default 100)")
+    parser.add_argument("--engine-a", default="depth=3", help="settings for A, e.g. depth=4,time=0.5,book=0")
+    parser.add_argument("--engine-b", default="depth=3", help="settings for B (same keys as --engine-a)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="parallel game processes")
+    parser.add_argument("--seed", type=int, default=0, help="opening seed")
+    parser.add_argument("--random-plies", type=int, default=2, help="random opening moves per game pair")
+    parser.add_argument("--max-plies", type=int, default=MAX_PLIES, help="plies before a game is drawn")
+    parser.add_argument("--record", help="append every game to this game record file")
+    args = parser.parse_args(argv)
+    try:
+        engine_a = parse_engine(args.engine_a, "A")
+        engine_b = parse_engine(args.engine_b, "B")
+    except ValueError as e:
+        parser.error(str(e))
+
+    def progress(match):
+        if match.games % 10 == 0:
+            wins, draws, losses = match.wdl()
+            print(f"  {match.games}/{args.games}  +{wins} ={draws} -{losses}", file=sys.stderr)
+
+    match = run_match(engine_a, engine_b, args.games, args.workers, args.seed, args.random_plies, args.max_plies, progress,
+                      args.record)
+    print(match.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+# Batched leaf evaluation with NumPy: NineMensMorris.evaluate_board for many positions
+# in one call. Boards are an (N, 24) array of point values (0 empty, 1 player, 2 AI);
+# piece and per-mill counts come from one product with the (16, 24) mill incidence
+# matrix, sliding mobility from the (24, 24) adjacency matrix.
+#
+# NumPy is optional: AVAILABLE is False without it and search keeps evaluating one leaf
+# at a time. The terms mirror evaluate_board and must be kept in step with it; features()
+# returns them unweighted, one column per evalprofile.WEIGHT_NAMES entry (see tune.py).
+import evalprofile
+from bitboard import ADJACENT_POSITIONS, MILLS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+AVAILABLE = np is not None
+WIN_SCORE = 10000
+
+if AVAILABLE:
+    MILL_INCIDENCE = np.zeros((16, 24))
+    for _i, _mill in enumerate(MILLS): MILL_INCIDENCE[_i, list(_mill)] = 1
+    ADJACENCY = np.zeros((24, 24))
+    for _p, _adj in enumerate(ADJACENT_POSITIONS): ADJACENCY[_p, list(_adj)] = 1
+    # [player | AI] (N, 48) @ _FEATURES -> piece counts, a state code per mill (player pieces
+    # in it + 4 * AI pieces) and occupied neighbours per point.
+    _FEATURES = np.zeros((48, 42))
+    _FEATURES[:24, 0] = _FEATURES[24:, 1] = 1
+    _FEATURES[:24, 2:18] = MILL_INCIDENCE.T
+    _FEATURES[24:, 2:18] = 4 * MILL_INCIDENCE.T
+    _FEATURES[:24, 18:] = _FEATURES[24:, 18:] = ADJACENCY
+    _DEGREE = ADJACENCY.sum(axis=0)
+    # Per mill state code: complete mills and near mills (two pieces, third point empty), AI minus player.
+    _MILL_DIFF = np.zeros(16)
+    _NEAR_MILL_DIFF = np.zeros(16)
+    for _p in range(4):
+        for _a in range(4 - _p):
+            _MILL_DIFF[_p + 4 * _a] = (_a == 3) - (_p == 3)
+            _NEAR_MILL_DIFF[_p + 4 * _a] = (_a == 2 and _p == 0) - (_p == 2 and _a == 0)
+    _ONES = np.ones(16)
+    # Sums each half of a (N, 48) [player | AI] row.
+    _HALVES = np.zeros((48, 2))
+    _HALVES[:24, 0] = _HALVES[24:, 1] = 1
+    _SHIFTS = np.arange(24, dtype=np.int64)
+
+
+def boards_from_bitboards(player_bb, ai_bb):
+    # (N, 24) board array from sequences of player and AI bitboards.
+    player = (np.asarray(player_bb, dtype=np.int64)[:, None] >> _SHIFTS) & 1
+    ai = (np.asarray(ai_bb, dtype=np.int64)[:, None] >> _SHIFTS) & 1
+    return (player + 2 * ai).astype(np.int8)
+
+
+def mask_rows(masks):
+    # (N, 24) 0/1 array from a sequence of point masks.
+    return ((np.asarray(masks, dtype=np.int64)[:, None] >> _SHIFTS) & 1).astype(np.float64)
+
+
+def _sides(boards):
+    boards = np.asarray(boards)
+    return np.concatenate(((boards == 1), (boards == 2)), axis=1).astype(np.float64)
+
+
+def _sides_bitboards(player_bb, ai_bb):
+    packed = np.asarray(player_bb, dtype=np.int64) | np.asarray(ai_bb, dtype=np.int64) << 24
+    return ((packed[:, None] >> np.arange(48, dtype=np.int64)) & 1).astype(np.float64)
+
+
+def evaluate(boards, player_to_place, ai_to_place, bombs=None, weights=None):
+    # Scores from the AI's point of view, one per board. bombs is an optional (N, 24)
+    # 0/1 array of armed-bomb points; weights an EvalProfile or a sequence in WEIGHT_NAMES
+    # order (default evalprofile.DEFAULT). Tablebase lookups are not done here.
+    return _evaluate(*_terms(_sides(boards), player_to_place, ai_to_place, bombs), weights)
+
+
+def evaluate_bitboards(player_bb, ai_bb, player_to_place, ai_to_place, bombs=None, weights=None):
+    # evaluate() straight from bitboards, skipping the board array.
+    return _evaluate(*_terms(_sides_bitboards(player_bb, ai_bb), player_to_place, ai_to_place, bombs), weights)
+
+
+def features(boards, player_to_place, ai_to_place, bombs=None):
+    # (features (N, len(WEIGHT_NAMES)), finished (N,) bool, terminal score (N,)): the
+    # unweighted evaluation terms, and which positions are decided games and their scores.
+    return _terms(_sides(boards), player_to_place, ai_to_place, bombs)
+
+
+def features_bitboards(player_bb, ai_bb, player_to_place, ai_to_place, bombs=None):
+    return _terms(_sides_bitboards(player_bb, ai_bb), player_to_place, ai_to_place, bombs)
+
+
+def _evaluate(terms, finished, terminal, weights):
+    if weights is None: weights = evalprofile.DEFAULT
+    weights = np.asarray(weights[-len(evalprofile.WEIGHT_NAMES):], dtype=np.float64)
+    return np.where(finished, terminal, terms @ weights).astype(np.int64)
+
+
+def _terms(sides, player_to_place, ai_to_place, bombs):
+    player_to_place = np.asarray(player_to_place, dtype=np.float64)
+    ai_to_place = np.asarray(ai_to_place, dtype=np.float64)
+    counts = sides @ _FEATURES
+    player_pieces, ai_pieces = counts[:, 0], counts[:, 1]
+    codes = counts[:, 2:18].astype(np.intp)
+    mill_diff = _MILL_DIFF[codes] @ _ONES
+    almost_mill_diff = _NEAR_MILL_DIFF[codes] @ _ONES
+    empties = 24 - player_pieces - ai_pieces
+    open_neighbours = _DEGREE - counts[:, 18:]
+    player_slide, ai_slide = ((sides * np.concatenate((open_neighbours, open_neighbours), axis=1)) @ _HALVES).T
+    player_done = player_to_place == 0
+    ai_done = ai_to_place == 0
+    player_mobility = np.where(player_done, np.where(player_pieces <= 3, player_pieces * empties, player_slide), empties)
+    ai_mobility = np.where(ai_done, np.where(ai_pieces <= 3, ai_pieces * empties, ai_slide), empties)
+    ai_can_fly = ai_done & (ai_pieces <= 3)
+    player_can_fly = player_done & (player_pieces <= 3)
+    flying = ai_can_fly | player_can_fly
+    either_done = ai_done | player_done
+
+    terms = np.zeros((len(sides), len(evalprofile.WEIGHT_NAMES)))
+    terms[:, 0] = ai_pieces - player_pieces
+    terms[:, 1] = mill_diff
+    terms[:, 2] = ai_to_place - player_to_place
+    if bombs is not None:
+        # Player pieces minus AI pieces in the blasts.
+        hits = np.asarray(bombs, dtype=np.float64) @ ADJACENCY
+        terms[:, 3] = (sides * np.concatenate((hits, -hits), axis=1)).sum(axis=1)
+    terms[:, 4] = either_done * almost_mill_diff
+    terms[:, 5] = either_done * (ai_mobility - player_mobility)
+    terms[:, 6] = flying * mill_diff
+    terms[:, 7] = flying * almost_mill_diff
+    terms[:, 8] = ai_can_fly & ~player_can_fly
+    terms[:, 9] = player_can_fly & ~ai_can_fly
+    # Finished games; applied last-first so the earliest of is_game_over's checks wins.
+    terminal = np.zeros(len(sides))
+    finished = np.zeros(len(sides), dtype=bool)
+    for mask, value in ((ai_done & (ai_mobility == 0), -WIN_SCORE), (player_done & (player_mobility == 0), WIN_SCORE),
+                        (ai_done & (ai_pieces < 3), -WIN_SCORE), (player_done & (player_pieces < 3), WIN_SCORE)):
+        terminal = np.where(mask, value, terminal)
+        finished |= mask
+    return terms, finished, terminal
@@ -0,0 +1,227 @@
+# Benchmarks over a fixed position corpus: perft move-generation counts and
+# fixed-depth search speed, saved as JSON so revisions can be compared.
+#
+#     python bench.py                         # perft + search, printed
+#     python bench.py --check                 # also verify move/removal generation against the rules
+#     python bench.py --save bench.json       # write results
+#     python bench.py --compare bench.json    # compare with earlier results
+#
+# Book and tablebase are switched off so node counts depend only on the search itself.
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from bitboard import ADJACENT_POSITIONS, MILLS, bits
+
+# Points are listed per side; bombs are (owner, position, timer).
+CORPUS = [
+    {'name': "placing-start", 'O': (), 'X': (), 'to_place': (9, 9), 'side': 1},
+    {'name': "placing-mid", 'O': (1, 12, 16, 20), 'X': (9, 11, 14, 19), 'to_place': (5, 5), 'side': 1},
+    {'name': "placing-late", 'O': (1, 3, 12, 15, 16, 17, 20, 23), 'X': (2, 4, 6, 9, 11, 14, 19), 'to_place': (1, 1), 'side': 1},
+    {'name': "placing-bombs", 'O': (1, 12, 16, 20), 'X': (9, 11, 14, 19), 'to_place': (5, 5), 'side': 2,
+     'bombs': ((1, 12, 2), (2, 14, 1))},
+    {'name': "moving-full", 'O': (1, 3, 10, 12, 15, 16, 17, 20, 23), 'X': (2, 4, 6, 7, 9, 11, 14, 19), 'to_place': (0, 0), 'side': 1},
+    {'name': "moving-mid", 'O': (0, 8, 9, 11, 14, 19), 'X': (2, 3, 4, 5, 7, 10), 'to_place': (0, 0), 'side': 2},
+    {'name': "moving-bombs", 'O': (0, 8, 9, 11, 14, 19), 'X': (2, 3, 4, 5, 7, 10), 'to_place': (0, 0), 'side': 2,
+     'bombs': ((2, 4, 3), (1, 9, 2))},
+    {'name': "flying-one", 'O': (0, 13, 21), 'X': (3, 4, 18, 19, 20), 'to_place': (0, 0), 'side': 1},
+    {'name': "flying-both", 'O': (1, 2, 6), 'X': (18, 19, 20), 'to_place': (0, 0), 'side': 2},
+    {'name': "flying-bomb", 'O': (0, 13, 21), 'X': (3, 4, 18, 19, 20), 'to_place': (0, 0), 'side': 1,
+     'bombs': ((2, 19, 1),)},
+]
+
+
+def load_position(game, entry):
+    # Sets up `game` from a corpus entry; a side that has armed a bomb has used it up.
+    bombs = entry.get('bombs', ())
+    owners = {owner for owner, _, _ in bombs}
+    player_bb = sum(1 << p for p in entry['O'])
+    ai_bb = sum(1 << p for p in entry['X'])
+    compact_bombs = tuple((i + 1, owner, pos, timer) for i, (owner, pos, timer) in enumerate(bombs))
+    game.load_compact((player_bb, ai_bb, entry['to_place'][0], entry['to_place'][1],
+                       1 not in owners, 2 not in owners, len(bombs), compact_bombs))
+    game.opening_book = None
+    game.tablebase = None
+    return entry['side']
+
+
+def reference_moves(game, player):
+    # Legal moves straight from the rules on the board list, independent of the bitboards,
+    # plus the bomb arming search considers: an own piece without a bomb next to an opponent piece.
+    board = game.board
+    to_place = game.player_pieces_to_place if player == 1 else game.ai_pieces_to_place
+    empty = [p for p in range(24) if board[p] == 0]
+    own = [p for p in range(24) if board[p] == player]
+    arming = set()
+    if game.player_bomb_available if player == 1 else game.ai_bomb_available:
+        armed = {bomb['position'] for bomb in game.bombs_on_board}
+        arming = {(p, -2) for p in own if p not in armed and any(board[q] == 3 - player for q in ADJACENT_POSITIONS[p])}
+    if to_place > 0: return {(p, -1) for p in empty} | arming
+    if len(own) <= 3: return {(to, frm) for frm in own for to in empty} | arming
+    return {(to, frm) for frm in own for to in ADJACENT_POSITIONS[frm] if board[to] == 0} | arming
+
+
+def reference_removals(game, player):
+    board = game.board
+    opponent = 3 - player
+    pieces = [p for p in range(24) if board[p] == opponent]
+    in_mill = {p for mill in MILLS if all(board[q] == opponent for q in mill) for p in mill}
+    free = [p for p in pieces if p not in in_mill]
+    return set(free if free else pieces)
+
+
+class GenerationMismatch(AssertionError):
+    pass
+
+
+def _check_moves(game, player, moves):
+    expected = reference_moves(game, player)
+    if len(moves) != len(set(moves)) or set(moves) != expected:
+        raise GenerationMismatch(f"get_valid_moves + bomb_moves({player}) gave {sorted(moves)}, rules give {sorted(expected)} "
+                                 f"on {game.to_compact()}")
+
+
+def _check_removals(game, player):
+    expected = reference_removals(game, player)
+    got = {p for p in range(24) if game.is_valid_removal(p, player)}
+    if got != expected or set(bits(game.removal_mask(player))) != expected:
+        raise GenerationMismatch(f"removals for {player} gave {sorted(got)}, rules give {sorted(expected)} "
+                                 f"on {game.to_compact()}")
+
+
+def perft(game, depth, player, check=False, ply=0):
+    # Number of action sequences `depth` plies long; an action is a move plus its removal
+    # when the move closes a mill, or arming a bomb. As in search, each side ticks its bombs
+    # at the start of its turn (the root has ticked already). Finished games have no actions.
+    if depth == 0: return 1
+    if ply > 0 and game.bombs_on_board: game.tick_bombs(player)
+    if game.is_game_over(): return 0
+    moves = game.get_valid_moves(player) + game.bomb_moves(player)
+    if check: _check_moves(game, player, moves)
+    removals = bits(game.removal_mask(player))
+    total = 0
+    for move in moves:
+        if depth == 1 and not check:
+            # Bulk count at the frontier: the removal set does not depend on the move.
+            total += len(removals) if removals and game.move_creates_mill_heuristic(move, player) else 1
+            continue
+        mark = len(game._journal)
+        mill_formed = game.make_move(move, player)
+        if mill_formed:
+            if check: _check_removals(game, player)
+            if not removals:
+                total += perft(game, depth - 1, 3 - player, check, ply + 1)
+            for remove_pos in removals:
+                removal_mark = len(game._journal)
+                game._remove_piece(remove_pos)
+                total += perft(game, depth - 1, 3 - player, check, ply + 1)
+                game.undo_to(removal_mark)
+        else:
+            total += perft(game, depth - 1, 3 - player, check, ply + 1)
+        game.undo_to(mark)
+    return total
+
+
+def run_perft(depth, check=False, names=None, log=print):
+    from main import NineMensMorris
+    results = {}
+    for entry in CORPUS:
+        if names and entry['name'] not in names: continue
+        game = NineMensMorris()
+        player = load_position(game, entry)
+        before = game.to_compact()
+        start = time.time()
+        counts = [perft(game, d, player, check) for d in range(1, depth + 1)]
+        elapsed = time.time() - start
+        if game.to_compact() != before: raise GenerationMismatch(f"{entry['name']}: make/undo did not restore the position")
+        results[entry['name']] = {'counts': counts, 'seconds': round(elapsed, 4)}
+        log(f"  perft {entry['name']:<14} {' '.join(str(c) for c in counts):<40} {elapsed:7.2f}s")
+    return results
+
+
+def run_search(depth, names=None, log=print, algorithm='alphabeta'):
+    from main import NineMensMorris
+    results = {}
+    for entry in CORPUS:
+        if names and entry['name'] not in names: continue
+        game = NineMensMorris()
+        player = load_position(game, entry)
+        game.search_algorithm = algorithm
+        start = time.time()
+        score, best = game.iterative_deepening(player == 2, time_limit=None, node_limit=None, max_depth=depth)
+        elapsed = time.time() - start
+        results[entry['name']] = {
+            'depth': game.search_depth_reached, 'nodes': game.nodes, 'seconds': round(elapsed, 4),
+            'nps': round(game.nodes / elapsed) if elapsed else 0, 'score': score,
+            'time_to_depth': [round(seconds, 4) for _, seconds, _ in game.search_iterations],
+        }
+        log(f"  search {entry['name']:<14} depth {game.search_depth_reached:>2}  {game.nodes:>9} nodes  "
+            f"{elapsed:7.2f}s  {results[entry['name']]['nps']:>8} nps  score {score}")
+    return results
+
+
+def _revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(old, new, log=print):
+    # Prints perft differences and search speed ratios; returns False if any perft count changed.
+    same = True
+    for name, result in new.get('perft', {}).items():
+        before = old.get('perft', {}).get(name)
+        if before is None: continue
+        n = min(len(before['counts']), len(result['counts']))
+        if before['counts'][:n] != result['counts'][:n]:
+            same = False
+            log(f"  PERFT MISMATCH {name}: {before['counts'][:n]} -> {result['counts'][:n]}")
+    total_old = total_new = 0.0
+    for name, result in new.get('search', {}).items():
+        before = old.get('search', {}).get(name)
+        if before is None or before['depth'] != result['depth']: continue
+        total_old += before['seconds']; total_new += result['seconds']
+        ratio = before['seconds'] / result['seconds'] if result['seconds'] else float('inf')
+        log(f"  {name:<14} nodes {before['nodes']:>9} -> {result['nodes']:<9} time {before['seconds']:.3f}s -> "
+            f"{result['seconds']:.3f}s  ({ratio:.2f}x)")
+    if total_new:
+        log(f"  overall search speedup vs {old.get('revision')}: {total_old / total_new:.2f}x")
+    return same
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perft and search benchmarks over a fixed position corpus.")
+    parser.add_argument("--perft-depth", type=int, default=3, help="perft depth (default 3, 0 to skip)")
+    parser.add_argument("--search-depth", type=int, default=5, help="fixed search depth (default 5, 0 to skip)")
+    parser.add_argument("--check", action="store_true", help="verify move and removal generation against the rules")
+    parser.add_argument("--positions", nargs="*", help="only these corpus positions")
+    parser.add_argument("--algorithm", default="alphabeta", choices=("alphabeta", "pvs"), help="search to benchmark")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="compare with results saved earlier")
+    args = parser.parse_args(argv)
+
+    results = {'revision': _revision(), 'python': platform.python_version(), 'time': time.strftime("%Y-%m-%d %H:%M:%S"),
+               'perft_depth': args.perft_depth, 'search_depth': args.search_depth, 'algorithm': args.algorithm}
+    try:
+        if args.perft_depth > 0: results['perft'] = run_perft(args.perft_depth, args.check, args.positions)
+    except GenerationMismatch as e:
+        print(f"Move generation check failed: {e}")
+        return 1
+    if args.search_depth > 0: results['search'] = run_search(args.search_depth, args.positions, algorithm=args.algorithm)
+    if args.save:
+        with open(args.save, "w") as f: json.dump(results, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f: old = json.load(f)
+        if not compare(old, results): return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
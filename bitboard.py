@@ -0,0 +1,109 @@
+# Bitboard tables and mask helpers for the 24-point Morris board.
+# A side's pieces are held as one 24-bit integer, bit i set <=> point i occupied.
+
+FULL = (1 << 24) - 1
+
+# Board coordinates of points 0..23 (files A-G, ranks 7-1).
+COORDINATES = [
+    "A7", "D7", "G7", "B6", "D6", "F6", "C5", "D5", "E5", "A4", "B4", "C4",
+    "E4", "F4", "G4", "C3", "D3", "E3", "B2", "D2", "F2", "A1", "D1", "G1"
+]
+
+ADJACENT_POSITIONS = [
+    [1, 9], [0, 2, 4], [1, 14], [4, 10], [1, 3, 5, 7], [4, 13],
+    [7, 11], [4, 6, 8], [7, 12], [0, 10, 21], [3, 9, 11, 18],
+    [6, 10, 15], [8, 13, 17], [5, 12, 14, 20], [2, 13, 23],
+    [11, 16], [15, 17, 19], [12, 16], [10, 19], [16, 18, 20, 22],
+    [13, 19], [9, 22], [19, 21, 23], [14, 22]
+]
+MILLS = [
+    [0, 1, 2], [3, 4, 5], [6, 7, 8], [9, 10, 11], [12, 13, 14],
+    [15, 16, 17], [18, 19, 20], [21, 22, 23], [0, 9, 21],
+    [3, 10, 18], [6, 11, 15], [1, 4, 7], [16, 19, 22],
+    [8, 12, 17], [5, 13, 20], [2, 14, 23]
+]
+
+BIT = [1 << i for i in range(24)]
+ADJ_MASK = [sum(BIT[a] for a in adj) for adj in ADJACENT_POSITIONS]
+MILL_MASKS = [sum(BIT[p] for p in mill) for mill in MILLS]
+# Every point lies on exactly two mills.
+POINT_MILLS = [tuple(m for m in MILL_MASKS if m & BIT[p]) for p in range(24)]
+POINT_MILL_IDS = [tuple(i for i, m in enumerate(MILL_MASKS) if m & BIT[p]) for p in range(24)]
+
+POPCOUNT8 = [bin(i).count("1") for i in range(256)]
+_BITS8 = [[tuple(i + shift for i in range(8) if b >> i & 1) for b in range(256)] for shift in (0, 8, 16)]
+_BITS_LO, _BITS_MID, _BITS_HI = _BITS8
+
+
+def bits(mask):
+    # Ascending point indices of the set bits.
+    return _BITS_LO[mask & 0xFF] + _BITS_MID[mask >> 8 & 0xFF] + _BITS_HI[mask >> 16]
+
+
+def popcount(mask):
+    return POPCOUNT8[mask & 0xFF] + POPCOUNT8[mask >> 8 & 0xFF] + POPCOUNT8[mask >> 16]
+
+
+def forms_mill(own, pos):
+    for m in POINT_MILLS[pos]:
+        if own & m == m: return True
+    return False
+
+
+def mills_mask(own):
+    # Union of the points covered by complete mills of `own`.
+    covered = 0
+    for m in MILL_MASKS:
+        if own & m == m: covered |= m
+    return covered
+
+
+def mill_count(own):
+    count = 0
+    for m in MILL_MASKS:
+        if own & m == m: count += 1
+    return count
+
+
+def near_mill_count(own, empty):
+    # Mills holding two of `own` pieces and one empty point.
+    count = 0
+    for m in MILL_MASKS:
+        if popcount(own & m) == 2 and empty & m: count += 1
+    return count
+
+
+def removable_mask(opp):
+    # Pieces outside mills, or every piece if all of them sit in mills.
+    free = opp & ~mills_mask(opp)
+    return free if free else opp
+
+
+def slide_mobility(own, empty):
+    count = 0
+    for p in bits(own):
+        count += popcount(ADJ_MASK[p] & empty)
+    return count
+
+
+def can_slide(own, empty):
+    for p in bits(own):
+        if ADJ_MASK[p] & empty: return True
+    return False
+
+
+def slide_moves(own, empty):
+    moves = []
+    for from_pos in bits(own):
+        for to_pos in bits(ADJ_MASK[from_pos] & empty):
+            moves.append((to_pos, from_pos))
+    return moves
+
+
+def fly_moves(own, empty):
+    targets = bits(empty)
+    return [(to_pos, from_pos) for from_pos in bits(own) for to_pos in targets]
+
+
+def place_moves(empty):
+    return [(pos, -1) for pos in bits(empty)]
@@ -0,0 +1,57 @@
+# Named weight sets for evaluate_board (and batcheval). A profile holds one weight per
+# evaluation term; terms are AI minus player unless noted, so positive is good for the AI:
+#     piece             pieces on the board
+#     mill              complete mills
+#     to_place          pieces still to place
+#     bomb_blast        player pieces minus AI pieces next to armed bombs
+#     near_mill         two-of-three mills with the third point empty, once either side is done placing
+#     mobility          legal moves, once either side is done placing
+#     flying_mill       complete mills again while either side can fly
+#     flying_near_mill  near mills again while either side can fly
+#     ai_flying         1 when only the AI can fly
+#     player_flying     1 when only the player can fly
+#
+# "default" is the hand-set profile. Others (from python tune.py fit --save-profile NAME) live
+# in eval_profiles.json next to this file.
+import json
+import os
+from collections import namedtuple
+
+WEIGHT_NAMES = ('piece', 'mill', 'to_place', 'bomb_blast', 'near_mill', 'mobility',
+                'flying_mill', 'flying_near_mill', 'ai_flying', 'player_flying')
+EvalProfile = namedtuple('EvalProfile', ('name',) + WEIGHT_NAMES)
+DEFAULT = EvalProfile('default', 200, 300, 5, 100, 50, 5, 100, 25, 100, -150)
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eval_profiles.json")
+
+_loaded = {}
+
+
+def load_profiles(path=DEFAULT_PATH):
+    # {name: EvalProfile}: the built-in default plus every profile saved in `path`.
+    profiles = {DEFAULT.name: DEFAULT}
+    if path and os.path.exists(path):
+        with open(path) as f:
+            for name, weights in json.load(f).items():
+                profiles[name] = EvalProfile(name, *(weights[w] for w in WEIGHT_NAMES))
+    return profiles
+
+
+def get_profile(name, path=DEFAULT_PATH):
+    if (path, name) not in _loaded:
+        profiles = load_profiles(path)
+        if name not in profiles:
+            raise ValueError(f"unknown evaluation profile {name!r}; have {', '.join(sorted(profiles))}")
+        _loaded[(path, name)] = profiles[name]
+    return _loaded[(path, name)]
+
+
+def save_profile(profile, path=DEFAULT_PATH):
+    # Adds or replaces profile.name in `path`; weights are rounded to integers.
+    saved = {}
+    if os.path.exists(path):
+        with open(path) as f: saved = json.load(f)
+    saved[profile.name] = {w: int(round(getattr(profile, w))) for w in WEIGHT_NAMES}
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f: json.dump(saved, f, indent=1)
+    os.replace(tmp_path, path)
+    _loaded.clear()
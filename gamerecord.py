@@ -0,0 +1,242 @@
+# Compact binary game records with an offset index, written and read as streams.
+#
+#     python arena.py --games 10000 --record selfplay.nmr    # append arena games
+#     python gamerecord.py selfplay.nmr                      # result counts and game lengths
+#     python gamerecord.py selfplay.nmr --show 17            # one game, move by move
+#
+# File layout: MAGIC, then games back to back. A game is a GAME header (plies, result,
+# tag) followed by one 16-bit word per ply:
+#     bits 0-4   to point
+#     bits 5-9   from point, or FROM_PLACE / FROM_BOMB
+#     bits 10-14 removed point, or NO_REMOVAL
+#     bit 15     one of the mover's bombs exploded at the start of this turn
+# Player 1 (O) always makes the first ply. The index file next to it (path + ".idx") holds
+# the byte offset of every game as little-endian uint64s; it is rebuilt from the records
+# when missing or behind, so a crash between the two writes loses nothing.
+import argparse
+import os
+import struct
+import sys
+from array import array
+
+MAGIC = b"NMMGR1\0\0"
+GAME = struct.Struct("<HBxI")
+FROM_PLACE = 24
+FROM_BOMB = 25
+NO_REMOVAL = 31
+DETONATION = 1 << 15
+# Results, stored per game.
+DRAW, PLAYER_WON, AI_WON = 0, 1, 2
+RESULTS = {None: DRAW, "Player": PLAYER_WON, "AI": AI_WON}
+
+_LITTLE = sys.byteorder == "little"
+
+
+def encode_ply(move_details, detonated=False):
+    # move_details is a last-move tuple (to, from, removed) as kept by the game.
+    to_pos, from_pos, removed = move_details
+    frm = FROM_PLACE if from_pos == -1 else FROM_BOMB if from_pos == -2 else from_pos
+    return to_pos | frm << 5 | (NO_REMOVAL if removed is None else removed) << 10 | (DETONATION if detonated else 0)
+
+
+def decode_ply(code):
+    # -> ((to, from, removed), detonated), with from -1 for placements and -2 for bombs.
+    frm = code >> 5 & 31
+    removed = code >> 10 & 31
+    from_pos = -1 if frm == FROM_PLACE else -2 if frm == FROM_BOMB else frm
+    return (code & 31, from_pos, None if removed == NO_REMOVAL else removed), bool(code & DETONATION)
+
+
+class GameRecord:
+    __slots__ = ('index', 'result', 'tag', 'codes')
+
+    def __init__(self, index, result, tag, codes):
+        self.index = index
+        self.result = result
+        self.tag = tag
+        self.codes = codes     # array('H') of encoded plies
+
+    def __len__(self):
+        return len(self.codes)
+
+    def plies(self):
+        return [decode_ply(code) for code in self.codes]
+
+    def replay(self, game=None):
+        # Generator over (player, move details, game) after each ply, applied to one game
+        # object (a fresh quiet NineMensMorris by default); copy what you need to keep.
+        # Bomb ticks are replayed by the rules and checked against the detonation flag.
+        if game is None:
+            from main import NineMensMorris
+            game = NineMensMorris()
+            game.quiet = True
+        player = 1
+        for ply, code in enumerate(self.codes):
+            (to_pos, from_pos, removed), detonated = decode_ply(code)
+            exploded = any(event[0] == 'exploded' for event in game.tick_bombs(player))
+            if exploded != detonated:
+                raise ValueError(f"game {self.index} ply {ply}: bomb detonation does not replay")
+            move = (to_pos, from_pos)
+            if from_pos == -2: legal = game.can_arm(to_pos, player)
+            elif from_pos == -1: legal = game.is_valid_place(to_pos)
+            else: legal = game.is_valid_move(from_pos, to_pos, player)
+            if not legal: raise ValueError(f"game {self.index} ply {ply}: illegal move {(to_pos, from_pos)}")
+            mill_formed = game.make_move(move, player)
+            if removed is not None:
+                if not (mill_formed and game.perform_removal(removed, player)):
+                    raise ValueError(f"game {self.index} ply {ply}: illegal removal {removed}")
+            game.update_phase()
+            yield player, (to_pos, from_pos, removed), game
+            player = 3 - player
+
+
+def _read_game(f, index):
+    head = f.read(GAME.size)
+    if not head: return None
+    if len(head) < GAME.size: raise ValueError(f"truncated game header at game {index}")
+    plies, result, tag = GAME.unpack(head)
+    data = f.read(2 * plies)
+    if len(data) < 2 * plies: raise ValueError(f"truncated game {index}")
+    codes = array('H')
+    codes.frombytes(data)
+    if not _LITTLE: codes.byteswap()
+    return GameRecord(index, result, tag, codes)
+
+
+class GameWriter:
+    # Appends games to a record file and its index; use as a context manager.
+    def __init__(self, path):
+        self.path = path
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        if new:
+            with open(path, "wb") as f: f.write(MAGIC)
+            open(path + ".idx", "wb").close()
+        with GameReader(path) as reader:   # validates the file and brings the index up to date
+            end, self.count = reader.end, len(reader)
+        self._file = open(path, "r+b")
+        self._file.truncate(end)
+        self._file.seek(end)
+        self._index = open(path + ".idx", "ab")
+
+    def write(self, moves, result=DRAW, tag=0):
+        # moves: (move details, detonated) per ply. Returns the new game's index.
+        codes = array('H', (encode_ply(move_details, detonated) for move_details, detonated in moves))
+        if not _LITTLE: codes.byteswap()
+        offset = self._file.tell()
+        self._file.write(GAME.pack(len(codes), result, tag & 0xFFFFFFFF))
+        self._file.write(codes.tobytes())
+        self._index.write(struct.pack("<Q", offset))
+        self.count += 1
+        return self.count - 1
+
+    def close(self):
+        self._file.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class GameReader:
+    # Sequential iteration streams games one at a time; indexing seeks through the index.
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        if self._file.read(len(MAGIC)) != MAGIC:
+            self._file.close()
+            raise ValueError(f"{path} is not a game record file")
+        self.offsets = self._load_index()
+
+    def _load_index(self):
+        index_path = self.path + ".idx"
+        offsets = array('Q')
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as f:
+                data = f.read()
+            offsets.frombytes(data[:len(data) - len(data) % 8])
+            if not _LITTLE: offsets.byteswap()
+        # Drop entries past the last complete game, then scan forward for games the index lacks.
+        size = os.fstat(self._file.fileno()).st_size
+        indexed = len(offsets)
+        while offsets and self._game_end(offsets[-1], size) is None: offsets.pop()
+        position = self._game_end(offsets[-1], size) if offsets else len(MAGIC)
+        while True:
+            end = self._game_end(position, size)
+            if end is None: break
+            offsets.append(position)
+            position = end
+        self.end = position   # where the next game goes; anything after it is a torn write
+        if len(offsets) != indexed:
+            with open(index_path, "wb") as f:
+                out = array('Q', offsets)
+                if not _LITTLE: out.byteswap()
+                f.write(out.tobytes())
+        return offsets
+
+    def _game_end(self, offset, size):
+        # Offset just past the game starting at `offset`, or None if it is not all there.
+        if offset + GAME.size > size: return None
+        self._file.seek(offset)
+        end = offset + GAME.size + 2 * GAME.unpack(self._file.read(GAME.size))[0]
+        return end if end <= size else None
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        if index < 0: index += len(self.offsets)
+        if not 0 <= index < len(self.offsets): raise IndexError(index)
+        self._file.seek(self.offsets[index])
+        return _read_game(self._file, index)
+
+    def __iter__(self):
+        # A separate buffered handle, so iterating does not disturb random access.
+        with open(self.path, "rb", buffering=1 << 16) as f:
+            f.seek(len(MAGIC))
+            for index in range(len(self.offsets)):
+                yield _read_game(f, index)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise or print games from a record file.")
+    parser.add_argument("path")
+    parser.add_argument("--show", type=int, help="print this game move by move")
+    parser.add_argument("--verify", action="store_true", help="replay every game through the rules")
+    args = parser.parse_args(argv)
+    with GameReader(args.path) as reader:
+        if args.show is not None:
+            from main import NineMensMorris
+            record = reader[args.show]
+            game = NineMensMorris()
+            game.quiet = True
+            print(f"game {record.index}: {len(record)} plies, result {record.result}, tag {record.tag}")
+            for ply, (player, move_details, _) in enumerate(record.replay(game)):
+                print(f"  {ply + 1:>3} {'O' if player == 1 else 'X'}  {game.format_move(move_details)}")
+            return 0
+        counts = [0, 0, 0]
+        plies = 0
+        for record in reader:
+            counts[record.result] += 1
+            plies += len(record)
+            if args.verify:
+                for _ in record.replay(): pass
+        games = len(reader)
+        print(f"{games} games, {plies} plies ({plies / max(1, games):.1f} per game)")
+        print(f"  O wins {counts[PLAYER_WON]}, X wins {counts[AI_WON]}, draws {counts[DRAW]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+# Reversible change journal and the turn tree built on it.
+#
+# Every state change the game makes is appended to game._journal as one small record;
+# game.undo_to(mark) reverts records back to an earlier journal length, which is how
+# search unmakes moves. GameTree cuts the journal into per-turn nodes so a game can be
+# stepped back and forth without snapshots, and a different move after an undo starts
+# a new branch next to the old line.
+
+# Record layouts (first field is the opcode). Moves, removals and the bomb rules get one
+# record each; SET and BOMB_DEL cover the remaining bookkeeping.
+PLACE = 0       # (PLACE, position, player, previous last move)
+SLIDE = 1       # (SLIDE, to, from, player, previous last move, index of the bomb carried or -1)
+REMOVE = 2      # (REMOVE, position, owner, index of the bomb disarmed or -1, that bomb)
+ARM = 3         # (ARM, player, bomb, previous last move)
+TICK = 4        # (TICK, player): player's bombs count down by one
+BLAST = 5       # (BLAST, position, owner, index of the bomb disarmed or -1, that bomb)
+SET = 6         # (SET, attribute, old, new)
+BOMB_DEL = 7    # (BOMB_DEL, index, bomb)
+
+class Node:
+    __slots__ = ('parent', 'records', 'children', 'label')
+
+    def __init__(self, parent, records, label=None):
+        self.parent = parent
+        self.records = records
+        self.children = []
+        self.label = label
+
+
+class GameTree:
+    def __init__(self, game):
+        self.game = game
+        self.root = Node(None, ())
+        self.current = self.root
+
+    def commit(self, label=None):
+        # Closes a turn: the journal since the last commit becomes a child of the current node.
+        journal = self.game._journal
+        if not journal: return self.current
+        node = Node(self.current, tuple(journal), label)
+        journal.clear()
+        self.current.children.append(node)
+        self.current = node
+        return node
+
+    def revert(self):
+        # Discards changes made since the last commit.
+        self.game.undo_to(0)
+
+    def can_undo(self):
+        return self.current.parent is not None
+
+    def undo(self):
+        self.revert()
+        node = self.current
+        if node.parent is None: return False
+        for record in reversed(node.records): self.game._revert(record)
+        self.current = node.parent
+        return True
+
+    def branches(self):
+        return self.current.children
+
+    def redo(self, branch=-1):
+        # Steps forward into a child; by default the most recently played line.
+        self.revert()
+        if not self.current.children: return False
+        node = self.current.children[branch]
+        for record in node.records: self.game._replay(record)
+        self.current = node
+        return True
+
+    def line(self):
+        # Labels from the root down to the current node.
+        labels = []
+        node = self.current
+        while node.parent is not None:
+            labels.append(node.label); node = node.parent
+        return labels[::-1]
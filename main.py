@@ -1,8 +1,40 @@
-import os
 import time
 import random
 import sys
 
+import batcheval
+import bitboard
+import evalprofile
+import journal
+import opening_book
+import poscache
+import render
+import searchstats
+import tablebase
+import ttable
+from bitboard import BIT, ADJ_MASK, FULL, MILL_MASKS, POINT_MILL_IDS, popcount
+from ttable import PIECE_KEYS, PLACE_KEYS, BOMB_KEYS, BOMB_AVAILABLE_KEYS
+
+WIN_SCORE = 10000
+# Scores at least this large are proven wins/losses (terminal or tablebase), not heuristics.
+PROVEN_SCORE = WIN_SCORE - tablebase.MAX_DISTANCE
+MAX_SEARCH_PLY = 64
+# Depth-1 nodes with at least this many moves score their children in one batcheval call.
+BATCH_MIN_MOVES = 40
+# search_algorithm 'pvs': aspiration half-window around the previous iteration's score, and
+# one-ply late-move reductions for quiet moves at or after LMR_MIN_INDEX in the ordered list
+# at depth LMR_MIN_DEPTH and up. SCORE_BOUND stands in for infinity so null windows are integers.
+SEARCH_ALGORITHMS = ('alphabeta', 'pvs', 'mcts')
+ASPIRATION_WINDOW = 50
+LMR_MIN_DEPTH = 3
+LMR_MIN_INDEX = 3
+SCORE_BOUND = WIN_SCORE + 1
+# Attribute names per player (index 1 = player, 2 = AI) for journaled updates.
+LAST_MOVE = (None, 'last_player_move', 'last_ai_move')
+
+class SearchTimeout(Exception):
+    pass
+
 class NineMensMorris:
     def __init__(self):
         self.board = [0] * 24
@@ -16,37 +48,96 @@ class NineMensMorris:
         self.winner = None
         self.player_turn = True
 
-        self.coordinates = {
-            0: "A7", 1: "D7", 2: "G7", 3: "B6", 4: "D6", 5: "F6",
-            6: "C5", 7: "D5", 8: "E5", 9: "A4", 10: "B4", 11: "C4",
-            12: "E4", 13: "F4", 14: "G4", 15: "C3", 16: "D3", 17: "E3",
-            18: "B2", 19: "D2", 20: "F2", 21: "A1", 22: "D1", 23: "G1"
-        }
+        self.coordinates = dict(enumerate(bitboard.COORDINATES))
         self.position_map = {v: k for k, v in self.coordinates.items()}
-        self.adjacent_positions = [
-            [1, 9], [0, 2, 4], [1, 14], [4, 10], [1, 3, 5, 7], [4, 13],
-            [7, 11], [4, 6, 8], [7, 12], [0, 10, 21], [3, 9, 11, 18],
-            [6, 10, 15], [8, 13, 17], [5, 12, 14, 20], [2, 13, 23],
-            [11, 16], [15, 17, 19], [12, 16], [10, 19], [16, 18, 20, 22],
-            [13, 19], [9, 22], [19, 21, 23], [14, 22]
-        ]
-        self.mills = [
-            [0, 1, 2], [3, 4, 5], [6, 7, 8], [9, 10, 11], [12, 13, 14],
-            [15, 16, 17], [18, 19, 20], [21, 22, 23], [0, 9, 21],
-            [3, 10, 18], [6, 11, 15], [1, 4, 7], [16, 19, 22],
-            [8, 12, 17], [5, 13, 20], [2, 14, 23]
-        ]
+        self.adjacent_positions = bitboard.ADJACENT_POSITIONS
+        self.mills = bitboard.MILLS
+        # bitboards[v] is the mask of points whose board value is v (0 = empty).
+        self.bitboards = [FULL, 0, 0]
+        # Zobrist hash of the board, updated by _put/_lift.
+        self.zobrist = 0
+        # Evaluation terms kept up to date by _put/_lift, indexed by player like bitboards:
+        # pieces per mill, complete mills, two-of-three-with-empty mills and
+        # (piece, adjacent empty point) pairs, i.e. sliding mobility.
+        self.mill_piece_counts = [None, [0] * 16, [0] * 16]
+        self.mill_counts = [0, 0, 0]
+        self.near_mill_counts = [0, 0, 0]
+        self.slide_mobility = [0, 0, 0]
+        self.tt = ttable.TranspositionTable(size_mb=16)
+        # Flying-phase endgame tables (python tablebase.py); empty when none were built.
+        self.tablebase = tablebase.default_tablebase()
+        # Placement-phase book (python opening_book.py); empty when the file is missing.
+        self.opening_book = opening_book.default_book()
+        # Persistent cross-game cache (poscache.PositionCache) behind the TT, or None.
+        self.position_cache = None
+        # Per-move search budget for ai_move; either limit may be None.
+        self.search_time_limit = 2.0
+        self.search_node_limit = None
+        self.max_search_depth = 20
+        # 'alphabeta' (alpha_beta_search), 'pvs' (pvs_search: negamax PVS, aspiration windows, LMR)
+        # or 'mcts' (mcts_search: UCT with random playouts; search_node_limit counts playouts).
+        self.search_algorithm = 'alphabeta'
+        # Weights of the evaluate_board terms (evalprofile.py; tuned ones come from tune.py).
+        self.eval_profile = evalprofile.DEFAULT
+        self.search_depth_reached = 0
+        self.nodes = 0
+        # (depth, seconds, nodes) for each completed iteration of the last iterative_deepening.
+        self.search_iterations = []
+        self._deadline = None
+        self._node_limit = None
+        self._next_budget_check = 0
+        self._pv_table = [[] for _ in range(MAX_SEARCH_PLY + 1)]
+        self._prev_pv = []
+        self._follow_pv = False
+        # Two quiet moves per ply that caused a cutoff, and per-player cutoff history
+        # indexed by (from + 1) * 24 + to (from == -1 for placements).
+        self._killers = [[None, None] for _ in range(MAX_SEARCH_PLY + 1)]
+        self._history = [None, [0] * (25 * 24), [0] * (25 * 24)]
+        # Worker processes for root-split search when search_workers > 1 (parallel_search.py).
+        self.search_workers = 1
+        self._parallel_searcher = None
+        self._mcts_searcher = None
+        # Search the AI's answers during the human's turn in play_game (ponder.py; not with 'mcts'). stop_search
+        # aborts a running search from another thread.
+        self.ponder = True
+        self._ponderer = None
+        self.stop_search = False
+        # Headless mode: engine paths skip messages, board redraws and pauses (see arena.py).
+        self.quiet = False
+        # Screen output and pacing of pauses for interactive play (render.py).
+        self.renderer = render.Renderer()
+        # Per-move search statistics (searchstats.py), optionally appended as JSON lines to stats_log.
+        self.collect_stats = False
+        self.stats_log = None
+        self.last_search_stats = None
+        self._stats = None
+        # Score wide depth-1 frontiers with NumPy (batcheval.py, needs numpy). Off by default: the
+        # incremental evaluate_board is cheap and a batch gives up the leaf cutoffs.
+        self.batch_eval = False
 
         self.player_bomb_available = True
         self.ai_bomb_available = True
         self.bombs_on_board = []
         self.next_bomb_id = 0
         self.BOMB_INITIAL_TIMER = 3
-        self.player_undos_left = 3
-        self._undo_stack = []
+        # Every state change since the last turn commit (journal.py); search unmakes through it.
+        self._journal = []
+        self.history = journal.GameTree(self)
 
     def clear_screen(self):
-        os.system('cls' if os.name == 'nt' else 'clear')
+        self.renderer.clear()
+
+    def _say(self, *args):
+        if not self.quiet: self.renderer.say(*args)
+
+    def _pause(self, seconds):
+        if not self.quiet: self.renderer.pause(seconds)
+
+    def _ask(self, prompt):
+        return self.renderer.ask(prompt)
+
+    def _show_board(self):
+        if not self.quiet: self.display_board()
 
     def get_piece_symbol(self, value, pos=None):
         # If pos is provided and there is a bomb at this position, color it red
@@ -83,58 +174,249 @@ class NineMensMorris:
             removal_info = f", removed piece at {removed_coord}"
         return action + removal_info
 
-    def display_board(self):
-        self.clear_screen()
-        phase_desc = "Phase 1: Placing"
-        player_done_placing = self.player_pieces_to_place == 0
-        ai_done_placing = self.ai_pieces_to_place == 0
-        if player_done_placing and ai_done_placing:
+    def update_phase(self):
+        if self.player_pieces_to_place == 0 and self.ai_pieces_to_place == 0:
             is_player_flying = self.player_pieces_on_board <= 3
             is_ai_flying = self.ai_pieces_on_board <= 3
-            current_phase = 3 if is_player_flying or is_ai_flying else 2
-            if current_phase != self.phase: self.phase = current_phase
-            phase_desc = f"Phase {self.phase}: {'Flying' if self.phase == 3 else 'Moving'}"
-        else:
-             if self.phase != 1: self.phase = 1
-             phase_desc = "Phase 1: Placing"
-
-        print(f"\n  Nine Men's Morris - {phase_desc}")
-        print(f"  Player: O ({self.player_pieces_on_board} on board, {self.player_pieces_to_place} to place), Bomb Available: {'Yes' if self.player_bomb_available else 'No'}")
-        print(f"  AI: X ({self.ai_pieces_on_board} on board, {self.ai_pieces_to_place} to place), Bomb Available: {'Yes' if self.ai_bomb_available else 'No'}")
-        print("\n  Game Board (coordinate system A1-G7):\n")
-        
+            self.phase = 3 if is_player_flying or is_ai_flying else 2
+        else: self.phase = 1
+
+    def board_lines(self):
+        # The board panel as a list of lines (one frame for the renderer).
+        self.update_phase()
+        if self.phase == 1: phase_desc = "Phase 1: Placing"
+        else: phase_desc = f"Phase {self.phase}: {'Flying' if self.phase == 3 else 'Moving'}"
         # Use get_piece_symbol with bomb highlighting
         p = [self.get_piece_symbol(self.board[i], i) for i in range(24)]
-
-        print(f"    A   B   C   D   E   F   G")
-        print(f"7   {p[0]}-----------{p[1]}-----------{p[2]}")
-        print(f"    |           |           |")
-        print(f"6   |   {p[3]}-------{p[4]}-------{p[5]}   |")
-        print(f"    |   |       |       |   |")
-        print(f"5   |   |   {p[6]}---{p[7]}---{p[8]}   |   |")
-        print(f"    |   |   |       |   |   |")
-        print(f"4   {p[9]}---{p[10]}---{p[11]}       {p[12]}---{p[13]}---{p[14]}")
-        print(f"    |   |   |       |   |   |")
-        print(f"3   |   |   {p[15]}---{p[16]}---{p[17]}   |   |")
-        print(f"    |   |       |       |   |")
-        print(f"2   |   {p[18]}-------{p[19]}-------{p[20]}   |")
-        print(f"    |           |           |")
-        print(f"1   {p[21]}-----------{p[22]}-----------{p[23]}")
-        print(f"    A   B   C   D   E   F   G")
-        print("\n  Last moves:")
-        player_move_str = self.format_move(self.last_player_move)
-        ai_move_str = self.format_move(self.last_ai_move)
-        print(f"  Player: {player_move_str}")
-        print(f"  AI: {ai_move_str}")
-
-        print("\n  Active Time Bombs:")
+        lines = [
+            "",
+            f"  Nine Men's Morris - {phase_desc}",
+            f"  Player: O ({self.player_pieces_on_board} on board, {self.player_pieces_to_place} to place), Bomb Available: {'Yes' if self.player_bomb_available else 'No'}",
+            f"  AI: X ({self.ai_pieces_on_board} on board, {self.ai_pieces_to_place} to place), Bomb Available: {'Yes' if self.ai_bomb_available else 'No'}",
+            "",
+            "  Game Board (coordinate system A1-G7):",
+            "",
+            f"    A   B   C   D   E   F   G",
+            f"7   {p[0]}-----------{p[1]}-----------{p[2]}",
+            f"    |           |           |",
+            f"6   |   {p[3]}-------{p[4]}-------{p[5]}   |",
+            f"    |   |       |       |   |",
+            f"5   |   |   {p[6]}---{p[7]}---{p[8]}   |   |",
+            f"    |   |   |       |   |   |",
+            f"4   {p[9]}---{p[10]}---{p[11]}       {p[12]}---{p[13]}---{p[14]}",
+            f"    |   |   |       |   |   |",
+            f"3   |   |   {p[15]}---{p[16]}---{p[17]}   |   |",
+            f"    |   |       |       |   |",
+            f"2   |   {p[18]}-------{p[19]}-------{p[20]}   |",
+            f"    |           |           |",
+            f"1   {p[21]}-----------{p[22]}-----------{p[23]}",
+            f"    A   B   C   D   E   F   G",
+            "",
+            "  Last moves:",
+            f"  Player: {self.format_move(self.last_player_move)}",
+            f"  AI: {self.format_move(self.last_ai_move)}",
+            "",
+            "  Active Time Bombs:",
+        ]
         if not self.bombs_on_board:
-            print("    None")
+            lines.append("    None")
         else:
             for bomb in self.bombs_on_board:
                 owner = "Player (O)" if bomb['player_id'] == 1 else "AI (X)"
                 pos_coord = self.coordinates.get(bomb['position'], f"?({bomb['position']})")
-                print(f"    ID {bomb['id']}: {owner} at {pos_coord}, Detonates in {bomb['timer']} of their turn(s).")
+                lines.append(f"    ID {bomb['id']}: {owner} at {pos_coord}, Detonates in {bomb['timer']} of their turn(s).")
+        return lines
+
+    def display_board(self):
+        self.renderer.frame(self.board_lines())
+
+    def _put(self, position, player):
+        opponent = 3 - player
+        own_counts = self.mill_piece_counts[player]; opp_counts = self.mill_piece_counts[opponent]
+        for mill_id in POINT_MILL_IDS[position]:
+            own = own_counts[mill_id]; opp = opp_counts[mill_id]
+            if opp == 0:
+                if own == 2: self.near_mill_counts[player] -= 1; self.mill_counts[player] += 1
+                elif own == 1: self.near_mill_counts[player] += 1
+            elif opp == 2 and own == 0: self.near_mill_counts[opponent] -= 1
+            own_counts[mill_id] = own + 1
+        bitboards = self.bitboards
+        adj = ADJ_MASK[position]
+        self.slide_mobility[1] -= popcount(adj & bitboards[1])
+        self.slide_mobility[2] -= popcount(adj & bitboards[2])
+        self.board[position] = player
+        bitboards[0] ^= BIT[position]
+        bitboards[player] |= BIT[position]
+        self.slide_mobility[player] += popcount(adj & bitboards[0])
+        self.zobrist ^= PIECE_KEYS[player][position]
+
+    def _lift(self, position):
+        player = self.board[position]
+        opponent = 3 - player
+        own_counts = self.mill_piece_counts[player]; opp_counts = self.mill_piece_counts[opponent]
+        for mill_id in POINT_MILL_IDS[position]:
+            own = own_counts[mill_id]; opp = opp_counts[mill_id]
+            if own == 3: self.mill_counts[player] -= 1; self.near_mill_counts[player] += 1
+            elif own == 2 and opp == 0: self.near_mill_counts[player] -= 1
+            elif own == 1 and opp == 2: self.near_mill_counts[opponent] += 1
+            own_counts[mill_id] = own - 1
+        bitboards = self.bitboards
+        adj = ADJ_MASK[position]
+        self.slide_mobility[player] -= popcount(adj & bitboards[0])
+        self.board[position] = 0
+        bitboards[player] ^= BIT[position]
+        bitboards[0] |= BIT[position]
+        self.slide_mobility[1] += popcount(adj & bitboards[1])
+        self.slide_mobility[2] += popcount(adj & bitboards[2])
+        self.zobrist ^= PIECE_KEYS[player][position]
+        return player
+
+    # Journaled changes: each appends its record and applies it. undo_to reverts them.
+    def _do_set(self, name, value):
+        self._journal.append((journal.SET, name, getattr(self, name), value))
+        setattr(self, name, value)
+
+    def _do_bomb_del(self, index):
+        self._journal.append((journal.BOMB_DEL, index, self.bombs_on_board[index]))
+        del self.bombs_on_board[index]
+
+    def _place(self, position, player):
+        self._put(position, player)
+        if player == 1:
+            self.player_pieces_to_place -= 1; self.player_pieces_on_board += 1
+            self.last_player_move = (position, -1, None)
+        else:
+            self.ai_pieces_to_place -= 1; self.ai_pieces_on_board += 1
+            self.last_ai_move = (position, -1, None)
+
+    def _slide(self, to_pos, from_pos, player, bomb_index):
+        self._lift(from_pos)
+        self._put(to_pos, player)
+        if player == 1: self.last_player_move = (to_pos, from_pos, None)
+        else: self.last_ai_move = (to_pos, from_pos, None)
+        if bomb_index >= 0: self.bombs_on_board[bomb_index]['position'] = to_pos
+
+    def _remove(self, position, owner, bomb_index):
+        self._lift(position)
+        if owner == 1: self.player_pieces_on_board -= 1
+        else: self.ai_pieces_on_board -= 1
+        if bomb_index >= 0: del self.bombs_on_board[bomb_index]
+
+    def _arm(self, player, bomb):
+        self.next_bomb_id = bomb['id']
+        self.bombs_on_board.append(bomb)
+        if player == 1: self.player_bomb_available = False; self.last_player_move = (bomb['position'], -2, None)
+        else: self.ai_bomb_available = False; self.last_ai_move = (bomb['position'], -2, None)
+
+    def _tick(self, player, delta):
+        for bomb in self.bombs_on_board:
+            if bomb['player_id'] == player: bomb['timer'] += delta
+
+    def _blast(self, position, owner, bomb_index):
+        # A blasted piece goes back to its owner's place pool.
+        self._remove(position, owner, bomb_index)
+        if owner == 1: self.player_pieces_to_place += 1
+        else: self.ai_pieces_to_place += 1
+
+    def _revert(self, record):
+        op = record[0]
+        if op == journal.PLACE:
+            _, position, player, last_move = record
+            self._lift(position)
+            if player == 1:
+                self.player_pieces_to_place += 1; self.player_pieces_on_board -= 1
+                self.last_player_move = last_move
+            else:
+                self.ai_pieces_to_place += 1; self.ai_pieces_on_board -= 1
+                self.last_ai_move = last_move
+        elif op == journal.SLIDE:
+            _, to_pos, from_pos, player, last_move, bomb_index = record
+            self._lift(to_pos)
+            self._put(from_pos, player)
+            if player == 1: self.last_player_move = last_move
+            else: self.last_ai_move = last_move
+            if bomb_index >= 0: self.bombs_on_board[bomb_index]['position'] = from_pos
+        elif op == journal.REMOVE:
+            _, position, owner, bomb_index, bomb = record
+            if bomb_index >= 0: self.bombs_on_board.insert(bomb_index, bomb)
+            self._put(position, owner)
+            if owner == 1: self.player_pieces_on_board += 1
+            else: self.ai_pieces_on_board += 1
+        elif op == journal.ARM:
+            _, player, _, last_move = record
+            self.bombs_on_board.pop()
+            self.next_bomb_id -= 1
+            if player == 1: self.player_bomb_available = True; self.last_player_move = last_move
+            else: self.ai_bomb_available = True; self.last_ai_move = last_move
+        elif op == journal.TICK: self._tick(record[1], 1)
+        elif op == journal.BLAST:
+            _, position, owner, bomb_index, bomb = record
+            if bomb_index >= 0: self.bombs_on_board.insert(bomb_index, bomb)
+            self._put(position, owner)
+            if owner == 1: self.player_pieces_on_board += 1; self.player_pieces_to_place -= 1
+            else: self.ai_pieces_on_board += 1; self.ai_pieces_to_place -= 1
+        elif op == journal.SET: setattr(self, record[1], record[2])
+        else: self.bombs_on_board.insert(record[1], record[2])
+
+    def _replay(self, record):
+        op = record[0]
+        if op == journal.PLACE: self._place(record[1], record[2])
+        elif op == journal.SLIDE: self._slide(record[1], record[2], record[3], record[5])
+        elif op == journal.REMOVE: self._remove(record[1], record[2], record[3])
+        elif op == journal.ARM: self._arm(record[1], record[2])
+        elif op == journal.TICK: self._tick(record[1], -1)
+        elif op == journal.BLAST: self._blast(record[1], record[2], record[3])
+        elif op == journal.SET: setattr(self, record[1], record[3])
+        else: del self.bombs_on_board[record[1]]
+
+    def undo_to(self, mark):
+        # Reverts journaled changes until the journal is `mark` records long.
+        journal_records = self._journal
+        while len(journal_records) > mark:
+            self._revert(journal_records.pop())
+
+    def _sync_from_board(self):
+        # Rebuilds every incrementally maintained term after self.board was replaced wholesale.
+        self.bitboards = [0, 0, 0]
+        for pos, value in enumerate(self.board):
+            self.bitboards[value] |= BIT[pos]
+        self.zobrist = ttable.board_key(self.board)
+        empty = self.bitboards[0]
+        for player in (1, 2):
+            own = self.bitboards[player]
+            self.mill_piece_counts[player] = [popcount(own & m) for m in bitboard.MILL_MASKS]
+            self.mill_counts[player] = bitboard.mill_count(own)
+            self.near_mill_counts[player] = bitboard.near_mill_count(own, empty)
+            self.slide_mobility[player] = bitboard.slide_mobility(own, empty)
+
+    def position_key(self, maximizing_player):
+        # Board hash plus pieces to place, side to move and bomb state.
+        key = self.zobrist ^ PLACE_KEYS[1][self.player_pieces_to_place] ^ PLACE_KEYS[2][self.ai_pieces_to_place]
+        if maximizing_player: key ^= ttable.SIDE_KEY
+        if self.player_bomb_available: key ^= BOMB_AVAILABLE_KEYS[1]
+        if self.ai_bomb_available: key ^= BOMB_AVAILABLE_KEYS[2]
+        for bomb in self.bombs_on_board:
+            key ^= BOMB_KEYS[bomb['player_id']][bomb['position']][bomb['timer'] % ttable.BOMB_TIMERS]
+        return key
+
+    def removal_mask(self, player_making_removal):
+        return bitboard.removable_mask(self.bitboards[3 - player_making_removal])
+
+    def mobility(self, player):
+        # Equals len(self.get_valid_moves(player)) without building the list.
+        empty = self.bitboards[0]
+        pieces_to_place = self.player_pieces_to_place if player == 1 else self.ai_pieces_to_place
+        if pieces_to_place > 0: return bitboard.popcount(empty)
+        pieces_on_board = self.player_pieces_on_board if player == 1 else self.ai_pieces_on_board
+        if pieces_on_board <= 3: return popcount(self.bitboards[player]) * popcount(empty)
+        return self.slide_mobility[player]
+
+    def has_legal_move(self, player):
+        # mobility(player) > 0 without counting: any empty point to place or fly to, or one slide.
+        empty = self.bitboards[0]
+        if (self.player_pieces_to_place if player == 1 else self.ai_pieces_to_place) > 0: return empty != 0
+        if (self.player_pieces_on_board if player == 1 else self.ai_pieces_on_board) <= 3: return empty != 0 and self.bitboards[player] != 0
+        return self.slide_mobility[player] > 0
 
     def is_valid_place(self, position):
         return 0 <= position <= 23 and self.board[position] == 0
@@ -147,146 +429,135 @@ class NineMensMorris:
         can_fly = (pieces_on_board <= 3) and (pieces_to_place == 0)
         if pieces_to_place > 0: return False
         if can_fly: return True
-        else: return to_pos in self.adjacent_positions[from_pos]
+        else: return bool(ADJ_MASK[from_pos] & BIT[to_pos])
 
     def forms_mill(self, position, player):
         if not (0 <= position <= 23) or self.board[position] != player: return False
-        for mill in self.mills:
-            if position in mill:
-                if all(self.board[pos] == player for pos in mill):
-                    return True
-        return False
+        return bitboard.forms_mill(self.bitboards[player], position)
 
     def is_in_mill(self, position, player):
         if not (0 <= position <= 23) or self.board[position] != player: return False
-        for mill in self.mills:
-            if position in mill:
-                if all(self.board[pos] == player for pos in mill):
-                    return True
-        return False
+        return bitboard.forms_mill(self.bitboards[player], position)
 
     def is_valid_removal(self, position, player_making_removal):
-        opponent = 3 - player_making_removal
         if not (0 <= position <= 23): return False
-        if self.board[position] != opponent: return False
-        opponent_in_mill = self.is_in_mill(position, opponent)
-        if not opponent_in_mill: return True
-        all_opponent_pieces_in_mills = True
-        for pos in range(24):
-            if self.board[pos] == opponent and not self.is_in_mill(pos, opponent):
-                all_opponent_pieces_in_mills = False
-                break
-        return all_opponent_pieces_in_mills
+        return bool(self.removal_mask(player_making_removal) & BIT[position])
 
     def get_valid_moves(self, player):
-        valid_moves = []
         pieces_to_place = self.player_pieces_to_place if player == 1 else self.ai_pieces_to_place
         pieces_on_board = self.player_pieces_on_board if player == 1 else self.ai_pieces_on_board
+        empty = self.bitboards[0]
         if pieces_to_place > 0:
-            return [(pos, -1) for pos in range(24) if self.board[pos] == 0]
-        can_fly = (pieces_on_board <= 3)
-        player_piece_indices = [i for i, piece in enumerate(self.board) if piece == player]
-        empty_indices = [i for i, piece in enumerate(self.board) if piece == 0]
-        if can_fly:
-            for from_pos in player_piece_indices:
-                for to_pos in empty_indices:
-                    valid_moves.append((to_pos, from_pos))
-        else:
-            for from_pos in player_piece_indices:
-                for adj_pos in self.adjacent_positions[from_pos]:
-                    if adj_pos in empty_indices:
-                        valid_moves.append((adj_pos, from_pos))
-        return valid_moves
+            return bitboard.place_moves(empty)
+        if pieces_on_board <= 3:
+            return bitboard.fly_moves(self.bitboards[player], empty)
+        return bitboard.slide_moves(self.bitboards[player], empty)
 
     def make_move(self, move, player):
         to_pos, from_pos = move
         mill_formed = False
-        move_details = (to_pos, from_pos, None)
+        if from_pos == -2:
+            if self.can_arm(to_pos, player): self.arm_bomb(player, to_pos)
+            return False
         if from_pos == -1:
             if self.is_valid_place(to_pos):
-                self.board[to_pos] = player
-                if player == 1:
-                    self.player_pieces_to_place -= 1; self.player_pieces_on_board += 1
-                    self.last_player_move = move_details
-                else:
-                    self.ai_pieces_to_place -= 1; self.ai_pieces_on_board += 1
-                    self.last_ai_move = move_details
+                self._journal.append((journal.PLACE, to_pos, player, self.last_player_move if player == 1 else self.last_ai_move))
+                self._place(to_pos, player)
                 mill_formed = self.forms_mill(to_pos, player)
                 return mill_formed
             else: return False
         else:
             if self.is_valid_move(from_pos, to_pos, player):
-                self.board[from_pos] = 0
-                self.board[to_pos] = player
-                if player == 1: self.last_player_move = move_details
-                else: self.last_ai_move = move_details
-                for bomb in self.bombs_on_board:
+                bomb_index = -1
+                for i, bomb in enumerate(self.bombs_on_board):
                     if bomb['position'] == from_pos and bomb['player_id'] == player:
-                        bomb['position'] = to_pos
+                        bomb_index = i
                         break
+                self._journal.append((journal.SLIDE, to_pos, from_pos, player,
+                                      self.last_player_move if player == 1 else self.last_ai_move, bomb_index))
+                self._slide(to_pos, from_pos, player, bomb_index)
                 mill_formed = self.forms_mill(to_pos, player)
                 return mill_formed
             else: return False
 
+    def _remove_piece(self, position):
+        # Removes the piece at `position` (disarming any bomb on it) without messages or last-move
+        # bookkeeping; used by search and by perform_removal.
+        owner = self.board[position]
+        bomb_index, bomb = -1, None
+        for i, b in enumerate(self.bombs_on_board):
+            if b['position'] == position:
+                bomb_index, bomb = i, b
+                break
+        self._journal.append((journal.REMOVE, position, owner, bomb_index, bomb))
+        self._remove(position, owner, bomb_index)
+        return bomb
+
+    def _remove_bomb(self, bomb):
+        for i, b in enumerate(self.bombs_on_board):
+            if b is bomb: self._do_bomb_del(i); return
+
     def perform_removal(self, remove_pos, player_making_removal):
-        opponent = 3 - player_making_removal
         if self.is_valid_removal(remove_pos, player_making_removal):
-            # --- Fix: Remove bomb if present on removed piece ---
-            for bomb in list(self.bombs_on_board):
-                if bomb['position'] == remove_pos:
-                    self.bombs_on_board.remove(bomb)
-                    owner_str = "Player's" if bomb['player_id'] == 1 else "AI's"
-                    print(f"{owner_str} Time Bomb (ID {bomb['id']}) at {self.coordinates.get(remove_pos)} was on a removed piece and has been disarmed.")
-                    time.sleep(0.5)
-                    break
-            # --- END Fix ---
-            self.board[remove_pos] = 0
-            last_move_tuple = None
-            if opponent == 1:
-                self.player_pieces_on_board -= 1
-                last_move_tuple = self.last_ai_move
-            else:
-                self.ai_pieces_on_board -= 1
-                last_move_tuple = self.last_player_move
+            # A bomb on the removed piece is disarmed with it.
+            bomb = self._remove_piece(remove_pos)
+            if bomb is not None:
+                owner_str = "Player's" if bomb['player_id'] == 1 else "AI's"
+                self._say(f"{owner_str} Time Bomb (ID {bomb['id']}) at {self.coordinates.get(remove_pos)} was on a removed piece and has been disarmed.")
+                self._pause(0.5)
+            last_move_tuple = getattr(self, LAST_MOVE[player_making_removal])
             if last_move_tuple:
                 to_pos, from_pos, _ = last_move_tuple
-                updated_move = (to_pos, from_pos, remove_pos)
-                if player_making_removal == 1: self.last_player_move = updated_move
-                else: self.last_ai_move = updated_move
+                self._do_set(LAST_MOVE[player_making_removal], (to_pos, from_pos, remove_pos))
             else:
-                 print(f"Error: perform_removal({player_making_removal}) - last move not found.")
+                 self._say(f"Error: perform_removal({player_making_removal}) - last move not found.")
             return True
         else:
             return False
 
-    def undo_move(self, move_details, player):
-        if move_details is None: return
-        to_pos, from_pos, removed_pos = move_details
-        opponent = 3 - player
-        if removed_pos is not None:
-            if 0 <= removed_pos <= 23 and self.board[removed_pos] == 0:
-                 self.board[removed_pos] = opponent
-                 if opponent == 1: self.player_pieces_on_board += 1
-                 else: self.ai_pieces_on_board += 1
-        if from_pos == -1:
-            if 0 <= to_pos <= 23 and self.board[to_pos] == player:
-                self.board[to_pos] = 0
-                if player == 1:
-                    self.player_pieces_to_place += 1; self.player_pieces_on_board -= 1
-                else:
-                    self.ai_pieces_to_place += 1; self.ai_pieces_on_board -= 1
-        elif from_pos is not None and from_pos != -2:
-             if 0 <= to_pos <= 23 and self.board[to_pos] == player:
-                  self.board[to_pos] = 0
-                  if 0 <= from_pos <= 23 and self.board[from_pos] == 0:
-                      self.board[from_pos] = player
-
-    def evaluate_board(self):
+    def tablebase_score(self, maximizing_player):
+        # Exact endgame score from the AI's point of view, or None when no table applies.
+        # Tables assume the bomb-free rules, so they are skipped while a bomb is armed or
+        # either side can still arm one.
+        if not self.tablebase or self.bombs_on_board: return None
+        if self.player_bomb_available or self.ai_bomb_available: return None
+        if self.player_pieces_to_place or self.ai_pieces_to_place: return None
+        if self.player_pieces_on_board > 3 and self.ai_pieces_on_board > 3: return None
+        mover = 2 if maximizing_player else 1
+        hit = self.tablebase.probe(self.bitboards[mover], self.bitboards[3 - mover])
+        if hit is None: return None
+        result, distance = hit
+        if result == tablebase.DRAW: return 0
+        score = WIN_SCORE - distance
+        return score if (result == tablebase.WIN) == maximizing_player else -score
+
+    def book_key(self, maximizing_player):
+        return opening_book.position_key(
+            self.bitboards[1], self.bitboards[2], self.player_pieces_to_place, self.ai_pieces_to_place,
+            maximizing_player, self.player_bomb_available, self.ai_bomb_available)
+
+    def book_move(self, maximizing_player):
+        # Full move details from the opening book, or None outside of it.
+        if not self.opening_book or self.bombs_on_board: return None
+        if not (self.player_pieces_to_place or self.ai_pieces_to_place): return None
+        full_move = self.opening_book.lookup(*self.book_key(maximizing_player))
+        if full_move is None: return None
+        player = 2 if maximizing_player else 1
+        move, remove_pos = full_move
+        if not self._legal_move(move, player): return None
+        if remove_pos is not None and not (self.move_creates_mill_heuristic(move, player) and self.is_valid_removal(remove_pos, player)):
+            return None
+        return full_move
+
+    def evaluate_board(self, maximizing_player=None):
         if self.is_game_over():
             if self.winner == "AI": return 10000
             if self.winner == "Player": return -10000
             return 0
         self.winner = None
+        if maximizing_player is not None:
+            tb_score = self.tablebase_score(maximizing_player)
+            if tb_score is not None: return tb_score
         ai_pieces = self.ai_pieces_on_board
         player_pieces = self.player_pieces_on_board
         ai_done_placing = self.ai_pieces_to_place == 0
@@ -296,313 +567,692 @@ class NineMensMorris:
         is_flying_phase = ai_can_fly or player_can_fly
         piece_diff = ai_pieces - player_pieces
         pieces_to_place_diff = self.ai_pieces_to_place - self.player_pieces_to_place
-        ai_mills_count = 0
-        player_mills_count = 0
-        ai_almost_mills = 0
-        player_almost_mills = 0
-        for mill in self.mills:
-            counts = {0: 0, 1: 0, 2: 0}
-            for pos in mill: counts[self.board[pos]] += 1
-            if counts[2] == 3: ai_mills_count += 1
-            elif counts[1] == 3: player_mills_count += 1
-            elif counts[2] == 2 and counts[0] == 1: ai_almost_mills += 1
-            elif counts[1] == 2 and counts[0] == 1: player_almost_mills += 1
-        mill_diff = ai_mills_count - player_mills_count
-        almost_mill_diff = ai_almost_mills - player_almost_mills
-        ai_valid_moves = self.get_valid_moves(2)
-        player_valid_moves = self.get_valid_moves(1)
-        mobility_diff = len(ai_valid_moves) - len(player_valid_moves)
-        ai_blocked = 1 if ai_done_placing and not ai_valid_moves else 0
-        player_blocked = 1 if player_done_placing and not player_valid_moves else 0
-        score = 0
-        score += piece_diff * 200
-        score += mill_diff * 300
-        score += pieces_to_place_diff * 5
+        mill_diff = self.mill_counts[2] - self.mill_counts[1]
+        almost_mill_diff = self.near_mill_counts[2] - self.near_mill_counts[1]
+        ai_mobility = self.mobility(2)
+        player_mobility = self.mobility(1)
+        mobility_diff = ai_mobility - player_mobility
+        ai_blocked = 1 if ai_done_placing and not ai_mobility else 0
+        player_blocked = 1 if player_done_placing and not player_mobility else 0
+        (_, w_piece, w_mill, w_to_place, w_bomb_blast, w_near_mill, w_mobility,
+         w_flying_mill, w_flying_near_mill, w_ai_flying, w_player_flying) = self.eval_profile
+        score = piece_diff * w_piece + mill_diff * w_mill + pieces_to_place_diff * w_to_place
+        for bomb in self.bombs_on_board:
+            blast = ADJ_MASK[bomb['position']]
+            score += (popcount(blast & self.bitboards[1]) - popcount(blast & self.bitboards[2])) * w_bomb_blast
         if ai_done_placing or player_done_placing:
-             score += almost_mill_diff * 50
-             score += mobility_diff * 5
+             score += almost_mill_diff * w_near_mill
+             score += mobility_diff * w_mobility
              score += player_blocked * 2000
              score -= ai_blocked * 4000
         if is_flying_phase:
-            score += mill_diff * 100
-            score += almost_mill_diff * 25
-            if ai_can_fly and not player_can_fly: score += 100
-            elif player_can_fly and not ai_can_fly: score -= 150
+            score += mill_diff * w_flying_mill
+            score += almost_mill_diff * w_flying_near_mill
+            if ai_can_fly and not player_can_fly: score += w_ai_flying
+            elif player_can_fly and not ai_can_fly: score += w_player_flying
         if ai_done_placing and ai_pieces < 3: return -10000
         if player_done_placing and player_pieces < 3: return 10000
         if player_blocked: return 10000
         if ai_blocked: return -10000
         return score
 
-    def alpha_beta_search(self, depth, alpha, beta, maximizing_player):
+    def alpha_beta_search(self, depth, alpha, beta, maximizing_player, ply=0):
+        self._count_node()
+        if self._stats is not None: self._stats.node(ply)
+        self._pv_table[ply] = []
+        # The side to move starts its turn by ticking its bombs (the root has ticked already).
+        if ply > 0 and self.bombs_on_board: self.tick_bombs(2 if maximizing_player else 1)
         if self.is_game_over():
             return self.evaluate_board(), None
         if depth == 0:
-            return self.evaluate_board(), None
+            return self.evaluate_board(maximizing_player), None
+        if ply > 0:
+            tb_score = self.tablebase_score(maximizing_player)
+            if tb_score is not None: return tb_score, None
+        key = self.position_key(maximizing_player)
+        alpha_orig, beta_orig = alpha, beta
+        tt_move = None
+        entry = self.tt.probe(key)
+        if self.position_cache is not None and depth >= poscache.MIN_DEPTH and (entry is None or entry[1] < depth):
+            entry = self._probe_position_cache(key, maximizing_player) or entry
+        if entry is not None:
+            _, tt_depth, tt_bound, tt_score, tt_move, _ = entry
+            if tt_depth >= depth:
+                if tt_bound == ttable.EXACT or \
+                   (tt_bound == ttable.LOWER and tt_score >= beta) or (tt_bound == ttable.UPPER and tt_score <= alpha):
+                    self._pv_table[ply] = [tt_move] if tt_move else []
+                    return tt_score, tt_move
+                if tt_bound == ttable.LOWER: alpha = max(alpha, tt_score)
+                else: beta = min(beta, tt_score)
         current_player = 2 if maximizing_player else 1
-        valid_moves = self.get_valid_moves(current_player)
-        if not valid_moves:
-            return self.evaluate_board(), None
         best_full_move_details = None
-        ordered_moves = sorted(valid_moves, key=lambda move: self.move_creates_mill_heuristic(move, current_player), reverse=True)
+        hints = (self._pv_hint(ply, current_player), tt_move)
+        ordered_moves = self._staged_moves(current_player, hints, ply)
+        if depth == 1 and self.batch_eval and self.mobility(current_player) >= BATCH_MIN_MOVES and self._frontier_batchable(current_player):
+            return self._search_frontier(list(ordered_moves), current_player, alpha, beta, key, alpha_orig, beta_orig, ply, hints)
         if maximizing_player:
             max_eval = float('-inf')
-            for move in ordered_moves:
+            for move_index, move in enumerate(ordered_moves):
+                mark = len(self._journal)
                 mill_formed = self.make_move(move, current_player)
-                current_basic_move_details = self.last_ai_move
-                move_branch_eval = float('-inf')
                 best_remove_for_this_move = None
                 if mill_formed:
-                    remove_options = [p for p in range(24) if self.is_valid_removal(p, current_player)]
-                    if not remove_options:
-                        eval_score, _ = self.alpha_beta_search(depth - 1, alpha, beta, False)
-                        move_branch_eval = eval_score
-                    else:
-                        for remove_pos in remove_options:
-                            opponent_val = 1; original_piece = self.board[remove_pos]
-                            self.board[remove_pos] = 0; self.player_pieces_on_board -= 1
-                            disarmed_bomb_during_search = None
-                            for b_search in list(self.bombs_on_board):
-                                if b_search['position'] == remove_pos:
-                                    disarmed_bomb_during_search = b_search
-                                    self.bombs_on_board.remove(b_search)
-                                    break
-                            eval_score, _ = self.alpha_beta_search(depth - 1, alpha, beta, False)
-                            if disarmed_bomb_during_search:
-                                self.bombs_on_board.append(disarmed_bomb_during_search)
-                            self.board[remove_pos] = original_piece; self.player_pieces_on_board += 1
-                            if eval_score > move_branch_eval:
-                                move_branch_eval = eval_score; best_remove_for_this_move = remove_pos
+                    move_branch_eval, best_remove_for_this_move, branch_pv = self._search_removals(current_player, move, depth, alpha, beta, ply, hints)
                 else:
-                    eval_score, _ = self.alpha_beta_search(depth - 1, alpha, beta, False)
-                    move_branch_eval = eval_score
-                self.undo_move(current_basic_move_details, current_player)
+                    move_branch_eval, _ = self.alpha_beta_search(depth - 1, alpha, beta, False, ply + 1)
+                    branch_pv = self._pv_table[ply + 1]
+                self.undo_to(mark)
+                self._follow_pv = False
                 if move_branch_eval > max_eval:
                     max_eval = move_branch_eval; best_full_move_details = (move, best_remove_for_this_move)
+                    self._pv_table[ply] = [best_full_move_details] + branch_pv
                 alpha = max(alpha, max_eval)
-                if beta <= alpha: break
+                if beta <= alpha:
+                    self._record_cutoff(current_player, move, mill_formed, depth, ply, move_index)
+                    break
+            if best_full_move_details is None: return self.evaluate_board(), None   # no move at all
+            self._store_search_result(key, depth, max_eval, alpha_orig, beta_orig, best_full_move_details, True)
             return max_eval, best_full_move_details
         else:
             min_eval = float('inf')
-            for move in ordered_moves:
+            for move_index, move in enumerate(ordered_moves):
+                mark = len(self._journal)
                 mill_formed = self.make_move(move, current_player)
-                current_basic_move_details = self.last_player_move
-                move_branch_eval = float('inf')
                 best_remove_for_this_move = None
                 if mill_formed:
-                    remove_options = [p for p in range(24) if self.is_valid_removal(p, current_player)]
-                    if not remove_options:
-                        eval_score, _ = self.alpha_beta_search(depth - 1, alpha, beta, True)
-                        move_branch_eval = eval_score
-                    else:
-                        for remove_pos in remove_options:
-                            opponent_val = 2; original_piece = self.board[remove_pos]
-                            self.board[remove_pos] = 0; self.ai_pieces_on_board -= 1
-                            disarmed_bomb_during_search = None
-                            for b_search in list(self.bombs_on_board):
-                                if b_search['position'] == remove_pos:
-                                    disarmed_bomb_during_search = b_search
-                                    self.bombs_on_board.remove(b_search)
-                                    break
-                            eval_score, _ = self.alpha_beta_search(depth - 1, alpha, beta, True)
-                            if disarmed_bomb_during_search:
-                                self.bombs_on_board.append(disarmed_bomb_during_search)
-                            self.board[remove_pos] = original_piece; self.ai_pieces_on_board += 1
-                            if eval_score < move_branch_eval:
-                                move_branch_eval = eval_score; best_remove_for_this_move = remove_pos
+                    move_branch_eval, best_remove_for_this_move, branch_pv = self._search_removals(current_player, move, depth, alpha, beta, ply, hints)
                 else:
-                    eval_score, _ = self.alpha_beta_search(depth - 1, alpha, beta, True)
-                    move_branch_eval = eval_score
-                self.undo_move(current_basic_move_details, current_player)
+                    move_branch_eval, _ = self.alpha_beta_search(depth - 1, alpha, beta, True, ply + 1)
+                    branch_pv = self._pv_table[ply + 1]
+                self.undo_to(mark)
+                self._follow_pv = False
                 if move_branch_eval < min_eval:
                     min_eval = move_branch_eval; best_full_move_details = (move, best_remove_for_this_move)
+                    self._pv_table[ply] = [best_full_move_details] + branch_pv
                 beta = min(beta, min_eval)
-                if beta <= alpha: break
+                if beta <= alpha:
+                    self._record_cutoff(current_player, move, mill_formed, depth, ply, move_index)
+                    break
+            if best_full_move_details is None: return self.evaluate_board(), None   # no move at all
+            self._store_search_result(key, depth, min_eval, alpha_orig, beta_orig, best_full_move_details, False)
             return min_eval, best_full_move_details
 
+    def _search_removals(self, player, move, depth, alpha, beta, ply, hints):
+        # Searches each removal after `player` formed a mill with `move`.
+        # Returns (best eval for player, best removal, its principal variation).
+        maximizing_child = player == 1
+        remove_options = self._ordered_removals(player, move, hints)
+        if not remove_options:
+            eval_score, _ = self.alpha_beta_search(depth - 1, alpha, beta, maximizing_child, ply + 1)
+            return eval_score, None, self._pv_table[ply + 1]
+        best_eval = float('-inf') if player == 2 else float('inf')
+        best_remove = None; best_pv = []
+        for remove_pos in remove_options:
+            mark = len(self._journal)
+            self._remove_piece(remove_pos)
+            eval_score, _ = self.alpha_beta_search(depth - 1, alpha, beta, maximizing_child, ply + 1)
+            self.undo_to(mark)
+            if (eval_score > best_eval) if player == 2 else (eval_score < best_eval):
+                best_eval = eval_score; best_remove = remove_pos; best_pv = self._pv_table[ply + 1]
+            self._follow_pv = False
+        return best_eval, best_remove, best_pv
+
+    def _aspiration_search(self, depth, previous_score, maximizing_player):
+        # Root PVS in a window around the last iteration's score, widened and re-searched on a
+        # fail high or low. Scores in and out are from the AI's point of view.
+        sign = 1 if maximizing_player else -1
+        if previous_score is None or abs(previous_score) >= PROVEN_SCORE:
+            score, best = self.pvs_search(depth, -SCORE_BOUND, SCORE_BOUND, maximizing_player)
+            return sign * score, best
+        center = sign * previous_score
+        window = ASPIRATION_WINDOW
+        alpha, beta = max(-SCORE_BOUND, center - window), min(SCORE_BOUND, center + window)
+        while True:
+            score, best = self.pvs_search(depth, alpha, beta, maximizing_player)
+            if self._stats is not None and not alpha < score < beta: self._stats.aspiration_researches += 1
+            if score <= alpha and alpha > -SCORE_BOUND: alpha = max(-SCORE_BOUND, score - window)
+            elif score >= beta and beta < SCORE_BOUND: beta = min(SCORE_BOUND, score + window)
+            else: return sign * score, best
+            window *= 4
+            self._follow_pv = bool(self._prev_pv)
+
+    def pvs_search(self, depth, alpha, beta, maximizing_player, ply=0):
+        # Negamax principal variation search: scores are from the side to move's point of view.
+        # The first action gets the full window, later ones a null window that is re-searched
+        # when it fails high; late quiet moves are first searched one ply shallower and
+        # verified at full depth when they beat alpha. Shares the TT with alpha_beta_search,
+        # whose entries hold AI-view scores and bounds.
+        self._count_node()
+        if self._stats is not None: self._stats.node(ply)
+        self._pv_table[ply] = []
+        sign = 1 if maximizing_player else -1
+        if ply > 0 and self.bombs_on_board: self.tick_bombs(2 if maximizing_player else 1)
+        if self.is_game_over():
+            return sign * self.evaluate_board(), None
+        if depth <= 0:
+            return sign * self.evaluate_board(maximizing_player), None
+        if ply > 0:
+            tb_score = self.tablebase_score(maximizing_player)
+            if tb_score is not None: return sign * tb_score, None
+        key = self.position_key(maximizing_player)
+        alpha_orig, beta_orig = alpha, beta
+        tt_move = None
+        entry = self.tt.probe(key)
+        if self.position_cache is not None and depth >= poscache.MIN_DEPTH and (entry is None or entry[1] < depth):
+            entry = self._probe_position_cache(key, maximizing_player) or entry
+        if entry is not None:
+            _, tt_depth, tt_bound, tt_score, tt_move, _ = entry
+            if tt_depth >= depth:
+                tt_score *= sign
+                if sign < 0 and tt_bound != ttable.EXACT: tt_bound = ttable.LOWER + ttable.UPPER - tt_bound
+                if tt_bound == ttable.EXACT or \
+                   (tt_bound == ttable.LOWER and tt_score >= beta) or (tt_bound == ttable.UPPER and tt_score <= alpha):
+                    self._pv_table[ply] = [tt_move] if tt_move else []
+                    return tt_score, tt_move
+                if tt_bound == ttable.LOWER: alpha = max(alpha, tt_score)
+                else: beta = min(beta, tt_score)
+        current_player = 2 if maximizing_player else 1
+        hints = (self._pv_hint(ply, current_player), tt_move)
+        ordered_moves = self._staged_moves(current_player, hints, ply)
+        best_score = -SCORE_BOUND - 1
+        best_full_move_details = None
+        searched = 0
+        for move_index, move in enumerate(ordered_moves):
+            mark = len(self._journal)
+            mill_formed = self.make_move(move, current_player)
+            removals = (self._ordered_removals(current_player, move, hints) or [None]) if mill_formed else [None]
+            reduce = not mill_formed and move[1] != -2 and depth >= LMR_MIN_DEPTH and move_index >= LMR_MIN_INDEX
+            for remove_pos in removals:
+                removal_mark = len(self._journal)
+                if remove_pos is not None: self._remove_piece(remove_pos)
+                if searched == 0:
+                    score = -self.pvs_search(depth - 1, -beta, -alpha, not maximizing_player, ply + 1)[0]
+                else:
+                    # Re-searches start from the child's entry: its bomb tick must not be applied twice.
+                    child_mark = len(self._journal)
+                    score = -self.pvs_search(depth - 1 - reduce, -alpha - 1, -alpha, not maximizing_player, ply + 1)[0]
+                    if reduce and score > alpha:
+                        if self._stats is not None: self._stats.lmr_researches += 1
+                        self.undo_to(child_mark)
+                        score = -self.pvs_search(depth - 1, -alpha - 1, -alpha, not maximizing_player, ply + 1)[0]
+                    if alpha < score < beta:
+                        if self._stats is not None: self._stats.pvs_researches += 1
+                        self.undo_to(child_mark)
+                        score = -self.pvs_search(depth - 1, -beta, -alpha, not maximizing_player, ply + 1)[0]
+                self.undo_to(removal_mark)
+                self._follow_pv = False
+                searched += 1
+                if score > best_score:
+                    best_score = score; best_full_move_details = (move, remove_pos)
+                    self._pv_table[ply] = [best_full_move_details] + self._pv_table[ply + 1]
+                alpha = max(alpha, score)
+                if alpha >= beta: break
+            self.undo_to(mark)
+            if alpha >= beta:
+                self._record_cutoff(current_player, move, mill_formed, depth, ply, move_index)
+                break
+        if searched == 0: return sign * self.evaluate_board(), None   # no move at all
+        if best_score <= alpha_orig: bound = ttable.UPPER
+        elif best_score >= beta_orig: bound = ttable.LOWER
+        else: bound = ttable.EXACT
+        if sign < 0 and bound != ttable.EXACT: bound = ttable.LOWER + ttable.UPPER - bound
+        self.tt.store(key, depth, bound, sign * best_score, best_full_move_details)
+        if self.position_cache is not None and depth >= poscache.MIN_DEPTH:
+            self.position_cache.store(self.to_compact(), maximizing_player, depth, bound, sign * best_score, best_full_move_details)
+        return best_score, best_full_move_details
+
+    def _frontier_batchable(self, player):
+        # Children can be scored straight from bitboards unless bombs are armed (their ticks need
+        # the rules) or a child might be a tablebase position.
+        if not batcheval.AVAILABLE or self.bombs_on_board: return False
+        if self.tablebase:
+            own_to_place, opp_to_place = (self.player_pieces_to_place, self.ai_pieces_to_place)[::1 if player == 1 else -1]
+            if opp_to_place == 0 and own_to_place <= 1 and min(self.player_pieces_on_board, self.ai_pieces_on_board) <= 4:
+                return False
+        return True
+
+    def _search_frontier(self, ordered_moves, player, alpha, beta, key, alpha_orig, beta_orig, ply, hints):
+        # Depth 1: every child is a leaf, so the children are built as bitboards without make/undo,
+        # scored in one batcheval call, and the alpha-beta loop is then run over the scores. The
+        # result, PV, cutoff and table entry are the same as alpha_beta_search's.
+        own, opp = self.bitboards[player], self.bitboards[3 - player]
+        removals = self.removal_mask(player)
+        own_to_place = self.player_pieces_to_place if player == 1 else self.ai_pieces_to_place
+        opp_to_place = self.ai_pieces_to_place if player == 1 else self.player_pieces_to_place
+        leaves = []   # (move index, removal, own bitboard, opponent bitboard, bomb mask, mill formed)
+        for move_index, (to_pos, from_pos) in enumerate(ordered_moves):
+            if from_pos == -2:
+                leaves.append((move_index, None, own, opp, BIT[to_pos], False))
+                continue
+            child = own | BIT[to_pos] if from_pos == -1 else own ^ BIT[from_pos] | BIT[to_pos]
+            mill_formed = bitboard.forms_mill(child, to_pos)
+            if mill_formed and removals:
+                for remove_pos in self._ordered_removals(player, (to_pos, from_pos), hints):
+                    leaves.append((move_index, remove_pos, child, opp ^ BIT[remove_pos], 0, True))
+            else:
+                leaves.append((move_index, None, child, opp, 0, mill_formed))
+        self.nodes += len(leaves) - 1
+        self._count_node()
+        stats = self._stats
+        if stats is not None:
+            for _ in leaves: stats.node(ply + 1)
+            stats.leaf_evals += len(leaves)
+            start = time.perf_counter()
+        own_bbs = [leaf[2] for leaf in leaves]; opp_bbs = [leaf[3] for leaf in leaves]
+        own_places = [own_to_place - (ordered_moves[leaf[0]][1] == -1) for leaf in leaves]
+        opp_places = [opp_to_place] * len(leaves)
+        bombs = batcheval.mask_rows([leaf[4] for leaf in leaves]) if any(leaf[4] for leaf in leaves) else None
+        if player == 1: sides = (own_bbs, opp_bbs, own_places, opp_places)
+        else: sides = (opp_bbs, own_bbs, opp_places, own_places)
+        scores = batcheval.evaluate_bitboards(*sides, bombs, self.eval_profile).tolist()
+        if stats is not None: stats.eval_time += time.perf_counter() - start
+        maximizing = player == 2
+        best_score = float('-inf') if maximizing else float('inf')
+        best_full_move_details = None
+        leaf = 0
+        for move_index, move in enumerate(ordered_moves):
+            # Best removal first, as _search_removals picks it.
+            move_score = None
+            while leaf < len(leaves) and leaves[leaf][0] == move_index:
+                score = scores[leaf]
+                if move_score is None or (score > move_score if maximizing else score < move_score):
+                    move_score, remove_pos, mill_formed = score, leaves[leaf][1], leaves[leaf][5]
+                leaf += 1
+            if (move_score > best_score) if maximizing else (move_score < best_score):
+                best_score = move_score; best_full_move_details = (move, remove_pos)
+            if maximizing: alpha = max(alpha, best_score)
+            else: beta = min(beta, best_score)
+            if beta <= alpha:
+                self._record_cutoff(player, move, mill_formed, 1, ply, move_index)
+                break
+        self._follow_pv = False
+        self._pv_table[ply] = [best_full_move_details]
+        self._pv_table[ply + 1] = []
+        self._store_search_result(key, 1, best_score, alpha_orig, beta_orig, best_full_move_details)
+        return best_score, best_full_move_details
+
+    def _legal_move(self, move, player):
+        # Whether get_valid_moves or bomb_moves would give `move` (a PV, table or killer move).
+        to_pos, from_pos = move
+        if from_pos == -2: return move in self.bomb_moves(player)
+        if from_pos == -1: return (self.player_pieces_to_place if player == 1 else self.ai_pieces_to_place) > 0 and self.board[to_pos] == 0
+        return self.is_valid_move(from_pos, to_pos, player)
+
+    def _staged_moves(self, player, hints, ply):
+        # Moves in search order, one stage at a time, so a cutoff skips building the later
+        # stages: the hint moves (PV, then table move), mill-closing moves, this ply's killers,
+        # moves onto the open point of an opponent near mill, the rest by history score, and
+        # bomb arming last. Closing and blocking moves are read off the per-mill piece counts.
+        done = set()
+        for hint in hints:
+            if hint is not None and hint[0] not in done and self._legal_move(hint[0], player):
+                done.add(hint[0]); yield hint[0]
+        own, empty = self.bitboards[player], self.bitboards[0]
+        placing = (self.player_pieces_to_place if player == 1 else self.ai_pieces_to_place) > 0
+        flying = not placing and (self.player_pieces_on_board if player == 1 else self.ai_pieces_on_board) <= 3
+        def moves_onto(target):
+            point = bitboard.bits(target)[0]
+            if placing: return [(point, -1)]
+            return [(point, from_pos) for from_pos in bitboard.bits(own if flying else ADJ_MASK[point] & own)]
+        # A mill with two own pieces is closed by any move onto its open point from outside it.
+        closing = {}
+        counts = self.mill_piece_counts[player]
+        for mill_id, mill in enumerate(MILL_MASKS):
+            if counts[mill_id] == 2 and mill & empty: closing.setdefault(mill & empty, []).append(mill)
+        for target, mills in closing.items():
+            for move in moves_onto(target):
+                if move not in done and (move[1] == -1 or not all(mill & BIT[move[1]] for mill in mills)):
+                    done.add(move); yield move
+        for killer in self._killers[ply]:
+            if killer is not None and killer not in done and self._legal_move(killer, player):
+                done.add(killer); yield killer
+        history = self._history[player]
+        blocking = []
+        counts = self.mill_piece_counts[3 - player]
+        for mill_id, mill in enumerate(MILL_MASKS):
+            if counts[mill_id] == 2 and mill & empty:
+                blocking.extend(move for move in moves_onto(mill & empty) if move not in done)
+        blocking.sort(key=lambda move: history[(move[1] + 1) * 24 + move[0]], reverse=True)
+        for move in blocking:
+            if move not in done: done.add(move); yield move
+        rest = [move for move in self.get_valid_moves(player) if move not in done]
+        rest.sort(key=lambda move: history[(move[1] + 1) * 24 + move[0]], reverse=True)
+        yield from rest
+        if self.player_bomb_available if player == 1 else self.ai_bomb_available:
+            yield from (move for move in self.bomb_moves(player) if move not in done)
+
+    def _record_cutoff(self, player, move, mill_formed, depth, ply, move_index):
+        if self._stats is not None: self._stats.cutoff(move_index)
+        if mill_formed or move[1] == -2: return
+        killers = self._killers[ply]
+        if killers[0] != move: killers[1] = killers[0]; killers[0] = move
+        self._history[player][(move[1] + 1) * 24 + move[0]] += depth * depth
+
+    def _age_ordering(self):
+        for killers in self._killers: killers[0] = killers[1] = None
+        for player in (1, 2): self._history[player] = [h >> 1 for h in self._history[player]]
+
+    def _ordered_removals(self, player, move, hints):
+        remove_options = bitboard.bits(self.removal_mask(player))
+        for hint in reversed(hints):
+            if hint is not None and hint[0] == move and hint[1] in remove_options:
+                remove_options = (hint[1],) + tuple(p for p in remove_options if p != hint[1])
+        return remove_options
+
+    def _pv_hint(self, ply, player):
+        # Previous iteration's PV move while the search is still walking down that line.
+        if self._follow_pv and ply < len(self._prev_pv) and self._legal_move(self._prev_pv[ply][0], player):
+            return self._prev_pv[ply]
+        self._follow_pv = False
+        return None
+
+    def _count_node(self):
+        self.nodes += 1
+        if self.nodes >= self._next_budget_check:
+            self._next_budget_check = self.nodes + 256
+            if self._deadline is not None and time.time() >= self._deadline: raise SearchTimeout()
+            if self.stop_search: raise SearchTimeout()
+            if self._node_limit is not None:
+                if self.nodes >= self._node_limit: raise SearchTimeout()
+                self._next_budget_check = min(self._next_budget_check, self._node_limit)
+
+    def iterative_deepening(self, maximizing_player=True, time_limit=None, node_limit=None, max_depth=None):
+        # Deepens until the time/node budget runs out and returns the last completed iteration.
+        if self.collect_stats and self._stats is None:
+            stats = searchstats.SearchStats(2 if maximizing_player else 1)
+            with searchstats.instrument(self, stats):
+                result = self.iterative_deepening(maximizing_player, time_limit, node_limit, max_depth)
+            stats.score, stats.move = result
+            stats.depth, stats.nodes = self.search_depth_reached, self.nodes
+            stats.iteration_nodes = [nodes for _, _, nodes in self.search_iterations]
+            self.last_search_stats = stats
+            return result
+        if time_limit is None: time_limit = self.search_time_limit
+        if node_limit is None: node_limit = self.search_node_limit
+        if max_depth is None: max_depth = self.max_search_depth
+        max_depth = min(max_depth, MAX_SEARCH_PLY - 1)
+        mark, winner = len(self._journal), self.winner
+        start_time = time.time()
+        self.tt.new_search()
+        self._age_ordering()
+        self.nodes = 0
+        self._deadline = None; self._node_limit = None; self._next_budget_check = 256
+        self._prev_pv = []
+        self.search_depth_reached = 0
+        self.search_iterations = []
+        result = (self.evaluate_board(), None)
+        try:
+            for depth in range(1, max_depth + 1):
+                self._follow_pv = bool(self._prev_pv)
+                if self.search_algorithm == 'pvs':
+                    score, best_full_move_details = self._aspiration_search(depth, result[0] if depth > 1 else None, maximizing_player)
+                else:
+                    score, best_full_move_details = self.alpha_beta_search(depth, float('-inf'), float('inf'), maximizing_player)
+                result = (score, best_full_move_details)
+                self.search_depth_reached = depth
+                self.search_iterations.append((depth, time.time() - start_time, self.nodes))
+                self._prev_pv = self._pv_table[0]
+                if best_full_move_details is None or abs(score) >= PROVEN_SCORE: break
+                # Depth 1 always completes so there is a move to play; the budget applies from here on.
+                if time_limit is not None: self._deadline = start_time + time_limit
+                if node_limit is not None: self._node_limit = node_limit
+                self._next_budget_check = self.nodes
+        except SearchTimeout:
+            self.undo_to(mark)
+        finally:
+            self._deadline = None; self._node_limit = None
+            self.winner = winner
+        return result
+
+    def parallel_search(self, maximizing_player=True, time_limit=None, max_depth=None, node_limit=None):
+        # Root-split iterative deepening over a pool of search_workers processes.
+        import parallel_search
+        if self._parallel_searcher is None or self._parallel_searcher.workers != self.search_workers:
+            if self._parallel_searcher is not None: self._parallel_searcher.close()
+            self._parallel_searcher = parallel_search.ParallelSearcher(self.search_workers)
+        if time_limit is None: time_limit = self.search_time_limit
+        if max_depth is None: max_depth = self.max_search_depth
+        if node_limit is None: node_limit = self.search_node_limit
+        result = self._parallel_searcher.search(self, maximizing_player, time_limit, max_depth, PROVEN_SCORE, node_limit)
+        self.search_depth_reached = self._parallel_searcher.depth_reached
+        self.nodes = self._parallel_searcher.nodes
+        return result
+
+    def mcts_search(self, maximizing_player=True, time_limit=None, node_limit=None):
+        # Monte Carlo tree search (mcts.py), on search_workers processes when there are several.
+        import mcts
+        if self._mcts_searcher is None or self._mcts_searcher.workers != self.search_workers:
+            if self._mcts_searcher is not None: self._mcts_searcher.close()
+            self._mcts_searcher = mcts.MCTSSearcher(self.search_workers)
+        if time_limit is None: time_limit = self.search_time_limit
+        if node_limit is None: node_limit = self.search_node_limit
+        result = self._mcts_searcher.search(self, maximizing_player, time_limit, node_limit)
+        self.search_depth_reached = self._mcts_searcher.depth_reached
+        self.nodes = self._mcts_searcher.playouts
+        return result
+
+    def _start_pondering(self, player):
+        # Background search of the engine's answers while `player` thinks; see ponder.py.
+        import ponder
+        if self._ponderer is None: self._ponderer = ponder.Ponderer(self)
+        self._ponderer.start(self, player)
+
+    def bounded_search(self, depth, alpha, beta, maximizing_player, deadline=None, ply=0, node_limit=None):
+        # One fixed-depth search; returns (score, best move) or None if the deadline or node limit came first.
+        mark = len(self._journal)
+        self.nodes = 0
+        self._deadline = deadline; self._node_limit = node_limit
+        self._next_budget_check = 256 if node_limit is None else min(256, node_limit)
+        self._follow_pv = False
+        try:
+            return self.alpha_beta_search(depth, alpha, beta, maximizing_player, ply)
+        except SearchTimeout:
+            self.undo_to(mark)
+            return None
+        finally:
+            self._deadline = None
+
+    def to_compact(self):
+        # Small picklable snapshot of everything search depends on; see load_compact.
+        return (self.bitboards[1], self.bitboards[2], self.player_pieces_to_place, self.ai_pieces_to_place,
+                self.player_bomb_available, self.ai_bomb_available, self.next_bomb_id,
+                tuple((b['id'], b['player_id'], b['position'], b['timer']) for b in self.bombs_on_board))
+
+    def load_compact(self, state):
+        player_bb, ai_bb, self.player_pieces_to_place, self.ai_pieces_to_place, \
+            self.player_bomb_available, self.ai_bomb_available, self.next_bomb_id, bombs = state
+        self.board = [0] * 24
+        for pos in bitboard.bits(player_bb): self.board[pos] = 1
+        for pos in bitboard.bits(ai_bb): self.board[pos] = 2
+        self._sync_from_board()
+        self.player_pieces_on_board = popcount(player_bb)
+        self.ai_pieces_on_board = popcount(ai_bb)
+        self.bombs_on_board = [{'id': i, 'player_id': owner, 'position': pos, 'timer': timer} for i, owner, pos, timer in bombs]
+        self.update_phase()
+        self.last_player_move = self.last_ai_move = None
+        self.winner = None
+        self._journal.clear()
+        self.history = journal.GameTree(self)
+
+    def _store_search_result(self, key, depth, score, alpha_orig, beta_orig, best_full_move_details, maximizing_player=None):
+        if score <= alpha_orig: bound = ttable.UPPER
+        elif score >= beta_orig: bound = ttable.LOWER
+        else: bound = ttable.EXACT
+        self.tt.store(key, depth, bound, score, best_full_move_details)
+        if self.position_cache is not None and depth >= poscache.MIN_DEPTH:
+            self.position_cache.store(self.to_compact(), maximizing_player, depth, bound, score, best_full_move_details)
+
+    def _probe_position_cache(self, key, maximizing_player):
+        # A TT-style entry from the persistent cache, copied into the TT, or None.
+        hit = self.position_cache.probe(self.to_compact(), maximizing_player)
+        if hit is None: return None
+        depth, bound, score, best_full_move_details = hit
+        self.tt.store(key, depth, bound, score, best_full_move_details)
+        return key, depth, bound, score, best_full_move_details, self.tt.generation
+
     def move_creates_mill_heuristic(self, move, player):
         to_pos, from_pos = move
         if self.board[to_pos] != 0: return False
-        original_from_val = 0
+        own = self.bitboards[player]
         if from_pos != -1:
              if self.board[from_pos] != player: return False
-             original_from_val = self.board[from_pos]
-             self.board[from_pos] = 0
-        self.board[to_pos] = player
-        forms_mill = self.forms_mill(to_pos, player)
-        self.board[to_pos] = 0
-        if from_pos != -1:
-            self.board[from_pos] = original_from_val
-        return forms_mill
+             own ^= BIT[from_pos]
+        return bitboard.forms_mill(own | BIT[to_pos], to_pos)
 
-    def _place_bomb(self, player_id, position):
-        self.next_bomb_id += 1
-        bomb_data = {'id': self.next_bomb_id, 'player_id': player_id, 'position': position, 'timer': self.BOMB_INITIAL_TIMER}
-        self.bombs_on_board.append(bomb_data)
-        
-        pos_coord = self.coordinates.get(position, f"?({position})")
-        if player_id == 1:
-            self.player_bomb_available = False
-            print(f"Player placed Time Bomb (ID {bomb_data['id']}) on their piece at {pos_coord}.")
-            self.last_player_move = (position, -2, None)
-        else:
-            self.ai_bomb_available = False
-            print(f"AI placed Time Bomb (ID {bomb_data['id']}) on their piece at {pos_coord}.")
-            self.last_ai_move = (position, -2, None)
+    # Time bombs. arm_bomb and tick_bombs are the rules themselves: journaled, without output,
+    # and returning the events they caused, so search plays them inside its tree and the
+    # interactive paths describe the same events afterwards with _render_bomb_events.
+    def can_arm(self, position, player):
+        available = self.player_bomb_available if player == 1 else self.ai_bomb_available
+        return available and 0 <= position <= 23 and self.board[position] == player and \
+            not any(b['position'] == position for b in self.bombs_on_board)
 
-    def _handle_bomb_updates_and_detonations(self, current_player_id_turn):
-        bombs_detonated_this_round = False
-        bombs_to_remove_after_detonation = []
-        detonation_queue = []
+    def arm_bomb(self, player, position):
+        bomb = {'id': self.next_bomb_id + 1, 'player_id': player, 'position': position, 'timer': self.BOMB_INITIAL_TIMER}
+        self._journal.append((journal.ARM, player, bomb, self.last_player_move if player == 1 else self.last_ai_move))
+        self._arm(player, bomb)
+        return [('armed', bomb)]
 
-        for bomb in self.bombs_on_board:
-            if bomb['player_id'] == current_player_id_turn:
-                bomb['timer'] -= 1
-                if bomb['timer'] <= 0:
-                    detonation_queue.append(bomb)
-        
-        if detonation_queue:
-            bombs_detonated_this_round = True
-            print("\n--- Bomb Detonation Phase ---")
-            self.display_board()
-            time.sleep(1)
+    def tick_bombs(self, player):
+        # Start of player's turn: their bombs count down and those at zero explode, in order.
+        # Each blast returns every adjacent piece to its owner's place pool and disarms bombs on them.
+        own = [b for b in self.bombs_on_board if b['player_id'] == player]
+        if not own: return []
+        self._journal.append((journal.TICK, player))
+        self._tick(player, -1)
+        events = []
+        for bomb in own:
+            if bomb['timer'] > 0 or not any(b is bomb for b in self.bombs_on_board): continue
+            hits = []
+            for adj_pos in self.adjacent_positions[bomb['position']]:
+                owner = self.board[adj_pos]
+                if owner == 0: continue
+                bomb_index, disarmed = -1, None
+                for i, b in enumerate(self.bombs_on_board):
+                    if b['position'] == adj_pos: bomb_index, disarmed = i, b; break
+                self._journal.append((journal.BLAST, adj_pos, owner, bomb_index, disarmed))
+                self._blast(adj_pos, owner, bomb_index)
+                hits.append((adj_pos, owner, disarmed))
+            self._remove_bomb(bomb)
+            events.append(('exploded', bomb, hits))
+        return events
 
-            for bomb_to_detonate in detonation_queue:
-                self._detonate_bomb(bomb_to_detonate)
-                bombs_to_remove_after_detonation.append(bomb_to_detonate)
-            
-            for btd in bombs_to_remove_after_detonation:
-                if btd in self.bombs_on_board:
-                    self.bombs_on_board.remove(btd)
-            
-            print("--- Detonation Phase Complete ---")
-        
-        return bombs_detonated_this_round
-
-    def _detonate_bomb(self, bomb_info):
-        bomb_pos = bomb_info['position']
-        bomb_owner_str = "Player's" if bomb_info['player_id'] == 1 else "AI's"
-        bomb_coord = self.coordinates.get(bomb_pos, f"?({bomb_pos})")
-        
-        print(f"\nKABOOM! {bomb_owner_str} Time Bomb (ID {bomb_info['id']}) at {bomb_coord} explodes!")
-        
-        pieces_removed_count = 0
-        for adj_pos in self.adjacent_positions[bomb_pos]:
-            if self.board[adj_pos] != 0:
+    def bomb_moves(self, player):
+        # Arming moves (position, -2) worth searching: own unarmed pieces next to an opponent piece.
+        if not (self.player_bomb_available if player == 1 else self.ai_bomb_available): return []
+        targets = self.bitboards[player]
+        for bomb in self.bombs_on_board: targets &= ~BIT[bomb['position']]
+        opponent_bb = self.bitboards[3 - player]
+        return [(pos, -2) for pos in bitboard.bits(targets) if ADJ_MASK[pos] & opponent_bb]
+
+    def _render_bomb_events(self, events):
+        for event in events:
+            bomb = event[1]
+            owner_str = "Player" if bomb['player_id'] == 1 else "AI"
+            bomb_coord = self.coordinates.get(bomb['position'], f"?({bomb['position']})")
+            if event[0] == 'armed':
+                self._say(f"{owner_str} placed Time Bomb (ID {bomb['id']}) on their piece at {bomb_coord}.")
+                continue
+            self._say(f"\nKABOOM! {owner_str}'s Time Bomb (ID {bomb['id']}) at {bomb_coord} explodes!")
+            for adj_pos, owner, disarmed in event[2]:
                 adj_coord = self.coordinates.get(adj_pos, f"?({adj_pos})")
-                # --- Remove bomb if present on adjacent piece ---
-                for bomb in list(self.bombs_on_board):
-                    if bomb['position'] == adj_pos:
-                        self.bombs_on_board.remove(bomb)
-                        owner_str = "Player's" if bomb['player_id'] == 1 else "AI's"
-                        print(f"  {owner_str} Time Bomb (ID {bomb['id']}) at {adj_coord} was destroyed in the blast and disarmed.")
-                        time.sleep(0.2)
-                        break
-                # --- END Remove bomb on adjacent ---
-                if self.board[adj_pos] == 1:
-                    print(f"  Player's piece 'O' at {adj_coord} destroyed and returned to place pool.")
-                    self.board[adj_pos] = 0
-                    self.player_pieces_on_board -= 1
-                    self.player_pieces_to_place += 1
-                    pieces_removed_count +=1
-                elif self.board[adj_pos] == 2:
-                    print(f"  AI's piece 'X' at {adj_coord} destroyed and returned to place pool.")
-                    self.board[adj_pos] = 0
-                    self.ai_pieces_on_board -= 1
-                    self.ai_pieces_to_place += 1
-                    pieces_removed_count +=1
-        
-        if pieces_removed_count == 0:
-            print("  No pieces were in the blast radius.")
-        
-        time.sleep(0.5)
+                if disarmed is not None:
+                    disarmed_owner = "Player's" if disarmed['player_id'] == 1 else "AI's"
+                    self._say(f"  {disarmed_owner} Time Bomb (ID {disarmed['id']}) at {adj_coord} was destroyed in the blast and disarmed.")
+                    self._pause(0.2)
+                piece = "Player's piece 'O'" if owner == 1 else "AI's piece 'X'"
+                self._say(f"  {piece} at {adj_coord} destroyed and returned to place pool.")
+            if not event[2]:
+                self._say("  No pieces were in the blast radius.")
+            self._pause(0.5)
+
+    def _place_bomb(self, player_id, position):
+        self._render_bomb_events(self.arm_bomb(player_id, position))
+
+    def _handle_bomb_updates_and_detonations(self, current_player_id_turn):
+        events = self.tick_bombs(current_player_id_turn)
+        if not events: return False
+        self._say("\n--- Bomb Detonation Phase ---")
+        self._render_bomb_events(events)
+        self._say("--- Detonation Phase Complete ---")
+        return True
 
     def ai_move(self):
-        if self.ai_bomb_available and self.ai_pieces_on_board > 0 and (self.phase > 1 or self.ai_pieces_to_place < 7):
-            best_bomb_target_pos = -1
-            best_bomb_score = -100
+        self.engine_turn(2)
 
-            ai_owned_positions = [i for i, piece_val in enumerate(self.board) if piece_val == 2]
-            
-            for my_pos in ai_owned_positions:
-                if any(b['position'] == my_pos for b in self.bombs_on_board):
-                    continue
+    def engine_turn(self, player):
+        # One engine turn for `player`: the book or searched move plus its removal, or arming the
+        # bomb when search prefers that. All output goes through _say/_pause/_show_board, so
+        # with quiet set this is the headless core. Returns the move tuple played, or None.
+        name = "AI" if player == 2 else "Player"
+        pondered = self._ponderer.finish(self, player) if self._ponderer is not None else None
+        best_full_move_details = self.book_move(player == 2)
+        if best_full_move_details is not None:
+            self._say(f"{name} plays from its opening book.")
+        elif pondered is not None:
+            score, best_full_move_details, depth = pondered
+            self._say(f"{name} answers from its ponder search (Depth: {depth}, Eval: {score:.1f}).")
+        else:
+            self._say(f"{name} is thinking (Budget: {self.search_time_limit}s)...")
+            self.last_search_stats = None
+            start_time = time.time()
+            if self.search_algorithm == 'mcts':
+                score, best_full_move_details = self.mcts_search(player == 2)
+            elif self.search_workers > 1:
+                score, best_full_move_details = self.parallel_search(player == 2)
+            else:
+                score, best_full_move_details = self.iterative_deepening(player == 2)
+            end_time = time.time()
+            self._say(f"{name} decided in {end_time - start_time:.2f} seconds (Depth: {self.search_depth_reached}, Eval: {score:.1f}).")
+            if self.last_search_stats is not None:
+                self._say(f"  Search: {self.last_search_stats.summary()}")
+                if self.stats_log: self.last_search_stats.write_jsonl(self.stats_log)
 
-                current_bomb_score = 0
-                opponent_adj_hit = 0
-                own_adj_hit = 0
-                for adj_pos in self.adjacent_positions[my_pos]:
-                    if self.board[adj_pos] == 1:
-                        opponent_adj_hit += 1
-                    elif self.board[adj_pos] == 2:
-                        own_adj_hit += 1
-                
-                current_bomb_score = (opponent_adj_hit * 2) - (own_adj_hit * 3)
+        if not best_full_move_details:
+            self._say(f"{name} has no valid moves.")
+            return None
+        best_move, best_remove_pos = best_full_move_details
+        if best_move is None:
+             self._say(f"{name} Error: Search returned None for best move.")
+             valid_moves = self.get_valid_moves(player)
+             if not valid_moves:
+                 self._say(f"{name} Error: No valid moves available for recovery.")
+                 return None
+             self._say(f"{name} attempting random recovery move...")
+             best_move = random.choice(valid_moves)
+             best_remove_pos = None
+        if best_move[1] == -2:
+            self._say(f"{name} uses its Time Bomb on piece at {self.coordinates.get(best_move[0])}.")
+            self._place_bomb(player, best_move[0])
+            self._show_board()
+            self._pause(1.5)
+            return self.last_ai_move if player == 2 else self.last_player_move
+        mill_formed = self.make_move(best_move, player)
+        last_move = self.last_ai_move if player == 2 else self.last_player_move
+        self._say(f"{name} chooses: {self.format_move(last_move)}")
+        self._show_board()
+        self._pause(1)
 
-                if current_bomb_score > best_bomb_score and opponent_adj_hit > 0 :
-                    if opponent_adj_hit > 0 and (current_bomb_score > 0 or (opponent_adj_hit >=2 and own_adj_hit <=1 )):
-                       best_bomb_score = current_bomb_score
-                       best_bomb_target_pos = my_pos
-            
-            if best_bomb_target_pos != -1 and best_bomb_score >= 1:
-                print(f"AI is thinking about a bomb... (Score: {best_bomb_score})")
-                time.sleep(0.5)
-                self._place_bomb(2, best_bomb_target_pos)
-                print(f"AI uses its Time Bomb on piece at {self.coordinates.get(best_bomb_target_pos)}.")
-                time.sleep(1.5)
-                return
-
-        depth = 3
-        total_pieces_left = self.player_pieces_on_board + self.ai_pieces_on_board + self.player_pieces_to_place + self.ai_pieces_to_place
-        if total_pieces_left <= 10: depth = 4
-        if total_pieces_left <= 6: depth = 5
-        if self.phase == 3: depth = max(depth, 5)
-
-        print(f"AI is thinking (Depth: {depth})...")
-        start_time = time.time()
-        score, best_full_move_details = self.alpha_beta_search(depth, float('-inf'), float('inf'), True)
-        end_time = time.time()
-        print(f"AI decided in {end_time - start_time:.2f} seconds (Eval: {score:.1f}).")
-
-        if best_full_move_details:
-            best_move, best_remove_pos = best_full_move_details
-            if best_move is None:
-                 print("AI Error: Search returned None for best move.")
-                 valid_moves = self.get_valid_moves(2)
-                 if valid_moves:
-                     print("AI attempting random recovery move...")
-                     best_move = random.choice(valid_moves)
-                     best_remove_pos = None 
-                 else:
-                     print("AI Error: No valid moves available for recovery.")
-                     return 
-            move_coord_str = self.format_move((best_move[0], best_move[1], None))
-            mill_formed = self.make_move(best_move, 2)
-            print(f"AI chooses: {self.format_move(self.last_ai_move)}")
-            self.display_board()
-            time.sleep(1)
+        if mill_formed:
+            self._say(f"{name} formed a mill!")
+            removal_target = None
+            if best_remove_pos is not None and self.is_valid_removal(best_remove_pos, player):
+                removal_target = best_remove_pos
+            else:
+                remove_options = [p for p in range(24) if self.is_valid_removal(p, player)]
+                if remove_options:
+                    removal_target = random.choice(remove_options)
+                    self._say(f"{name} fallback removal target: {self.coordinates.get(removal_target, '?')}.")
+                else: self._say(f"{name} formed mill, but no valid piece to remove?")
 
-            if mill_formed:
-                print("AI formed a mill!")
-                removal_target = None
-                if best_remove_pos is not None and self.is_valid_removal(best_remove_pos, 2):
-                    removal_target = best_remove_pos
-                else:
-                    remove_options = [p for p in range(24) if self.is_valid_removal(p, 2)]
-                    if remove_options:
-                        removal_target = random.choice(remove_options)
-                        print(f"AI fallback removal target: {self.coordinates.get(removal_target, '?')}.")
-                    else: print("AI formed mill, but no valid piece to remove?")
-
-                if removal_target is not None:
-                    if self.perform_removal(removal_target, 2):
-                        print(f"AI removed piece at {self.coordinates.get(removal_target, '?')}.")
-                        self.display_board() 
-                        time.sleep(1.5)
-                    else: print(f"AI Error: Failed to perform intended removal at {removal_target}")
-                else: time.sleep(1)
-        else:
-            print("AI has no valid moves.")
+            if removal_target is not None:
+                if self.perform_removal(removal_target, player):
+                    self._say(f"{name} removed piece at {self.coordinates.get(removal_target, '?')}.")
+                    self._show_board()
+                    self._pause(1.5)
+                else: self._say(f"{name} Error: Failed to perform intended removal at {removal_target}")
+            else: self._pause(1)
+        return self.last_ai_move if player == 2 else self.last_player_move
 
     def is_game_over(self):
         player_done_placing = self.player_pieces_to_place == 0
@@ -611,67 +1261,73 @@ class NineMensMorris:
             self.winner = "AI"; return True
         if ai_done_placing and self.ai_pieces_on_board < 3:
             self.winner = "Player"; return True
-        player_can_move = bool(self.get_valid_moves(1))
-        ai_can_move = bool(self.get_valid_moves(2))
-        if player_done_placing and not player_can_move:
+        if player_done_placing and not self.has_legal_move(1):
             self.winner = "AI"; return True
-        if ai_done_placing and not ai_can_move:
+        if ai_done_placing and not self.has_legal_move(2):
             self.winner = "Player"; return True
         self.winner = None
         return False
 
     def get_coord_input(self, prompt):
         while True:
-            coord = input(prompt).strip().upper()
+            coord = self._ask(prompt).strip().upper()
             if coord in self.position_map:
                 return self.position_map[coord]
             else:
-                print("Invalid coordinate. Use format like 'A1', 'D7', etc.")
+                self._say("Invalid coordinate. Use format like 'A1', 'D7', etc.")
+
+    def _navigate(self, step):
+        # Undo (step < 0) or redo (step > 0) whole rounds in self.history; False if there is nowhere to go.
+        if step < 0:
+            moved = self.history.undo()
+        else:
+            branches = self.history.branches()
+            branch = -1
+            if len(branches) > 1:
+                for i, node in enumerate(branches, 1):
+                    player_move, ai_move = node.label
+                    self._say(f"  {i}: Player {self.format_move(player_move)}; AI {self.format_move(ai_move)}")
+                choice = self._ask(f"Redo which line? (1-{len(branches)}, Enter for the latest): ").strip()
+                if choice.isdigit() and 1 <= int(choice) <= len(branches): branch = int(choice) - 1
+            moved = self.history.redo(branch)
+        self.update_phase()
+        self.is_game_over()
+        return moved
 
     def play_game(self):
         game_running = True
+        resume_turn = False  # after undo/redo: this turn's bombs have already ticked
         while game_running:
             current_player_for_bomb_tick = 1 if self.player_turn else 2
-            detonations_occurred = self._handle_bomb_updates_and_detonations(current_player_for_bomb_tick)
+            detonations_occurred = False
+            if not resume_turn:
+                detonations_occurred = self._handle_bomb_updates_and_detonations(current_player_for_bomb_tick)
+            resume_turn = False
             
             if detonations_occurred:
-                print("\n--- Post-Detonation Board State ---")
+                self._say("\n--- Post-Detonation Board State ---")
                 self.display_board()
-                time.sleep(2)
+                self._pause(2)
                 if self.is_game_over():
-                    print(f"\n--- Game Over due to Bomb Detonation! ---")
-                    print(f"Winner: {self.winner}")
+                    self._say(f"\n--- Game Over due to Bomb Detonation! ---")
+                    self._say(f"Winner: {self.winner}")
                     game_running = False
                     break 
             
             if self.is_game_over():
                 self.display_board()
-                print(f"\n--- Game Over! ---")
-                print(f"Winner: {self.winner}")
+                self._say(f"\n--- Game Over! ---")
+                self._say(f"Winner: {self.winner}")
                 game_running = False; break
             
             self.display_board()
 
             if self.player_turn:
-                import copy
-                self._undo_stack.append({
-                    'board': self.board[:],
-                    'phase': self.phase,
-                    'player_pieces_to_place': self.player_pieces_to_place,
-                    'ai_pieces_to_place': self.ai_pieces_to_place,
-                    'player_pieces_on_board': self.player_pieces_on_board,
-                    'ai_pieces_on_board': self.ai_pieces_on_board,
-                    'last_player_move': self.last_player_move,
-                    'last_ai_move': self.last_ai_move,
-                    'winner': self.winner,
-                    'player_turn': self.player_turn,
-                    'player_bomb_available': self.player_bomb_available,
-                    'ai_bomb_available': self.ai_bomb_available,
-                    'bombs_on_board': copy.deepcopy(self.bombs_on_board),
-                    'next_bomb_id': self.next_bomb_id,
-                })
-                print("\n--- Player's Turn (O) ---")
-                made_move = False; mill_formed = False
+                # Round boundary for undo/redo: the changes since the last player turn become one node.
+                self.history.commit((self.last_player_move, self.last_ai_move))
+                if self.ponder and self.search_algorithm != 'mcts': self._start_pondering(1)
+                self._say("\n--- Player's Turn (O) ---")
+                made_move = False; mill_formed = False; navigated = False
                 is_placing = self.player_pieces_to_place > 0
                 is_flying = (not is_placing) and (self.player_pieces_on_board <= 3)
                 phase_name = "Fly" if is_flying else "Move"
@@ -687,17 +1343,23 @@ class NineMensMorris:
 
                     if self.player_bomb_available and self.player_pieces_on_board > 0:
                         actions_prompt.append("(B)omb")
+                    if self.history.can_undo(): actions_prompt.append("(U)ndo")
+                    if self.history.branches(): actions_prompt.append("(R)edo")
                     
                     if not can_make_normal_move and not (self.player_bomb_available and self.player_pieces_on_board > 0) :
-                         print("No valid moves or actions! Player is stuck.")
+                         self._say("No valid moves or actions! Player is stuck.")
                          self.winner = "AI"
                          game_running = False; break
 
 
-                    action_choice_str = input(f"Choose action: {', '.join(actions_prompt)}: ").strip().upper()
+                    action_choice_str = self._ask(f"Choose action: {', '.join(actions_prompt)}: ").strip().upper()
 
-                    if action_choice_str == 'B' and self.player_bomb_available and self.player_pieces_on_board > 0:
-                        print("Select one of your pieces to arm with a Time Bomb.")
+                    if action_choice_str in ('U', 'R'):
+                        if self._navigate(-1 if action_choice_str == 'U' else 1):
+                            navigated = True; break
+                        self._say("Nothing to " + ("undo." if action_choice_str == 'U' else "redo."))
+                    elif action_choice_str == 'B' and self.player_bomb_available and self.player_pieces_on_board > 0:
+                        self._say("Select one of your pieces to arm with a Time Bomb.")
                         pos_to_bomb = self.get_coord_input("Enter position of YOUR piece to arm: ")
                         if self.board[pos_to_bomb] == 1:
                             is_already_bombed = any(b['position'] == pos_to_bomb for b in self.bombs_on_board)
@@ -705,106 +1367,98 @@ class NineMensMorris:
                                 self._place_bomb(1, pos_to_bomb)
                                 made_move = True
                             else:
-                                print("That piece already has a bomb or is an invalid choice. Try again.")
+                                self._say("That piece already has a bomb or is an invalid choice. Try again.")
                         else:
-                            print("That is not your piece or the spot is empty. Try again.")
+                            self._say("That is not your piece or the spot is empty. Try again.")
 
                     elif (action_choice_str == 'P' and is_placing) or \
                          (action_choice_str == 'M' and not is_placing) or \
                          (action_choice_str == '' and can_make_normal_move):
 
                         if not can_make_normal_move:
-                            print("No standard moves available. If you have a bomb, try using it.")
+                            self._say("No standard moves available. If you have a bomb, try using it.")
                             continue
 
                         if is_placing:
-                            print(f"Phase 1: Place piece ({self.player_pieces_to_place} left)")
+                            self._say(f"Phase 1: Place piece ({self.player_pieces_to_place} left)")
                             pos = self.get_coord_input("Enter position to place (e.g., A1): ")
                             if self.is_valid_place(pos): 
                                 mill_formed = self.make_move((pos, -1), 1); made_move = True
-                            else: print("Invalid position. Try again.")
+                            else: self._say("Invalid position. Try again.")
                         else:
-                            print(f"Phase {phase_num_str} ({phase_name}): Select piece and destination")
+                            self._say(f"Phase {phase_num_str} ({phase_name}): Select piece and destination")
                             from_pos = self.get_coord_input("Enter position of piece to move: ")
-                            if self.board[from_pos] != 1: print("Not your piece."); continue
+                            if self.board[from_pos] != 1: self._say("Not your piece."); continue
                             
                             possible_destinations = []
                             for move_option_to, move_option_from in valid_moves:
                                 if move_option_from == from_pos:
                                     possible_destinations.append(move_option_to)
                             
-                            if not possible_destinations: print("This piece has no valid moves."); continue
+                            if not possible_destinations: self._say("This piece has no valid moves."); continue
                             
                             valid_dest_coords = sorted([self.coordinates[p] for p in possible_destinations])
-                            print(f"Valid destinations for {self.coordinates[from_pos]}: {', '.join(valid_dest_coords)}")
+                            self._say(f"Valid destinations for {self.coordinates[from_pos]}: {', '.join(valid_dest_coords)}")
                             to_pos = self.get_coord_input("Enter destination position: ")
                             
                             if (to_pos, from_pos) in valid_moves: 
                                 mill_formed = self.make_move((to_pos, from_pos), 1); made_move = True
-                            else: print("Invalid destination. Try again.")
+                            else: self._say("Invalid destination. Try again.")
                     else:
-                        print("Invalid action choice. Try again.")
+                        self._say("Invalid action choice. Try again.")
 
                 if not game_running: break 
+                if navigated:
+                    self._say("\nMoved to " + ("an earlier" if action_choice_str == 'U' else "a later") + " turn.")
+                    resume_turn = True
+                    continue
 
                 if made_move and mill_formed:
-                    self.display_board(); print("\nMill formed! Select an opponent's piece (X) to remove.")
+                    self.display_board(); self._say("\nMill formed! Select an opponent's piece (X) to remove.")
                     removed_piece_successfully = False
                     while not removed_piece_successfully:
                         valid_removals = [p for p in range(24) if self.is_valid_removal(p, 1)]
-                        if not valid_removals: print("No valid pieces to remove."); time.sleep(2); break 
+                        if not valid_removals: self._say("No valid pieces to remove."); self._pause(2); break 
                         valid_removal_coords = sorted([self.coordinates[p] for p in valid_removals])
-                        print(f"Valid removal targets: {', '.join(valid_removal_coords)}")
+                        self._say(f"Valid removal targets: {', '.join(valid_removal_coords)}")
                         remove_pos = self.get_coord_input("Enter position to remove: ")
                         if self.perform_removal(remove_pos, 1):
-                            print(f"Removed piece at {self.coordinates[remove_pos]}."); removed_piece_successfully = True
-                        else: print("Invalid removal choice. Try again.")
+                            self._say(f"Removed piece at {self.coordinates[remove_pos]}."); removed_piece_successfully = True
+                        else: self._say("Invalid removal choice. Try again.")
                 
                 if made_move:
-                     print("\n--- Player's Turn End ---")
-                     time.sleep(0.5 if not mill_formed else 1.5)
+                     self._say("\n--- Player's Turn End ---")
+                     self._pause(0.5 if not mill_formed else 1.5)
 
                      self.display_board()
-                     if self.player_undos_left > 0:
-                         undo_choice = input(f"\nYou have {self.player_undos_left} undos left. Undo this move? (Y/N): ").strip().upper()
-                         if undo_choice == 'Y':
-                             if self._undo_stack:
-                                 prev = self._undo_stack.pop()
-                                 self.board = prev['board'][:]
-                                 self.phase = prev['phase']
-                                 self.player_pieces_to_place = prev['player_pieces_to_place']
-                                 self.ai_pieces_to_place = prev['ai_pieces_to_place']
-                                 self.player_pieces_on_board = prev['player_pieces_on_board']
-                                 self.ai_pieces_on_board = prev['ai_pieces_on_board']
-                                 self.last_player_move = prev['last_player_move']
-                                 self.last_ai_move = prev['last_ai_move']
-                                 self.winner = prev['winner']
-                                 self.player_turn = prev['player_turn']
-                                 self.player_bomb_available = prev['player_bomb_available']
-                                 self.ai_bomb_available = prev['ai_bomb_available']
-                                 import copy
-                                 self.bombs_on_board = copy.deepcopy(prev['bombs_on_board'])
-                                 self.next_bomb_id = prev['next_bomb_id']
-                                 self.player_undos_left -= 1
-                                 print("\nMove undone. Your turn again.")
-                                 self.display_board()
-                                 continue
-                             else:
-                                 print("No undo state available.")
+                     undo_choice = self._ask("\nUndo this move? (Y/N): ").strip().upper()
+                     if undo_choice == 'Y':
+                         self.history.revert()
+                         self.update_phase()
+                         self._say("\nMove undone. Your turn again.")
+                         resume_turn = True
+                         continue
 
             else:
-                print("\n--- AI's Turn (X) ---")
+                self._say("\n--- AI's Turn (X) ---")
                 self.ai_move()
-                print("\n--- AI's Turn End ---"); time.sleep(1)
+                self._say("\n--- AI's Turn End ---"); self._pause(1)
 
             if game_running: self.player_turn = not self.player_turn
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Play Nine Men's Morris with time bombs against the AI.")
+    parser.add_argument("--pacing", choices=list(render.PACINGS),
+                        help="pauses between events (default: real-time on a terminal, instant otherwise)")
+    args = parser.parse_args()
     game = NineMensMorris()
+    if args.pacing: game.renderer.pacing = render.Pacing(args.pacing)
     try:
         game.play_game()
     except KeyboardInterrupt: print("\nGame interrupted.")
     finally:
+        game.renderer.flush()
         if game.winner: print(f"\nFinal Result: {game.winner} wins!")
         elif game.is_game_over() and game.winner:
             print(f"\nFinal Result: {game.winner} wins!")
@@ -0,0 +1,202 @@
+# Monte Carlo tree search (search_algorithm 'mcts'), with root parallelism over a process pool.
+#
+# The tree's edges are root actions as parallel_search.root_actions lists them: a move, plus
+# the removal when it closes a mill, and bomb arming. Children are picked by UCT; each new
+# leaf is scored by one light playout: uniformly random moves and removals played through
+# the rules (make_move / _remove_piece / tick_bombs, journaled, no output) for at most
+# PLAYOUT_PLIES plies, then evaluate_board (tablebase included) squashed to a win chance
+# by a logistic with EVAL_SCALE. Everything is undone through the journal afterwards.
+#
+# With several workers each one grows its own tree from the same position under the same
+# budget, and the root statistics are summed (root parallelism); the most visited action
+# is played. Rewards are the AI's (player 2's) chance to win: 1 win, 0.5 draw, 0 loss.
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import bitboard
+from parallel_search import root_actions
+
+UCT_C = 0.7             # exploration constant, rewards in [0, 1]
+PLAYOUT_PLIES = 12      # plies played at random before the playout is evaluated
+EVAL_SCALE = 400.0      # evaluate_board score that counts as 1 in the logistic
+DEFAULT_PLAYOUTS = 2000 # budget when a search has neither a time nor a node limit
+CHECK_EVERY = 16        # iterations between clock checks
+
+_worker_game = None
+
+
+def _reward(winner):
+    return 1.0 if winner == "AI" else 0.0 if winner == "Player" else 0.5
+
+
+class _Node:
+    __slots__ = ('action', 'parent', 'mover', 'children', 'untried', 'terminal', 'visits', 'value')
+
+    def __init__(self, action, parent, mover):
+        self.action = action
+        self.parent = parent
+        self.mover = mover       # the player whose action led here
+        self.children = []
+        self.untried = None      # actions not expanded yet; None until first visited
+        self.terminal = None     # fixed reward of a decided position
+        self.visits = 0
+        self.value = 0.0         # sum of rewards for `mover`
+
+
+class Tree:
+    # One search tree over `game`, which is left as it was between iterations.
+    def __init__(self, game, maximizing_player, seed=None):
+        self.game = game
+        self.player = 2 if maximizing_player else 1
+        self.rng = random.Random(seed)
+        self.root = _Node(None, None, 3 - self.player)
+        self.playouts = 0
+        self.max_depth = 0
+
+    def run(self, deadline=None, playout_limit=None):
+        game = self.game
+        winner = game.winner
+        try:
+            while not game.stop_search:
+                for _ in range(CHECK_EVERY): self._iterate()
+                if playout_limit is not None and self.playouts >= playout_limit: break
+                if deadline is not None and time.time() >= deadline: break
+                if self.root.terminal is not None or (self.root.untried == [] and len(self.root.children) <= 1): break
+        finally:
+            game.winner = winner
+        return self
+
+    def root_stats(self):
+        # {action: (visits, summed reward for the side to move)}
+        return {child.action: (child.visits, child.value) for child in self.root.children}
+
+    def _enter(self, node, player):
+        # First visit of `node`, with `player` to move: note a decided game or list the actions.
+        game = self.game
+        if game.is_game_over():
+            node.terminal = _reward(game.winner); node.untried = []
+            return
+        node.untried = root_actions(game, player == 2)
+        if not node.untried: node.terminal = 0.0 if player == 2 else 1.0   # stuck: the side to move loses
+        self.rng.shuffle(node.untried)
+
+    def _apply(self, action, player):
+        game = self.game
+        move, remove_pos = action
+        game.make_move(move, player)
+        if remove_pos is not None: game._remove_piece(remove_pos)
+        if game.bombs_on_board: game.tick_bombs(3 - player)
+
+    def _select(self, node):
+        log_visits = math.log(node.visits)
+        best, best_value = None, -1.0
+        for child in node.children:
+            value = child.value / child.visits + UCT_C * math.sqrt(log_visits / child.visits)
+            if value > best_value: best, best_value = child, value
+        return best
+
+    def _iterate(self):
+        game = self.game
+        mark = len(game._journal)
+        node, player, depth = self.root, self.player, 0
+        if node.untried is None: self._enter(node, player)
+        while True:
+            if node.terminal is not None:
+                reward = node.terminal; break
+            if node.untried:
+                action = node.untried.pop()
+                self._apply(action, player)
+                child = _Node(action, node, player)
+                node.children.append(child)
+                node, player, depth = child, 3 - player, depth + 1
+                self._enter(node, player)
+                reward = node.terminal if node.terminal is not None else self._playout(player)
+                break
+            node = self._select(node)
+            self._apply(node.action, player)
+            player, depth = 3 - player, depth + 1
+            if node.untried is None: self._enter(node, player)
+        game.undo_to(mark)
+        self.playouts += 1
+        if depth > self.max_depth: self.max_depth = depth
+        while node is not None:
+            node.visits += 1
+            node.value += reward if node.mover == 2 else 1.0 - reward
+            node = node.parent
+
+    def _playout(self, player):
+        # Reward after random play from here, `player` to move (bombs already ticked).
+        game, rng = self.game, self.rng
+        for _ in range(PLAYOUT_PLIES):
+            empty = game.bitboards[0]
+            if (game.player_pieces_to_place if player == 1 else game.ai_pieces_to_place) > 0:
+                move = (rng.choice(bitboard.bits(empty)), -1)
+            elif (game.player_pieces_on_board if player == 1 else game.ai_pieces_on_board) <= 3:
+                move = (rng.choice(bitboard.bits(empty)), rng.choice(bitboard.bits(game.bitboards[player])))
+            else:
+                moves = bitboard.slide_moves(game.bitboards[player], empty)
+                if not moves: return 0.0 if player == 2 else 1.0
+                move = rng.choice(moves)
+            if game.make_move(move, player):
+                removable = game.removal_mask(player)
+                if removable: game._remove_piece(rng.choice(bitboard.bits(removable)))
+            player = 3 - player
+            if game.bombs_on_board: game.tick_bombs(player)
+            if game.is_game_over(): return _reward(game.winner)
+        score = game.evaluate_board(player == 2)
+        return 1.0 / (1.0 + math.exp(-max(-50.0, min(50.0, score / EVAL_SCALE))))
+
+
+def _search_tree(state, maximizing_player, deadline, playout_limit, seed, eval_profile):
+    global _worker_game
+    if _worker_game is None:
+        from main import NineMensMorris
+        _worker_game = NineMensMorris()
+        _worker_game.quiet = True
+    game = _worker_game
+    game.eval_profile = eval_profile
+    game.load_compact(state)
+    tree = Tree(game, maximizing_player, seed).run(deadline, playout_limit)
+    return tree.root_stats(), tree.playouts, tree.max_depth
+
+
+class MCTSSearcher:
+    def __init__(self, workers=1):
+        self.workers = workers
+        self._pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        self.playouts = 0
+        self.depth_reached = 0
+
+    def close(self):
+        if self._pool is not None: self._pool.shutdown(wait=False)
+
+    def search(self, game, maximizing_player, time_limit=None, playout_limit=None):
+        # Returns (score, (move, removal)) like iterative_deepening; the score is the root
+        # win chance of the chosen action mapped back through the playout logistic.
+        # A time limit of 0 is an immediate deadline; without a positive one the playouts are capped.
+        if playout_limit is None and (time_limit is None or time_limit <= 0): playout_limit = DEFAULT_PLAYOUTS
+        deadline = time.time() + time_limit if time_limit is not None else None
+        seed = random.getrandbits(32)
+        if self._pool is None:
+            tree = Tree(game, maximizing_player, seed).run(deadline, playout_limit)
+            stats, self.playouts, self.depth_reached = tree.root_stats(), tree.playouts, tree.max_depth
+        else:
+            state = game.to_compact()
+            share = None if playout_limit is None else max(1, playout_limit // self.workers)
+            futures = [self._pool.submit(_search_tree, state, maximizing_player, deadline, share, seed + i, game.eval_profile)
+                       for i in range(self.workers)]
+            stats, self.playouts, self.depth_reached = {}, 0, 0
+            for future in futures:
+                root_stats, playouts, depth = future.result()
+                for action, (visits, value) in root_stats.items():
+                    total = stats.get(action, (0, 0.0))
+                    stats[action] = (total[0] + visits, total[1] + value)
+                self.playouts += playouts
+                self.depth_reached = max(self.depth_reached, depth)
+        if not stats: return game.evaluate_board(), None
+        action, (visits, value) = max(stats.items(), key=lambda item: item[1][0])
+        win = min(0.99, max(0.01, value / visits))
+        if not maximizing_player: win = 1.0 - win
+        return EVAL_SCALE * math.log(win / (1.0 - win)), action
@@ -0,0 +1,86 @@
+# Text notation for moves and whole positions (server.py, analyze.py).
+#
+# Moves: D7 places, D7-D6 moves, *D7 arms a bomb on D7; a removal is appended as xA1
+# (D6-D7xA1). A full move is ((to, from), removal) as search returns it.
+#
+# Positions are seven space-separated fields:
+#     <board> <side> <O to place> <X to place> <O bomb> <X bomb> <bombs>
+#   board   24 characters for points A7 .. G1 in bitboard.COORDINATES order: . empty, O, X
+#   side    O or X, the side to move; it has already ticked its bombs for this turn
+#   bomb    1 while that side still has its bomb to arm, else 0
+#   bombs   armed bombs in the order they were armed, as <owner><point>:<turns left>
+#           separated by commas (OD7:2,XF4:3), or -; each side arms at most one, and
+#           a side with an armed bomb has a bomb field of 0
+# O is the human side (player 1) and X the AI (player 2), as in the game. START is the
+# opening position.
+from bitboard import BIT, COORDINATES
+
+SIDES = {1: "O", 2: "X"}
+POINTS = {name: pos for pos, name in enumerate(COORDINATES)}
+START = "." * 24 + " O 9 9 1 1 -"
+BOMB_TIMER = 3   # turns on a freshly armed bomb (NineMensMorris.BOMB_INITIAL_TIMER)
+
+
+def format_move(full_move):
+    (to_pos, from_pos), remove_pos = full_move
+    if from_pos == -2: text = "*" + COORDINATES[to_pos]
+    elif from_pos == -1: text = COORDINATES[to_pos]
+    else: text = f"{COORDINATES[from_pos]}-{COORDINATES[to_pos]}"
+    return text + (f"x{COORDINATES[remove_pos]}" if remove_pos is not None else "")
+
+
+def parse_move(text):
+    # Inverse of format_move; raises ValueError on anything that is not a well-formed move.
+    text = text.strip().upper()
+    text, _, removal = text.partition("X")
+    try:
+        remove_pos = POINTS[removal] if removal else None
+        if text.startswith("*"): move = (POINTS[text[1:]], -2)
+        elif "-" in text:
+            from_coord, _, to_coord = text.partition("-")
+            move = (POINTS[to_coord], POINTS[from_coord])
+        else: move = (POINTS[text], -1)
+    except KeyError as e:
+        raise ValueError(f"bad point {e.args[0]!r} in move") from None
+    return move, remove_pos
+
+
+def format_position(state, player):
+    # Notation for a to_compact() state with `player` to move.
+    player_bb, ai_bb, player_to_place, ai_to_place, player_bomb, ai_bomb, _, bombs = state
+    board = "".join("O" if player_bb & BIT[pos] else "X" if ai_bb & BIT[pos] else "." for pos in range(24))
+    bomb_list = ",".join(f"{SIDES[owner]}{COORDINATES[pos]}:{timer}" for _, owner, pos, timer in bombs) or "-"
+    return f"{board} {SIDES[player]} {player_to_place} {ai_to_place} {int(player_bomb)} {int(ai_bomb)} {bomb_list}"
+
+
+def parse_position(text):
+    # -> (to_compact() state, player to move); raises ValueError on a malformed or impossible position.
+    fields = text.split()
+    if len(fields) != 7: raise ValueError(f"expected 7 fields, got {len(fields)}")
+    board, side, player_to_place, ai_to_place, player_bomb, ai_bomb, bomb_list = fields
+    if len(board) != 24 or set(board) - set(".OX"): raise ValueError("board must be 24 of . O X")
+    if side not in ("O", "X"): raise ValueError("side to move must be O or X")
+    player_bb = sum(BIT[pos] for pos, c in enumerate(board) if c == "O")
+    ai_bb = sum(BIT[pos] for pos, c in enumerate(board) if c == "X")
+    try:
+        player_to_place, ai_to_place = int(player_to_place), int(ai_to_place)
+    except ValueError:
+        raise ValueError("pieces to place must be numbers") from None
+    for name, to_place, pieces in (("O", player_to_place, board.count("O")), ("X", ai_to_place, board.count("X"))):
+        if not 0 <= to_place <= 9 or pieces + to_place > 9: raise ValueError(f"{name} has {pieces} on the board and {to_place} to place")
+    if player_bomb not in ("0", "1") or ai_bomb not in ("0", "1"): raise ValueError("bomb fields must be 0 or 1")
+    bombs = []
+    if bomb_list != "-":
+        for i, item in enumerate(bomb_list.split(","), 1):
+            point, _, timer = item[1:].partition(":")
+            if item[:1] not in ("O", "X") or point not in POINTS or not timer.isdigit():
+                raise ValueError(f"bad bomb {item!r}")
+            owner, pos = 1 if item[0] == "O" else 2, POINTS[point]
+            if not 1 <= int(timer) <= BOMB_TIMER: raise ValueError(f"bomb {item!r} must have 1 to {BOMB_TIMER} turns left")
+            if not (player_bb if owner == 1 else ai_bb) & BIT[pos]: raise ValueError(f"bomb {item!r} is not on its owner's piece")
+            if any(bomb[2] == pos for bomb in bombs): raise ValueError(f"two bombs on {point}")
+            if any(bomb[1] == owner for bomb in bombs): raise ValueError(f"{item[0]} has armed two bombs")
+            if (player_bomb if owner == 1 else ai_bomb) == "1": raise ValueError(f"bomb {item!r} is armed but {item[0]} still has its bomb")
+            bombs.append((i, owner, pos, int(timer)))
+    state = (player_bb, ai_bb, player_to_place, ai_to_place, player_bomb == "1", ai_bomb == "1", len(bombs), tuple(bombs))
+    return state, 1 if side == "O" else 2
@@ -0,0 +1,168 @@
+# Placement-phase opening book, built offline and keyed by symmetry-canonical position.
+#
+#     python opening_book.py --plies 4 --depth 6 --workers 4
+#
+# File layout: header, then fixed-size records sorted by key. A record holds the
+# canonical position key and the best move in the canonical frame (255 = none; a from
+# point of 254 arms a bomb, as in poscache).
+import argparse
+import os
+import struct
+import sys
+import time
+
+import symmetry
+from bitboard import bits
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin")
+MAGIC = b"NMMBK1\0\0"
+HEADER = struct.Struct("<8sI4x")
+RECORD = struct.Struct("<QBBB")
+NONE = 255
+BOMB_FROM = 254
+
+
+def position_key(player_bb, ai_bb, player_to_place, ai_to_place, ai_to_move, player_bomb, ai_bomb):
+    # Returns (key, sym): the packed canonical position and the symmetry that produced it.
+    player_c, ai_c, sym = symmetry.canonical_pair(player_bb, ai_bb)
+    key = player_c | ai_c << 24 | player_to_place << 48 | ai_to_place << 52
+    key |= int(ai_to_move) << 56 | int(player_bomb) << 57 | int(ai_bomb) << 58
+    return key, sym
+
+
+def _pack_move(full_move):
+    (to_pos, from_pos), remove_pos = full_move
+    from_code = NONE if from_pos == -1 else BOMB_FROM if from_pos == -2 else from_pos
+    return to_pos, from_code, NONE if remove_pos is None else remove_pos
+
+
+def _unpack_move(to_pos, from_pos, remove_pos):
+    from_pos = -1 if from_pos == NONE else -2 if from_pos == BOMB_FROM else from_pos
+    return (to_pos, from_pos), None if remove_pos == NONE else remove_pos
+
+
+class OpeningBook:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.entries = {}
+        if path and os.path.exists(path): self.load(path)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def load(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or len(data) != HEADER.size + count * RECORD.size:
+            raise ValueError(f"{path} is not an opening book")
+        for key, to_pos, from_pos, remove_pos in RECORD.iter_unpack(data[HEADER.size:]):
+            self.entries[key] = (to_pos, from_pos, remove_pos)
+
+    def save(self, path=None):
+        path = path or self.path
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(self.entries)))
+            for key in sorted(self.entries):
+                f.write(RECORD.pack(key, *self.entries[key]))
+        os.replace(tmp_path, path)
+
+    def add(self, key, sym, full_move):
+        # full_move is in the frame of the position that produced (key, sym).
+        self.entries[key] = _pack_move(symmetry.to_canonical(full_move, sym))
+
+    def lookup(self, key, sym):
+        # Book move mapped back into the frame of the probed position, or None.
+        packed = self.entries.get(key)
+        if packed is None: return None
+        return symmetry.from_canonical(_unpack_move(*packed), sym)
+
+
+_default = None
+
+def default_book():
+    global _default
+    if _default is None: _default = OpeningBook(DEFAULT_PATH)
+    return _default
+
+
+def _expand(game, line, player):
+    # Child lines of `line`: every move of `player`, with every removal after a mill.
+    children = []
+    removals = bits(game.removal_mask(player))
+    for move in game.get_valid_moves(player):
+        if removals and game.move_creates_mill_heuristic(move, player):
+            children.extend(line + [(move, remove_pos)] for remove_pos in removals)
+        else:
+            children.append(line + [(move, None)])
+    return children
+
+
+def _replay(line):
+    from main import NineMensMorris
+    game = NineMensMorris()
+    player = 1
+    for move, remove_pos in line:
+        game.make_move(move, player)
+        if remove_pos is not None: game.perform_removal(remove_pos, player)
+        player = 3 - player
+    return game, player
+
+
+def _search_line(task):
+    line, depth = task
+    game, player = _replay(line)
+    score, best = game.iterative_deepening(player == 2, time_limit=None, node_limit=None, max_depth=depth)
+    return line, best, score, game.search_depth_reached
+
+
+def build(plies=4, depth=6, workers=1, path=DEFAULT_PATH, log=print):
+    # Searches every distinct position in the first `plies` placements to `depth`.
+    book = OpeningBook(None)
+    lines, seen = [[]], set()
+    tasks = []
+    for ply in range(plies):
+        next_lines = []
+        for line in lines:
+            game, player = _replay(line)
+            if game.is_game_over() or not (game.player_pieces_to_place or game.ai_pieces_to_place): continue
+            key, _ = game.book_key(player == 2)
+            if key in seen: continue
+            seen.add(key)
+            tasks.append((line, depth))
+            if ply + 1 < plies: next_lines.extend(_expand(game, line, player))
+        lines = next_lines
+    log(f"Searching {len(tasks)} positions to depth {depth} with {workers} worker(s)...")
+    start = time.time()
+    if workers > 1:
+        from multiprocessing import Pool
+        with Pool(workers) as pool:
+            results = pool.imap_unordered(_search_line, tasks, chunksize=4)
+            results = list(results)
+    else:
+        results = map(_search_line, tasks)
+    for done, (line, best, score, reached) in enumerate(results, 1):
+        if best is None: continue
+        game, player = _replay(line)
+        key, sym = game.book_key(player == 2)
+        book.add(key, sym, best)
+        if done % 50 == 0: log(f"  {done}/{len(tasks)} positions, {time.time() - start:.1f}s")
+    book.save(path)
+    log(f"Wrote {len(book)} positions to {path} in {time.time() - start:.1f}s")
+    return book
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the placement-phase opening book.")
+    parser.add_argument("--plies", type=int, default=4, help="placements from the start to cover (default 4)")
+    parser.add_argument("--depth", type=int, default=6, help="search depth per position (default 6)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="parallel search processes")
+    parser.add_argument("--output", default=DEFAULT_PATH, help="book file to write")
+    args = parser.parse_args(argv)
+    build(args.plies, args.depth, args.workers, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+# Root-splitting parallel search over a process pool.
+#
+# Every root action (a move, plus the removal when it closes a mill) is searched
+# by a worker on its own copy of the position. The best score found so far is kept
+# in shared memory and used as the window bound of every action that starts later.
+# The first (principal) action is searched alone before the others are handed out.
+# A node budget is shared the same way: the nodes of finished actions are added up in
+# shared memory and each action starts with what is left of it.
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import bitboard
+
+_best_bound = None   # best root score so far, from the root mover's point of view
+_generation = None   # id of the iteration the bound belongs to
+_nodes_used = None  # nodes searched so far by the current search, for its node budget
+_lock = None
+_worker_game = None
+
+
+def _init_worker(best_bound, generation, nodes_used, lock):
+    global _best_bound, _generation, _nodes_used, _lock
+    _best_bound, _generation, _nodes_used, _lock = best_bound, generation, nodes_used, lock
+
+
+def root_actions(game, maximizing_player):
+    # Every (move, removal) pair at the root, mill-forming moves first, bomb arming included.
+    player = 2 if maximizing_player else 1
+    removals = bitboard.bits(game.removal_mask(player))
+    actions = []
+    for move in game.get_valid_moves(player) + game.bomb_moves(player):
+        if removals and game.move_creates_mill_heuristic(move, player):
+            actions.extend((move, remove_pos) for remove_pos in removals)
+        else:
+            actions.append((move, None))
+    actions.sort(key=lambda action: action[1] is None)
+    return actions
+
+
+def _search_action(state, action, depth, maximizing_player, generation, deadline, node_limit, eval_profile):
+    global _worker_game
+    if _worker_game is None:
+        from main import NineMensMorris
+        _worker_game = NineMensMorris()
+    game = _worker_game
+    game.eval_profile = eval_profile
+    game.load_compact(state)
+    player = 2 if maximizing_player else 1
+    move, remove_pos = action
+    game.make_move(move, player)
+    if remove_pos is not None: game._remove_piece(remove_pos)
+    # Scores are shared negated for a minimizing root so "greater is better" throughout.
+    bound = _best_bound.value
+    if maximizing_player: alpha, beta = bound, float('inf')
+    else: alpha, beta = float('-inf'), -bound
+    if node_limit is not None:
+        node_limit -= _nodes_used.value
+        if node_limit <= 0: return action, None, False, 0
+    if depth == 1: game.tt.new_search()
+    result = game.bounded_search(depth - 1, alpha, beta, not maximizing_player, deadline, ply=1, node_limit=node_limit)
+    with _lock:
+        if _generation.value == generation: _nodes_used.value += game.nodes
+    if result is None: return action, None, False, game.nodes
+    score = result[0]
+    exact = score > alpha if maximizing_player else score < beta
+    if exact:
+        signed = score if maximizing_player else -score
+        with _lock:
+            if _generation.value == generation and signed > _best_bound.value:
+                _best_bound.value = signed
+    return action, score, exact, game.nodes
+
+
+class ParallelSearcher:
+    def __init__(self, workers):
+        self.workers = workers
+        self._best_bound = multiprocessing.Value('d', float('-inf'), lock=False)
+        self._generation = multiprocessing.Value('i', 0, lock=False)
+        self._nodes_used = multiprocessing.Value('q', 0, lock=False)
+        self._lock = multiprocessing.Lock()
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker,
+            initargs=(self._best_bound, self._generation, self._nodes_used, self._lock))
+        self.depth_reached = 0
+        self.nodes = 0
+        self._eval_profile = None   # the searching game's, sent with every task
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+
+    def search(self, game, maximizing_player, time_limit=None, max_depth=20, stop_score=float('inf'), node_limit=None):
+        # Iterative deepening; returns (score, (move, removal)) of the last completed depth.
+        # Stops early once |score| reaches stop_score (a proven result), when the time or node
+        # budget runs out, or when game.stop_search is set.
+        self.depth_reached = 0
+        self.nodes = 0
+        self._nodes_used.value = 0
+        actions = root_actions(game, maximizing_player)
+        if not actions: return game.evaluate_board(), None
+        best = (game.evaluate_board(), actions[0])
+        if len(actions) == 1: return best
+        state = game.to_compact()
+        self._eval_profile = game.eval_profile
+        deadline = time.time() + time_limit if time_limit is not None else None
+        for depth in range(1, max_depth + 1):
+            # Depth 1 always completes so there is a move to play.
+            if depth > 1 and (game.stop_search or (deadline is not None and time.time() >= deadline)
+                              or (node_limit is not None and self.nodes >= node_limit)): break
+            results = self._search_depth(state, actions, depth, maximizing_player, game,
+                                         deadline if depth > 1 else None, node_limit if depth > 1 else None)
+            if results is None: break
+            # A fail-low score is only an upper bound, so the best move is taken among exact scores;
+            # the first action is always searched with an open window.
+            sign = 1 if maximizing_player else -1
+            exact = [action for action in actions if results[action][1]]
+            best_action = max(exact, key=lambda action: sign * results[action][0])
+            best = (results[best_action][0], best_action)
+            self.depth_reached = depth
+            # Next iteration starts from the best action, then the most promising ones.
+            actions.sort(key=lambda action: (action != best_action, -sign * results[action][0]))
+            if abs(best[0]) >= stop_score: break
+        return best
+
+    def _search_depth(self, state, actions, depth, maximizing_player, game, deadline, node_limit):
+        # {action: (score, exact)} at `depth`, or None if a budget or game.stop_search cut the
+        # iteration short.
+        with self._lock:
+            self._generation.value += 1
+            self._best_bound.value = float('-inf')
+            generation = self._generation.value
+        submit = lambda action: self._pool.submit(
+            _search_action, state, action, depth, maximizing_player, generation, deadline, node_limit, self._eval_profile)
+        stopped = lambda: depth > 1 and game.stop_search
+        futures = [submit(actions[0])]
+        futures[0].result()
+        if not stopped(): futures += [submit(action) for action in actions[1:]]
+        scored = {}
+        for future in futures:
+            if stopped():
+                for pending in futures: pending.cancel()
+                return None
+            action, score, exact, nodes = future.result()
+            self.nodes += nodes
+            if score is None: return None
+            scored[action] = (score, exact)
+        return scored
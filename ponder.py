@@ -0,0 +1,102 @@
+# Pondering: searching the engine's answers while the human is still thinking.
+#
+# A Ponderer runs on a thread with its own game object but the main game's transposition
+# table. For the position the human is to move in, it first predicts the human's reply
+# with a short search, then for each reply in turn (predicted first, the rest by static
+# evaluation) plays it, ticks the engine's bombs as the next turn would, and searches the
+# engine's answer with the normal time budget. Finished answers are cached under the
+# symmetry-canonical form of the resulting position, so replies that lead to symmetric
+# positions (common early in placing) are searched once; unfinished work still sits in
+# the shared table for the real search.
+#
+# The human's turn mostly waits in input(), which releases the GIL, so the thread gets
+# the CPU. finish() stops it before the engine searches, so the table is never used by
+# two searches at once.
+import threading
+
+import symmetry
+from parallel_search import root_actions
+
+
+class Ponderer:
+    def __init__(self, game):
+        from main import NineMensMorris
+        self.game = NineMensMorris()
+        self.game.quiet = True
+        self.game.tt = game.tt
+        self.root = None
+        self.results = {}   # canonical state of the engine's position -> (score, canonical full move, depth)
+        self.replies = 0    # replies whose answer is in results
+        self.hits = self.misses = 0
+        self._thread = None
+
+    def start(self, game, player):
+        # Ponders `game` with `player` (the human) to move; a no-op if already on this position.
+        root = (game.to_compact(), player)
+        if root == self.root: return
+        self.stop()
+        self.root = root
+        self.results = {}
+        self.replies = 0
+        ponder_game = self.game
+        for name in ('tablebase', 'opening_book', 'position_cache', 'search_time_limit', 'search_node_limit',
+                     'max_search_depth', 'search_algorithm', 'eval_profile', 'batch_eval'):
+            setattr(ponder_game, name, getattr(game, name))
+        ponder_game.load_compact(root[0])
+        self._thread = threading.Thread(target=self._run, args=(player,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None: return
+        self.game.stop_search = True
+        self._thread.join()
+        self.game.stop_search = False
+        self._thread = None
+
+    def finish(self, game, player):
+        # Stops pondering; the pondered (score, full move, depth) for `game` if there is one.
+        self.stop()
+        if self.root is None: return None
+        canonical, sym = symmetry.canonical_state(game.to_compact())
+        result = self.results.get(canonical) if player != self.root[1] else None
+        self.root = None
+        if result is None:
+            self.misses += 1; return None
+        self.hits += 1
+        score, full_move, depth = result
+        return score, symmetry.from_canonical(full_move, sym) if full_move else None, depth
+
+    def _run(self, player):
+        game = self.game
+        engine = 3 - player
+        predict_time = game.search_time_limit / 4 if game.search_time_limit is not None else None
+        _, predicted = game.iterative_deepening(player == 2, time_limit=predict_time)
+        if game.stop_search: return
+        replies = []
+        for action in root_actions(game, player == 2):
+            mark = self._play(action, player)
+            score = game.evaluate_board()
+            game.undo_to(mark)
+            replies.append((action != predicted, score if player == 2 else -score, action))
+        replies.sort(key=lambda entry: (entry[0], -entry[1]))
+        for _, _, action in replies:
+            mark = self._play(action, player)
+            game.tick_bombs(engine)
+            key, sym = symmetry.canonical_state(game.to_compact())
+            if key not in self.results and not game.is_game_over() and game.book_move(engine == 2) is None:
+                score, full_move = game.iterative_deepening(engine == 2)
+                if game.stop_search:
+                    game.undo_to(mark); return
+                self.results[key] = (score, symmetry.to_canonical(full_move, sym) if full_move else None,
+                                     game.search_depth_reached)
+                self.replies += 1
+            game.undo_to(mark)
+
+    def _play(self, action, player):
+        game = self.game
+        mark = len(game._journal)
+        (to_pos, from_pos), remove_pos = action
+        if from_pos == -2: game.arm_bomb(player, to_pos)
+        elif game.make_move((to_pos, from_pos), player) and remove_pos is not None:
+            game._remove_piece(remove_pos)
+        return mark
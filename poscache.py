@@ -0,0 +1,170 @@
+# Persistent search cache shared by games and processes: a fixed-size hash table in a
+# memory-mapped file, keyed by the symmetry-canonical position hash (symmetry.canonical_hash).
+#
+#     python poscache.py cache.bin --create --size-mb 64   # make an empty cache
+#     python poscache.py cache.bin                         # fill and age statistics
+#
+# Search consults it behind the in-memory transposition table for nodes with at least
+# MIN_DEPTH plies to go and writes its results there, so later games and other processes
+# mapping the same file start from what earlier ones searched. Moves are kept in the
+# canonical frame.
+#
+# File layout: HEADER (magic, slot count, generation), then slots of two little-endian
+# uint64s: key ^ data and data. data packs score, depth, bound, the move and the
+# generation that wrote it. Writers store without locks; a slot torn by a concurrent
+# write fails the key check and reads as a miss. Each opening for writing starts a new
+# generation, and buckets of BUCKET slots evict the entry with the least depth left
+# after subtracting its age in generations.
+import argparse
+import mmap
+import os
+import struct
+import sys
+import threading
+
+import symmetry
+
+MAGIC = b"NMMPC1\0\0"
+HEADER = struct.Struct("<8sII")
+SLOT = struct.Struct("<QQ")
+BUCKET = 4
+MIN_DEPTH = 3
+NO_POINT = 255
+BOMB_FROM = 254
+
+
+def _pack(score, depth, bound, full_move, age):
+    if full_move: (to_pos, from_pos), remove_pos = full_move
+    else: to_pos = from_pos = remove_pos = None
+    score = max(-32767, min(32767, int(score)))
+    return ((score + 32768) | min(depth, 255) << 16 | bound << 24
+            | (NO_POINT if to_pos is None else to_pos) << 32
+            | (NO_POINT if from_pos in (None, -1) else BOMB_FROM if from_pos == -2 else from_pos) << 40
+            | (NO_POINT if remove_pos is None else remove_pos) << 48 | age << 56)
+
+
+def _unpack(data):
+    # -> (score, depth, bound, full move or None, age)
+    to_pos, from_pos, remove_pos = data >> 32 & 0xFF, data >> 40 & 0xFF, data >> 48 & 0xFF
+    full_move = None
+    if to_pos != NO_POINT:
+        from_pos = -1 if from_pos == NO_POINT else -2 if from_pos == BOMB_FROM else from_pos
+        full_move = ((to_pos, from_pos), None if remove_pos == NO_POINT else remove_pos)
+    return (data & 0xFFFF) - 32768, data >> 16 & 0xFF, data >> 24 & 0xFF, full_move, data >> 56
+
+
+def create(path, size_mb=64):
+    slots = max(BUCKET, int(size_mb * 1024 * 1024) // SLOT.size // BUCKET * BUCKET)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, slots, 0))
+        f.truncate(HEADER.size + slots * SLOT.size)
+
+
+class PositionCache:
+    def __init__(self, path, writable=True, size_mb=64, warm=True):
+        if writable and not os.path.exists(path): create(path, size_mb)
+        self.path = path
+        self.writable = writable
+        self._file = open(path, "r+b" if writable else "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        magic, self.slots, generation = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or len(self._map) != HEADER.size + self.slots * SLOT.size:
+            self.close()
+            raise ValueError(f"{path} is not a position cache")
+        self.buckets = self.slots // BUCKET
+        if writable:
+            generation += 1
+            struct.pack_into("<I", self._map, 12, generation)
+        self.age = generation & 0xFF
+        self.probes = self.hits = self.stores = 0
+        if warm: self.warm()
+
+    def warm(self):
+        # Pulls the file into the page cache in the background; lookups work meanwhile.
+        if hasattr(self._map, "madvise") and hasattr(mmap, "MADV_WILLNEED"):
+            self._map.madvise(mmap.MADV_WILLNEED); return
+        def touch():
+            try:
+                for offset in range(0, len(self._map), mmap.PAGESIZE): self._map[offset]
+            except ValueError:
+                pass   # closed meanwhile
+        threading.Thread(target=touch, daemon=True).start()
+
+    def _offset(self, key):
+        return HEADER.size + (key % self.buckets) * BUCKET * SLOT.size
+
+    def probe(self, state, maximizing_player):
+        # (depth, bound, score, full move in the probed frame), or None.
+        self.probes += 1
+        key, sym = symmetry.canonical_hash(state, maximizing_player)
+        offset = self._offset(key)
+        for _ in range(BUCKET):
+            check, data = SLOT.unpack_from(self._map, offset)
+            if check ^ data == key and data:
+                score, depth, bound, full_move, _ = _unpack(data)
+                self.hits += 1
+                return depth, bound, score, symmetry.from_canonical(full_move, sym) if full_move else None
+            offset += SLOT.size
+        return None
+
+    def store(self, state, maximizing_player, depth, bound, score, full_move):
+        if not self.writable: return
+        key, sym = symmetry.canonical_hash(state, maximizing_player)
+        data = _pack(score, depth, bound, symmetry.to_canonical(full_move, sym) if full_move else None, self.age)
+        offset = self._offset(key)
+        victim, victim_value = None, None
+        for i in range(BUCKET):
+            slot = offset + i * SLOT.size
+            check, old = SLOT.unpack_from(self._map, slot)
+            if old and check ^ old == key:
+                if depth >= (old >> 16 & 0xFF) or old >> 56 != self.age:
+                    SLOT.pack_into(self._map, slot, key ^ data, data); self.stores += 1
+                return
+            # Empty slots go first, then the shallowest entry after ageing.
+            value = (old >> 16 & 0xFF) - ((self.age - (old >> 56)) & 0xFF) if old else -256
+            if victim is None or value < victim_value: victim, victim_value = slot, value
+        if depth >= victim_value:
+            SLOT.pack_into(self._map, victim, key ^ data, data); self.stores += 1
+
+    def stats(self):
+        # (used slots, slots per depth, slots per age in generations)
+        used, depths, ages = 0, {}, {}
+        for offset in range(HEADER.size, len(self._map), SLOT.size):
+            check, data = SLOT.unpack_from(self._map, offset)
+            if not data: continue
+            used += 1
+            depth, age = data >> 16 & 0xFF, (self.age - (data >> 56)) & 0xFF
+            depths[depth] = depths.get(depth, 0) + 1
+            ages[age] = ages.get(age, 0) + 1
+        return used, depths, ages
+
+    def flush(self):
+        if self.writable: self._map.flush()
+
+    def close(self):
+        if self._map is not None and not self._map.closed:
+            self.flush(); self._map.close()
+        self._file.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create or inspect a persistent position cache.")
+    parser.add_argument("path")
+    parser.add_argument("--create", action="store_true", help="create an empty cache (replacing any file)")
+    parser.add_argument("--size-mb", type=float, default=64)
+    args = parser.parse_args(argv)
+    if args.create:
+        create(args.path, args.size_mb)
+        print(f"created {args.path}: {os.path.getsize(args.path) / 1e6:.1f} MB")
+        return 0
+    cache = PositionCache(args.path, writable=False, warm=False)
+    used, depths, ages = cache.stats()
+    cache.close()
+    print(f"{used} of {cache.slots} slots used ({used / cache.slots:.1%}), generation {cache.age}")
+    print("  by depth: " + ", ".join(f"{d}: {n}" for d, n in sorted(depths.items())))
+    print("  by age:   " + ", ".join(f"{a}: {n}" for a, n in sorted(ages.items())))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# Terminal output for interactive play: buffered frames, ANSI redraws and pacing.
+#
+# A frame (the board panel) is drawn at the top of the screen; messages and prompts
+# scroll below it. On an ANSI terminal the next frame rewrites only the frame lines that
+# changed and clears the messages under it, unless those could have scrolled the frame
+# off its rows, in which case the screen is cleared and the frame redrawn whole. Output
+# is collected in a buffer and written at frames, pauses and prompts.
+#
+# Pauses go through a Pacing policy instead of fixed sleeps:
+#     instant    no pauses (scripted or remote sessions)
+#     animated   short pauses, a quarter of the nominal length
+#     real-time  the nominal pauses
+import os
+import shutil
+import sys
+import time
+
+HOME_AND_CLEAR = "\x1b[H\x1b[2J"
+CLEAR_LINE_END = "\x1b[K"
+CLEAR_BELOW = "\x1b[J"
+PACINGS = {'instant': 0.0, 'animated': 0.25, 'real-time': 1.0}
+
+
+class Pacing:
+    def __init__(self, mode='real-time'):
+        if mode not in PACINGS: raise ValueError(f"unknown pacing {mode!r}; choose from {', '.join(PACINGS)}")
+        self.mode = mode
+        self.scale = PACINGS[mode]
+
+    def pause(self, seconds):
+        if self.scale and seconds > 0: time.sleep(seconds * self.scale)
+
+
+class Renderer:
+    def __init__(self, out=None, pacing=None, ansi=None):
+        self.out = out or sys.stdout
+        interactive = hasattr(self.out, "isatty") and self.out.isatty()
+        # Terminals get escapes and real-time pacing; pipes get plain text and no pauses.
+        self.ansi = interactive and (os.name != 'nt' or 'WT_SESSION' in os.environ) if ansi is None else ansi
+        self.pacing = pacing if isinstance(pacing, Pacing) else Pacing(pacing or ('real-time' if interactive else 'instant'))
+        self._buffer = []
+        self._frame = None    # lines of the frame on screen
+        self._below = 0       # screen rows written under it since
+
+    def _rows(self, text):
+        columns = max(1, shutil.get_terminal_size().columns)
+        return sum(max(1, -(-len(line) // columns)) for line in text.split("\n"))
+
+    def frame(self, lines):
+        if not self.ansi:
+            self._buffer.append("\n".join(lines) + "\n")
+            self.flush(); return
+        height = shutil.get_terminal_size().lines
+        old = self._frame
+        if old is None or len(old) != len(lines) or self._rows("\n".join(lines)) + self._below >= height:
+            self._buffer.append(HOME_AND_CLEAR + "\n".join(lines) + "\n")
+        else:
+            for row, (before, after) in enumerate(zip(old, lines), 1):
+                if before != after: self._buffer.append(f"\x1b[{row};1H{after}{CLEAR_LINE_END}")
+            self._buffer.append(f"\x1b[{len(lines) + 1};1H{CLEAR_BELOW}")
+        self._frame = list(lines)
+        self._below = 0
+        self.flush()
+
+    def clear(self):
+        if self.ansi: self._buffer.append(HOME_AND_CLEAR)
+        self._frame = None
+        self._below = 0
+
+    def say(self, *args):
+        text = " ".join(str(arg) for arg in args)
+        self._below += self._rows(text)
+        self._buffer.append(text + "\n")
+
+    def ask(self, prompt):
+        self._below += self._rows(prompt)
+        self.flush()
+        return input(prompt)
+
+    def pause(self, seconds):
+        self.flush()
+        self.pacing.pause(seconds)
+
+    def flush(self):
+        if self._buffer:
+            self.out.write("".join(self._buffer))
+            self._buffer.clear()
+        self.out.flush()
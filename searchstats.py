@@ -0,0 +1,163 @@
+# Per-move search statistics: node counts by ply, cutoffs, branching factor,
+# time spent in move generation / removal generation / evaluation, and table hit rates.
+#
+# Collection is off unless game.collect_stats is set; the timers are attached by shadowing
+# the game's methods for the duration of one search, so the normal path pays nothing.
+import json
+import time
+from contextlib import contextmanager
+
+
+class SearchStats:
+    def __init__(self, player=None):
+        self.player = player
+        self.depth = 0
+        self.score = None
+        self.move = None
+        self.elapsed = 0.0
+        self.nodes = 0
+        self.leaf_evals = 0
+        self.beta_cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.ply_nodes = []         # nodes visited at each ply from the root
+        self.iteration_nodes = []   # total nodes after each completed depth
+        self.movegen_calls = 0
+        self.movegen_time = 0.0
+        self.removal_calls = 0
+        self.removal_time = 0.0
+        self.eval_time = 0.0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tb_lookups = 0
+        self.tb_hits = 0
+        # Re-searches by pvs_search: null-window fail highs, verified reductions, aspiration misses.
+        self.pvs_researches = 0
+        self.lmr_researches = 0
+        self.aspiration_researches = 0
+
+    def node(self, ply):
+        if ply >= len(self.ply_nodes): self.ply_nodes.extend([0] * (ply + 1 - len(self.ply_nodes)))
+        self.ply_nodes[ply] += 1
+
+    def cutoff(self, move_index):
+        self.beta_cutoffs += 1
+        if move_index == 0: self.first_move_cutoffs += 1
+
+    @property
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.beta_cutoffs if self.beta_cutoffs else 0.0
+
+    @property
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    @property
+    def tb_hit_rate(self):
+        return self.tb_hits / self.tb_lookups if self.tb_lookups else 0.0
+
+    def ply_branching(self):
+        # Nodes at ply p + 1 per node at ply p.
+        return [round(b / a, 3) if a else 0.0 for a, b in zip(self.ply_nodes, self.ply_nodes[1:])]
+
+    def iteration_branching(self):
+        # Effective branching factor: growth of the tree from one completed depth to the next.
+        out = []
+        for i in range(1, len(self.iteration_nodes)):
+            prev = self.iteration_nodes[i - 1]
+            grown = self.iteration_nodes[i] - prev
+            out.append(round(grown / prev, 3) if prev else 0.0)
+        return out
+
+    def to_dict(self):
+        return {
+            'player': self.player, 'depth': self.depth, 'score': self.score, 'move': self.move,
+            'elapsed': round(self.elapsed, 6), 'nodes': self.nodes, 'leaf_evals': self.leaf_evals,
+            'nps': round(self.nodes / self.elapsed) if self.elapsed else 0,
+            'beta_cutoffs': self.beta_cutoffs, 'first_move_cutoffs': self.first_move_cutoffs,
+            'first_move_cutoff_rate': round(self.first_move_cutoff_rate, 4),
+            'ply_nodes': self.ply_nodes, 'ply_branching': self.ply_branching(),
+            'iteration_nodes': self.iteration_nodes, 'ebf': self.iteration_branching(),
+            'movegen_calls': self.movegen_calls, 'movegen_time': round(self.movegen_time, 6),
+            'removal_calls': self.removal_calls, 'removal_time': round(self.removal_time, 6),
+            'eval_time': round(self.eval_time, 6),
+            'tt_probes': self.tt_probes, 'tt_hits': self.tt_hits, 'tt_hit_rate': round(self.tt_hit_rate, 4),
+            'tb_lookups': self.tb_lookups, 'tb_hits': self.tb_hits, 'tb_hit_rate': round(self.tb_hit_rate, 4),
+            'pvs_researches': self.pvs_researches, 'lmr_researches': self.lmr_researches,
+            'aspiration_researches': self.aspiration_researches,
+        }
+
+    def summary(self):
+        ebf = self.iteration_branching()
+        return (f"{self.nodes} nodes, {self.leaf_evals} evals, {self.beta_cutoffs} cutoffs "
+                f"({self.first_move_cutoff_rate:.0%} first move), EBF {ebf[-1] if ebf else 0:.2f}, "
+                f"time movegen {self.movegen_time * 1000:.0f}ms / removals {self.removal_time * 1000:.0f}ms / "
+                f"eval {self.eval_time * 1000:.0f}ms, TT hits {self.tt_hit_rate:.0%}"
+                + (f", TB hits {self.tb_hits}" if self.tb_lookups else "")
+                + (f", re-searches PVS {self.pvs_researches} / LMR {self.lmr_researches} / aspiration "
+                   f"{self.aspiration_researches}" if self.pvs_researches or self.lmr_researches or self.aspiration_researches else ""))
+
+    def write_jsonl(self, path):
+        with open(path, "a") as f:
+            f.write(json.dumps(self.to_dict()) + "\n")
+
+
+def _timed(method, stats, time_attr, calls_attr=None):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            setattr(stats, time_attr, getattr(stats, time_attr) + time.perf_counter() - start)
+            if calls_attr: setattr(stats, calls_attr, getattr(stats, calls_attr) + 1)
+    return wrapper
+
+
+def _timed_stages(method, stats, time_attr, calls_attr):
+    # For a generator method: times every resume, so stages built lazily between moves count too.
+    def wrapper(*args, **kwargs):
+        setattr(stats, calls_attr, getattr(stats, calls_attr) + 1)
+        stages = method(*args, **kwargs)
+        while True:
+            start = time.perf_counter()
+            try:
+                move = next(stages)
+            except StopIteration:
+                return
+            finally:
+                setattr(stats, time_attr, getattr(stats, time_attr) + time.perf_counter() - start)
+            yield move
+    return wrapper
+
+
+@contextmanager
+def instrument(game, stats):
+    # Routes game's generators, evaluation and table lookups through stats while active.
+    def tablebase_score(maximizing_player):
+        if game.tablebase: stats.tb_lookups += 1
+        score = original_tb(maximizing_player)
+        if score is not None: stats.tb_hits += 1
+        return score
+
+    def evaluate_board(maximizing_player=None):
+        stats.leaf_evals += 1
+        return timed_eval(maximizing_player)
+
+    original_tb = game.tablebase_score
+    timed_eval = _timed(game.evaluate_board, stats, 'eval_time')
+    # Search generates its moves only through _staged_moves (get_valid_moves is its last stage).
+    game._staged_moves = _timed_stages(game._staged_moves, stats, 'movegen_time', 'movegen_calls')
+    game._ordered_removals = _timed(game._ordered_removals, stats, 'removal_time', 'removal_calls')
+    game.evaluate_board = evaluate_board
+    game.tablebase_score = tablebase_score
+    game._stats = stats
+    tt_probes, tt_hits = game.tt.probes, game.tt.hits
+    start = time.time()
+    try:
+        yield stats
+    finally:
+        stats.elapsed = time.time() - start
+        stats.tt_probes = game.tt.probes - tt_probes
+        stats.tt_hits = game.tt.hits - tt_hits
+        for name in ('_staged_moves', '_ordered_removals', 'evaluate_board', 'tablebase_score'):
+            del game.__dict__[name]
+        game._stats = None
@@ -0,0 +1,318 @@
+# Asyncio game server: many concurrent games over a line protocol, with AI searches run
+# by a shared process pool so the event loop never blocks on thinking.
+#
+#     python server.py --port 7070 --workers 4 --think 1.0    # serve on 127.0.0.1:7070
+#     python server.py --unix /tmp/nmm.sock                   # or on a Unix socket
+#     python server.py --stand-in 200 --think 0.05            # 200 random clients against a local server
+#
+# Protocol: one UTF-8 line per message. The client plays O (moves first) unless NEW says X.
+#   client                      server
+#   NEW [O|X]                   OK, then the AI's moves if it starts, STATE and TURN
+#   PLAY <move>                 OK, the AI reply (AI <move>), EVENT lines, STATE, then TURN or OVER
+#   MOVES                       MOVES <every legal move, removals spelled out>
+#   STATE                       STATE <board> <O to place> <X to place> <O bomb> <X bomb> <bombs>
+#   UNDO                        OK and STATE/TURN back at the client's previous turn
+#   QUIT                        BYE
+# Moves (notation.py): D7 places, D7-D6 moves, *D7 arms a bomb on D7; a removal is appended as xA1
+# (D6-D7xA1). Errors come back as ERR <reason> and leave the game unchanged.
+# EVENT BOMB <side> <point> and EVENT BLAST <side> <point> <destroyed points...> report bombs.
+#
+# Each session has at most one search queued, and the pool serves them first come first served.
+# Every search is given `think` seconds but must answer within `deadline` seconds of
+# being queued, so under load think time shrinks evenly instead of replies piling up.
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import bitboard
+from notation import SIDES, format_move, parse_move
+
+MAX_PLIES = 300     # game drawn after this many plies
+
+_worker_game = None
+
+
+def _search(state, player, think_time, deadline, cache_path=None):
+    # Runs in a pool process: best full move for `player` in `state` (see to_compact).
+    global _worker_game
+    if _worker_game is None:
+        from main import NineMensMorris
+        _worker_game = NineMensMorris()
+        _worker_game.quiet = True
+        if cache_path:
+            import poscache
+            _worker_game.position_cache = poscache.PositionCache(cache_path)
+    game = _worker_game
+    game.load_compact(state)
+    full_move = game.book_move(player == 2)
+    if full_move is not None: return full_move, 0
+    # Depth 1 always completes, so a request picked up after its deadline still gets a move.
+    budget = max(0.0, min(think_time, deadline - time.time()))
+    _, full_move = game.iterative_deepening(player == 2, time_limit=budget)
+    return full_move, game.search_depth_reached
+
+
+class EnginePool:
+    # A fixed number of search processes shared by every session.
+    def __init__(self, workers=None, think_time=1.0, deadline=5.0, cache_path=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.think_time = think_time
+        self.deadline = deadline
+        self.cache_path = cache_path   # persistent position cache shared by the workers
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.searches = 0
+
+    async def best_move(self, game, player):
+        self.searches += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, _search, game.to_compact(), player,
+                                          self.think_time, time.time() + self.deadline, self.cache_path)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def legal_moves(game, player):
+    # Every full move for player: moves with each removal they allow, then bomb arming.
+    removals = bitboard.bits(game.removal_mask(player))
+    out = []
+    for move in game.get_valid_moves(player):
+        if removals and game.move_creates_mill_heuristic(move, player):
+            out.extend((move, remove_pos) for remove_pos in removals)
+        else:
+            out.append((move, None))
+    out.extend(((pos, -2), None) for pos in range(24) if game.can_arm(pos, player))
+    return out
+
+
+def state_line(game):
+    board = "".join(".OX"[v] for v in game.board)
+    bombs = ",".join(f"{SIDES[b['player_id']]}{game.coordinates[b['position']]}:{b['timer']}"
+                     for b in game.bombs_on_board) or "-"
+    return (f"STATE {board} {game.player_pieces_to_place} {game.ai_pieces_to_place} "
+            f"{int(game.player_bomb_available)} {int(game.ai_bomb_available)} {bombs}")
+
+
+class Session:
+    def __init__(self, pool, reader, writer, max_plies=MAX_PLIES):
+        self.pool = pool
+        self.reader = reader
+        self.writer = writer
+        self.max_plies = max_plies
+        self.game = None
+        self.human = 1
+        self.plies = 0
+        self.over = None
+
+    def send(self, line):
+        self.writer.write(line.encode() + b"\n")
+
+    async def run(self):
+        self.send("HELLO nmm/1")
+        try:
+            while True:
+                await self.writer.drain()
+                line = await self.reader.readline()
+                if not line: break
+                words = line.decode(errors="replace").split()
+                if not words: continue
+                command, args = words[0].upper(), words[1:]
+                if command == "QUIT":
+                    self.send("BYE"); break
+                handler = getattr(self, "do_" + command.lower(), None)
+                if handler is None: self.send(f"ERR unknown command {command}")
+                else: await handler(args)
+            await self.writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.writer.close()
+
+    async def do_new(self, args):
+        from main import NineMensMorris
+        side = args[0].upper() if args else "O"
+        if side not in ("O", "X"): self.send("ERR side must be O or X"); return
+        self.game = NineMensMorris()
+        self.game.quiet = True
+        self.game.tablebase = self.game.opening_book = None   # searches happen in the pool
+        self.human = 1 if side == "O" else 2
+        self.plies = 0
+        self.over = None
+        self.send("OK")
+        if self.human == 2: await self._engine_turn()
+        self._start_turn()
+
+    async def do_play(self, args):
+        game = self.game
+        if game is None or self.over: self.send("ERR no game in progress"); return
+        try: full_move = parse_move(args[0] if args else "")
+        except (KeyError, ValueError, IndexError): self.send("ERR bad move syntax"); return
+        if full_move not in legal_moves(game, self.human): self.send("ERR illegal move"); return
+        self.send("OK")
+        self._apply(self.human, full_move)
+        await self._engine_turn()
+        self._start_turn()
+
+    async def do_moves(self, args):
+        if self.game is None or self.over: self.send("MOVES"); return
+        self.send("MOVES " + " ".join(format_move(m) for m in legal_moves(self.game, self.human)))
+
+    async def do_state(self, args):
+        if self.game is None: self.send("ERR no game in progress"); return
+        self.send(state_line(self.game))
+
+    async def do_undo(self, args):
+        # Never back past the engine's opening move when it plays O.
+        node = self.game.history.current if self.game else None
+        if node is None or node.parent is None or (self.human == 2 and node.parent.parent is None):
+            self.send("ERR nothing to undo"); return
+        self.game.history.undo()
+        self.plies = max(0, self.plies - 2)
+        self.over = None
+        self.game.update_phase()
+        self.send("OK")
+        self.send(state_line(self.game))
+        self.send("TURN " + SIDES[self.human])
+
+    def _apply(self, player, full_move):
+        game = self.game
+        (to_pos, from_pos), remove_pos = full_move
+        if from_pos == -2: game.arm_bomb(player, to_pos)
+        elif game.make_move((to_pos, from_pos), player) and remove_pos is not None:
+            game.perform_removal(remove_pos, player)
+        self.plies += 1
+
+    def _tick(self, player):
+        # Start of player's turn: bombs count down; True once the game is over.
+        for event in self.game.tick_bombs(player):
+            bomb = event[1]
+            hits = " ".join(self.game.coordinates[pos] for pos, _, _ in event[2])
+            self.send(f"EVENT BLAST {SIDES[bomb['player_id']]} {self.game.coordinates[bomb['position']]} {hits}".rstrip())
+        self.game.update_phase()
+        if self.game.is_game_over(): self.over = {"Player": "O", "AI": "X"}[self.game.winner]
+        elif self.plies >= self.max_plies: self.over = "DRAW"
+        return self.over is not None
+
+    async def _engine_turn(self):
+        engine = 3 - self.human
+        if self._tick(engine): return
+        full_move, _ = await self.pool.best_move(self.game, engine)
+        if full_move is None or full_move not in legal_moves(self.game, engine):
+            moves = legal_moves(self.game, engine)
+            if not moves: self.over = SIDES[self.human]; return
+            full_move = moves[0]
+        self._apply(engine, full_move)
+        if full_move[0][1] == -2: self.send(f"EVENT BOMB {SIDES[engine]} {self.game.coordinates[full_move[0][0]]}")
+        self.send("AI " + format_move(full_move))
+
+    def _start_turn(self):
+        if not self.over and not self._tick(self.human):
+            if not legal_moves(self.game, self.human): self.over = SIDES[3 - self.human]
+        self.game.history.commit()
+        self.send(state_line(self.game))
+        self.send(f"OVER {self.over}" if self.over else "TURN " + SIDES[self.human])
+
+
+async def serve(pool, host="127.0.0.1", port=7070, unix_path=None, max_plies=MAX_PLIES):
+    async def handle(reader, writer):
+        await Session(pool, reader, writer, max_plies).run()
+    if unix_path: return await asyncio.start_unix_server(handle, path=unix_path, backlog=1024)
+    return await asyncio.start_server(handle, host, port, backlog=1024)
+
+
+async def stand_in_client(connect, games=1, seed=0, latencies=None):
+    # A client that plays random legal moves; returns the results ("O", "X" or "DRAW").
+    rng = random.Random(seed)
+    reader, writer = await connect()
+
+    async def expect(*prefixes):
+        while True:
+            line = (await reader.readline()).decode().strip()
+            if not line: raise ConnectionError("server closed the connection")
+            if line.startswith(prefixes): return line
+
+    results = []
+    await expect("HELLO")
+    for _ in range(games):
+        writer.write(b"NEW\n")
+        sent = time.perf_counter()
+        while True:
+            line = await expect("TURN", "OVER")
+            if latencies is not None: latencies.append(time.perf_counter() - sent)
+            if line.startswith("OVER"):
+                results.append(line.split()[1]); break
+            writer.write(b"MOVES\n")
+            moves = (await expect("MOVES")).split()[1:]
+            writer.write(f"PLAY {rng.choice(moves)}\n".encode())
+            sent = time.perf_counter()
+            reply = await expect("OK", "ERR")
+            if reply.startswith("ERR"): raise RuntimeError(f"server refused a listed move: {reply}")
+    writer.write(b"QUIT\n")
+    await writer.drain()
+    writer.close()
+    return results
+
+
+async def _run_stand_in(args, pool):
+    # Serves on a free local port and plays args.stand_in random clients against it.
+    server = await serve(pool, args.host, 0, args.unix, args.max_plies)
+    if args.unix: connect = lambda: asyncio.open_unix_connection(args.unix)
+    else:
+        port = server.sockets[0].getsockname()[1]
+        connect = lambda: asyncio.open_connection(args.host, port)
+    latencies = []
+    start = time.time()
+    async with server:
+        outcomes = await asyncio.gather(*[stand_in_client(connect, args.games, seed, latencies)
+                                          for seed in range(args.stand_in)])
+    elapsed = time.time() - start
+    results = [r for outcome in outcomes for r in outcome]
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else 0.0
+    print(f"{len(results)} games by {args.stand_in} clients in {elapsed:.1f}s, {pool.searches} searches "
+          f"on {pool.workers} workers")
+    print(f"  O {results.count('O')}  X {results.count('X')}  draws {results.count('DRAW')}")
+    print(f"  reply latency ms: p50 {pct(0.5):.0f}  p90 {pct(0.9):.0f}  p99 {pct(0.99):.0f}  max {pct(1):.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve Nine Men's Morris games over a line protocol.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7070)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="search processes")
+    parser.add_argument("--think", type=float, default=1.0, help="search time per AI move, seconds")
+    parser.add_argument("--deadline", type=float, default=5.0, help="longest wait for an AI move, seconds")
+    parser.add_argument("--max-plies", type=int, default=MAX_PLIES, help="plies before a game is drawn")
+    parser.add_argument("--cache", help="persistent position cache file shared by the search workers")
+    parser.add_argument("--stand-in", type=int, metavar="N", help="play N local random clients and exit")
+    parser.add_argument("--games", type=int, default=1, help="games per stand-in client")
+    args = parser.parse_args(argv)
+    if args.cache:
+        import poscache
+        poscache.PositionCache(args.cache, warm=False).close()   # create or validate it up front
+    pool = EnginePool(args.workers, args.think, args.deadline, args.cache)
+    try:
+        if args.stand_in:
+            asyncio.run(_run_stand_in(args, pool))
+            return 0
+
+        async def run():
+            server = await serve(pool, args.host, args.port, args.unix, args.max_plies)
+            where = args.unix or f"{args.host}:{args.port}"
+            print(f"Serving on {where} with {pool.workers} search workers")
+            async with server: await server.serve_forever()
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+# The 16 symmetries of the board: 4 rotations x 2 reflections x inner/outer ring swap,
+# as point permutations and per-byte mask images.
+#
+# A position's canonical form is its smallest image over all 16 symmetries, so all
+# symmetric variants share one cache, book or table entry. Store moves with
+# to_canonical(move, sym) and map them back with from_canonical(move, sym), where sym is
+# the symmetry that produced the canonical form of the position being looked up.
+from bitboard import BIT, ADJACENT_POSITIONS, MILLS, bits
+from ttable import PIECE_KEYS, PLACE_KEYS, SIDE_KEY, BOMB_AVAILABLE_KEYS, BOMB_KEYS, BOMB_TIMERS
+
+# Points of each ring clockwise from its top-left corner (outer, middle, inner).
+RINGS = [
+    [0, 1, 2, 14, 23, 22, 21, 9],
+    [3, 4, 5, 13, 20, 19, 18, 10],
+    [6, 7, 8, 12, 17, 16, 15, 11],
+]
+_RING_OF = {p: (r, i) for r, ring in enumerate(RINGS) for i, p in enumerate(ring)}
+
+
+def _permutation(rotation, reflect, swap):
+    perm = [0] * 24
+    for p, (ring, i) in _RING_OF.items():
+        if reflect: i = -i
+        perm[p] = RINGS[2 - ring if swap else ring][(i + 2 * rotation) % 8]
+    return perm
+
+
+# PERMUTATIONS[s][p] is the image of point p under symmetry s; s == 0 is the identity.
+PERMUTATIONS = [_permutation(rot, ref, swap) for swap in (0, 1) for ref in (0, 1) for rot in range(4)]
+INVERSE = [PERMUTATIONS.index([perm.index(p) for p in range(24)]) for perm in PERMUTATIONS]
+
+for _perm in PERMUTATIONS:
+    assert sorted(sorted(_perm[p] for p in mill) for mill in MILLS) == sorted(sorted(m) for m in MILLS)
+    assert all(sorted(_perm[a] for a in ADJACENT_POSITIONS[p]) == sorted(ADJACENT_POSITIONS[_perm[p]]) for p in range(24))
+
+# _BYTE_IMAGES[s][k][b]: image under s of the mask whose byte k is b.
+_BYTE_IMAGES = [
+    [[sum(BIT[perm[8 * k + i]] for i in range(8) if b >> i & 1) for b in range(256)] for k in range(3)]
+    for perm in PERMUTATIONS
+]
+
+
+def transform_mask(mask, sym):
+    lo, mid, hi = _BYTE_IMAGES[sym]
+    return lo[mask & 0xFF] | mid[mask >> 8 & 0xFF] | hi[mask >> 16]
+
+
+def transform_point(pos, sym):
+    # -1 (placement) and None (no removal) map to themselves.
+    if pos is None or pos < 0: return pos
+    return PERMUTATIONS[sym][pos]
+
+
+def transform_move(full_move, sym):
+    # Maps ((to, from), remove) move details through symmetry `sym`.
+    (to_pos, from_pos), remove_pos = full_move
+    return (transform_point(to_pos, sym), transform_point(from_pos, sym)), transform_point(remove_pos, sym)
+
+
+def to_canonical(full_move, sym):
+    # Move details in a position -> the same move in its canonical form.
+    return transform_move(full_move, sym)
+
+
+def from_canonical(full_move, sym):
+    # Move details in a canonical form -> the same move in the position that produced it.
+    return transform_move(full_move, INVERSE[sym])
+
+
+def canonical_pair(first, second):
+    # Smallest image of the mask pair over all symmetries, ordered by (second, first).
+    # Returns (first', second', sym) with first' == transform_mask(first, sym).
+    best = None
+    for sym, (lo, mid, hi) in enumerate(_BYTE_IMAGES):
+        a = lo[first & 0xFF] | mid[first >> 8 & 0xFF] | hi[first >> 16]
+        b = lo[second & 0xFF] | mid[second >> 8 & 0xFF] | hi[second >> 16]
+        key = b << 24 | a
+        if best is None or key < best[0]: best = (key, a, b, sym)
+    return best[1], best[2], best[3]
+
+
+def canonical_syms(first, second):
+    # Like canonical_pair, but with every symmetry that gives the canonical pair (the
+    # position's own symmetries), in ascending order.
+    best, syms = None, []
+    for sym, (lo, mid, hi) in enumerate(_BYTE_IMAGES):
+        a = lo[first & 0xFF] | mid[first >> 8 & 0xFF] | hi[first >> 16]
+        b = lo[second & 0xFF] | mid[second >> 8 & 0xFF] | hi[second >> 16]
+        key = b << 24 | a
+        if best is None or key < best: best, syms = key, [sym]
+        elif key == best: syms.append(sym)
+    return best & 0xFFFFFF, best >> 24, syms
+
+
+def transform_state(state, sym):
+    # Image of a NineMensMorris.to_compact() state: pieces and bomb points move, the rest stays.
+    player_bb, ai_bb, player_to_place, ai_to_place, player_bomb, ai_bomb, next_bomb_id, bombs = state
+    perm = PERMUTATIONS[sym]
+    return (transform_mask(player_bb, sym), transform_mask(ai_bb, sym), player_to_place, ai_to_place,
+            player_bomb, ai_bomb, next_bomb_id, tuple((i, owner, perm[pos], timer) for i, owner, pos, timer in bombs))
+
+
+def canonical_state(state):
+    # (canonical state, sym) for a to_compact() state. Ties between the position's own
+    # symmetries are broken by the bomb points, so equal canonical states are equal positions.
+    player_c, ai_c, syms = canonical_syms(state[0], state[1])
+    bombs = state[7]
+    if bombs and len(syms) > 1:
+        sym = min(syms, key=lambda s: tuple((owner, PERMUTATIONS[s][pos], timer) for _, owner, pos, timer in bombs))
+        return transform_state(state, sym), sym
+    sym = syms[0]
+    if not bombs: return (player_c, ai_c) + tuple(state[2:]), sym
+    return transform_state(state, sym), sym
+
+
+def canonical_hash(state, maximizing_player):
+    # (key, sym): NineMensMorris.position_key of the canonical form, the same for all 16 images.
+    canonical, sym = canonical_state(state)
+    player_bb, ai_bb, player_to_place, ai_to_place, player_bomb, ai_bomb, _, bombs = canonical
+    key = PLACE_KEYS[1][player_to_place] ^ PLACE_KEYS[2][ai_to_place]
+    for pos in bits(player_bb): key ^= PIECE_KEYS[1][pos]
+    for pos in bits(ai_bb): key ^= PIECE_KEYS[2][pos]
+    if maximizing_player: key ^= SIDE_KEY
+    if player_bomb: key ^= BOMB_AVAILABLE_KEYS[1]
+    if ai_bomb: key ^= BOMB_AVAILABLE_KEYS[2]
+    for _, owner, pos, timer in bombs: key ^= BOMB_KEYS[owner][pos][timer % BOMB_TIMERS]
+    return key, sym
@@ -0,0 +1,280 @@
+# Endgame tables for positions where at least one side is flying, built offline by
+# retrograde analysis and read back through mmap.
+#
+# Table T(a, b) covers every position with both sides done placing and no armed bombs,
+# `a` pieces for the side to move and `b` for the other side, min(a, b) == 3.
+# One byte per position: 0 draw, 1 + d the side to move wins in d plies,
+# 128 + d it loses in d plies (d is capped at MAX_DISTANCE).
+#
+#     python tablebase.py --max-pieces 4
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from functools import lru_cache
+from itertools import combinations
+
+from bitboard import BIT, ADJ_MASK, FULL, MILL_MASKS, bits, popcount, forms_mill, removable_mask, can_slide, slide_mobility
+
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tablebases")
+MAGIC = b"NMMTB1\0\0"
+HEADER = struct.Struct("<8sBB6x")
+DRAW, WIN, LOSS = 0, 1, 2
+MAX_DISTANCE = 126
+
+
+def encode(result, distance):
+    if result == DRAW: return 0
+    distance = min(distance, MAX_DISTANCE)
+    return 1 + distance if result == WIN else 128 + distance
+
+
+def decode(code):
+    if code == 0: return DRAW, 0
+    if code < 128: return WIN, code - 1
+    return LOSS, code - 128
+
+
+def table_filename(a, b):
+    return f"tb_{a}_{b}.bin"
+
+
+@lru_cache(maxsize=None)
+def _subsets(k, n):
+    # k-subsets of range(n) as masks; ascending mask order is the colex rank order.
+    return sorted(sum(BIT[p] for p in c) for c in combinations(range(n), k))
+
+
+class Layout:
+    # Perfect index of (side-to-move mask, other-side mask) pairs for one material split.
+    # The other side's pieces are ranked among the 24 - a points left free.
+    def __init__(self, a, b):
+        self.a, self.b = a, b
+        self.stm_masks = _subsets(a, 24)
+        self.stm_rank = {m: i for i, m in enumerate(self.stm_masks)}
+        self.opp_masks = _subsets(b, 24 - a)
+        self.opp_rank = {m: i for i, m in enumerate(self.opp_masks)}
+        self.opp_size = len(self.opp_masks)
+        self.size = len(self.stm_masks) * self.opp_size
+
+    def index(self, stm, opp):
+        compressed = 0
+        for p in bits(opp):
+            compressed |= BIT[p - popcount(stm & (BIT[p] - 1))]
+        return self.stm_rank[stm] * self.opp_size + self.opp_rank[compressed]
+
+    def position(self, index):
+        rank, compressed_rank = divmod(index, self.opp_size)
+        stm = self.stm_masks[rank]
+        free = bits(FULL ^ stm)
+        opp = 0
+        for i in bits(self.opp_masks[compressed_rank]):
+            opp |= BIT[free[i]]
+        return stm, opp
+
+    def positions(self):
+        # Every (stm, opp) pair in index order.
+        for stm in self.stm_masks:
+            free = bits(FULL ^ stm)
+            for compressed in self.opp_masks:
+                opp = 0
+                for i in bits(compressed):
+                    opp |= BIT[free[i]]
+                yield stm, opp
+
+
+@lru_cache(maxsize=None)
+def layout(a, b):
+    return Layout(a, b)
+
+
+class Tablebase:
+    def __init__(self, directory=DEFAULT_DIRECTORY):
+        self.directory = directory
+        self.tables = {}
+        self._files = []
+        if not os.path.isdir(directory): return
+        for name in sorted(os.listdir(directory)):
+            if not (name.startswith("tb_") and name.endswith(".bin")): continue
+            path = os.path.join(directory, name)
+            f = open(path, "rb")
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                f.close(); continue
+            magic, a, b = HEADER.unpack_from(data, 0)
+            if magic != MAGIC or len(data) != HEADER.size + layout(a, b).size:
+                data.close(); f.close(); continue
+            self.tables[(a, b)] = data
+            self._files.append(f)
+
+    def __bool__(self):
+        return bool(self.tables)
+
+    def __contains__(self, material):
+        return material in self.tables
+
+    def probe(self, stm, opp):
+        # (result, distance) for the side to move, or None without a matching table.
+        a, b = popcount(stm), popcount(opp)
+        data = self.tables.get((a, b))
+        if data is None: return None
+        return decode(data[HEADER.size + layout(a, b).index(stm, opp)])
+
+    def close(self):
+        for data in self.tables.values(): data.close()
+        for f in self._files: f.close()
+        self.tables = {}; self._files = []
+
+
+_default = None
+
+def default_tablebase():
+    # Shared read-only instance over DEFAULT_DIRECTORY; empty if nothing was built.
+    global _default
+    if _default is None: _default = Tablebase(DEFAULT_DIRECTORY)
+    return _default
+
+
+def _capture_moves(stm, empty, flying):
+    # (from, to) moves of the side to move that close a mill.
+    captures = set()
+    for m in MILL_MASKS:
+        target = empty & m
+        if target and popcount(stm & m) == 2:
+            to_pos = bits(target)[0]
+            movers = stm & ~m if flying else ADJ_MASK[to_pos] & stm & ~m
+            for from_pos in bits(movers):
+                captures.add((from_pos, to_pos))
+    return captures
+
+
+def _solve(keys, solved, log):
+    # Retrograde analysis of T(a, b) and T(b, a) together; captures lead into `solved` tables.
+    values = {key: bytearray(layout(*key).size) for key in keys}
+    pending = {key: bytearray(layout(*key).size) for key in keys}
+    capture_loss = {key: bytearray(layout(*key).size) for key in keys}
+    done = {key: bytearray(layout(*key).size) for key in keys}
+    selector = {key: i for i, key in enumerate(keys)}
+    buckets = [[] for _ in range(MAX_DISTANCE + 1)]
+
+    for key in keys:
+        a, b = key
+        val, cnt, cap = values[key], pending[key], capture_loss[key]
+        sel = selector[key]
+        lower_key = (b - 1, a)
+        lower = solved.get(lower_key)
+        lower_layout = layout(*lower_key) if lower is not None else None
+        for index, (stm, opp) in enumerate(layout(a, b).positions()):
+            empty = FULL ^ stm ^ opp
+            if a > 3 and not can_slide(stm, empty):
+                val[index] = encode(LOSS, 0); buckets[0].append(index << 1 | sel); continue
+            if b > 3 and not can_slide(opp, empty):
+                # Mirrors is_game_over: a blocked side loses even when it is not to move.
+                val[index] = encode(WIN, 0); buckets[0].append(index << 1 | sel); continue
+            captures = _capture_moves(stm, empty, a == 3)
+            moves = popcount(stm) * popcount(empty) if a == 3 else slide_mobility(stm, empty)
+            open_moves = moves - len(captures)
+            best_win = None; worst_loss = 0
+            if captures and b == 3:
+                best_win = 1
+            elif captures:
+                if lower is None: raise ValueError(f"table T{lower_key} must be solved first")
+                removable = bits(removable_mask(opp))
+                for from_pos, to_pos in captures:
+                    moved = stm ^ BIT[from_pos] ^ BIT[to_pos]
+                    for remove_pos in removable:
+                        result, distance = decode(lower[lower_layout.index(opp ^ BIT[remove_pos], moved)])
+                        if result == LOSS:
+                            if best_win is None or distance + 1 < best_win: best_win = distance + 1
+                        elif result == WIN:
+                            worst_loss = max(worst_loss, distance + 1)
+                        else:
+                            open_moves += 1  # a drawn capture is never refuted
+            cnt[index] = open_moves
+            cap[index] = min(worst_loss, MAX_DISTANCE)
+            if best_win is not None:
+                val[index] = encode(WIN, best_win); buckets[min(best_win, MAX_DISTANCE)].append(index << 1 | sel)
+            elif open_moves == 0:
+                val[index] = encode(LOSS, worst_loss); buckets[min(worst_loss, MAX_DISTANCE)].append(index << 1 | sel)
+        log(f"  T{key}: {layout(a, b).size} positions initialised")
+
+    for distance in range(MAX_DISTANCE + 1):
+        step = min(distance + 1, MAX_DISTANCE)
+        for item in buckets[distance]:
+            key = keys[item & 1]; index = item >> 1
+            if done[key][index]: continue
+            code = values[key][index]
+            if code != encode(WIN, distance) and code != encode(LOSS, distance): continue
+            done[key][index] = 1
+            lost = code >= 128
+            a, b = key
+            stm, opp = layout(a, b).position(index)
+            pred_key = (b, a); pred_layout = layout(b, a)
+            pred_val, pred_cnt, pred_cap = values[pred_key], pending[pred_key], capture_loss[pred_key]
+            pred_sel = selector[pred_key]
+            empty = FULL ^ stm ^ opp
+            for to_pos in bits(opp):
+                # A move that closed a mill would have been followed by a removal.
+                if forms_mill(opp, to_pos): continue
+                sources = empty if b == 3 else ADJ_MASK[to_pos] & empty
+                base = opp ^ BIT[to_pos]
+                for from_pos in bits(sources):
+                    pred = pred_layout.index(base | BIT[from_pos], stm)
+                    pred_code = pred_val[pred]
+                    if lost:
+                        if pred_code == 0 or encode(WIN, distance + 1) < pred_code < 128:
+                            pred_val[pred] = encode(WIN, distance + 1)
+                            buckets[step].append(pred << 1 | pred_sel)
+                    elif pred_code == 0:
+                        pred_cnt[pred] -= 1
+                        if pred_cnt[pred] == 0:
+                            loss_distance = max(distance + 1, pred_cap[pred])
+                            pred_val[pred] = encode(LOSS, loss_distance)
+                            buckets[min(loss_distance, MAX_DISTANCE)].append(pred << 1 | pred_sel)
+        buckets[distance] = None
+    return values
+
+
+def _write(directory, key, values):
+    path = os.path.join(directory, table_filename(*key))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, *key))
+        f.write(values)
+    os.replace(tmp_path, path)
+
+
+def build(max_pieces=4, directory=DEFAULT_DIRECTORY, log=print):
+    # Solves T(3, 3), then T(3, n) with T(n, 3) for n up to max_pieces, writing each to disk.
+    os.makedirs(directory, exist_ok=True)
+    solved = {}
+    for n in range(3, max_pieces + 1):
+        keys = [(3, 3)] if n == 3 else [(3, n), (n, 3)]
+        start = time.time()
+        values = _solve(keys, solved, log)
+        for key in keys:
+            _write(directory, key, values[key])
+            solved[key] = values[key]
+            counts = [0, 0, 0]
+            for code in values[key]: counts[decode(code)[0]] += 1
+            log(f"T{key}: {counts[WIN]} wins, {counts[LOSS]} losses, {counts[DRAW]} draws")
+        log(f"Solved {keys} in {time.time() - start:.1f}s")
+    return solved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build flying-phase endgame tables.")
+    parser.add_argument("--max-pieces", type=int, default=4, help="largest n for the 3 vs n tables (default 4)")
+    parser.add_argument("--directory", default=DEFAULT_DIRECTORY, help="output directory")
+    args = parser.parse_args(argv)
+    if args.max_pieces < 3 or args.max_pieces > 9:
+        parser.error("--max-pieces must be between 3 and 9")
+    build(args.max_pieces, args.directory)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
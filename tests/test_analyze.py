@@ -0,0 +1,21 @@
+import pytest
+
+import analyze
+import notation
+from main import NineMensMorris
+
+
+def test_zero_time_limit_is_not_unlimited():
+    game = NineMensMorris()
+    game.quiet = True
+    game.opening_book = None
+    state, player = notation.parse_position(notation.START)
+    record = analyze.analyze(game, state, player, time_limit=0, max_depth=8)
+    # The clock is read every few hundred nodes, so a shallow depth or two may still finish.
+    assert 1 <= record['depth'] < 8
+    assert record['best'] is not None
+
+
+def test_cli_rejects_non_positive_time():
+    with pytest.raises(SystemExit):
+        analyze.main(["-", "--time", "0"])
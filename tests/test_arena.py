@@ -0,0 +1,10 @@
+import arena
+
+
+def test_random_opening_mills_remove_a_piece():
+    engine = arena.Engine(max_depth=1, book=False, tablebase=False)
+    removals = 0
+    for seed in range(20):
+        _, plies, _, _, moves, _ = arena.play_game(engine, engine, True, seed, random_plies=40, max_plies=40)
+        removals += sum(1 for move, _ in moves[:plies] if move and move[2] is not None)
+    assert removals > 0
@@ -0,0 +1,16 @@
+import bench
+
+
+def test_perft_check_covers_bomb_positions():
+    names = ['placing-bombs', 'moving-bombs', 'flying-bomb']
+    results = bench.run_perft(3, check=True, names=names, log=lambda *args: None)
+    assert results['flying-bomb']['counts'] == [50, 992, 42738]
+
+
+def test_perft_plays_bomb_blasts():
+    from main import NineMensMorris
+    entry = next(e for e in bench.CORPUS if e['name'] == 'moving-bombs')
+    game = NineMensMorris()
+    player = bench.load_position(game, entry)
+    # O's bomb goes off at the start of ply 3, so the blast shows from depth 4 on.
+    assert bench.perft(game, 4, player) == 12755
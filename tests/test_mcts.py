@@ -0,0 +1,14 @@
+import time
+
+from main import NineMensMorris
+
+
+def test_zero_time_limit_returns_promptly():
+    game = NineMensMorris()
+    game.quiet = True
+    game.search_time_limit = None
+    start = time.time()
+    score, action = game.mcts_search(True, time_limit=0)
+    assert action is not None
+    assert time.time() - start < 5
+    assert game.nodes < 2000
@@ -0,0 +1,17 @@
+import bench
+from main import NineMensMorris
+
+
+def _game(name):
+    game = NineMensMorris()
+    game.quiet = True
+    return game, bench.load_position(game, next(e for e in bench.CORPUS if e['name'] == name))
+
+
+def test_staged_moves_do_not_repeat_a_bomb_hint():
+    game, player = _game('placing-mid')
+    bomb = game.bomb_moves(player)[0]
+    moves = list(game._staged_moves(player, ((bomb, None), None), 0))
+    assert len(moves) == len(set(moves))
+    assert moves[0] == bomb
+    assert set(moves) == set(game.get_valid_moves(player) + game.bomb_moves(player))
@@ -0,0 +1,44 @@
+import pytest
+
+import notation
+
+BOARD = "O......X" + "." * 16
+
+
+def _position(obomb, xbomb, bombs):
+    return f"{BOARD} O 8 8 {obomb} {xbomb} {bombs}"
+
+
+def test_position_round_trip():
+    text = _position(0, 0, "OA7:2,XD5:3")
+    state, player = notation.parse_position(text)
+    assert player == 1
+    assert notation.format_position(state, player) == text
+
+
+def test_start_position():
+    state, player = notation.parse_position(notation.START)
+    assert state == (0, 0, 9, 9, True, True, 0, ())
+    assert player == 1
+
+
+def test_rejects_two_bombs_of_one_side():
+    text = "OO.....X" + "." * 16 + " O 7 8 0 1 OA7:2,OD7:1"
+    with pytest.raises(ValueError, match="two bombs"):
+        notation.parse_position(text)
+
+
+def test_rejects_armed_bomb_still_available():
+    with pytest.raises(ValueError, match="still has its bomb"):
+        notation.parse_position(_position(1, 0, "OA7:2"))
+
+
+@pytest.mark.parametrize("timer", [0, notation.BOMB_TIMER + 1])
+def test_rejects_timer_out_of_range(timer):
+    with pytest.raises(ValueError, match="turns left"):
+        notation.parse_position(_position(0, 1, f"OA7:{timer}"))
+
+
+def test_move_round_trip():
+    for text in ("D7", "A7-D7", "*G7", "A7-D7xA1"):
+        assert notation.format_move(notation.parse_move(text)) == text
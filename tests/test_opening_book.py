@@ -0,0 +1,24 @@
+from main import NineMensMorris
+from opening_book import OpeningBook
+
+
+def test_save_load_round_trip_with_bomb_move(tmp_path):
+    game = NineMensMorris()
+    game.quiet = True
+    game.make_move((0, -1), 1)
+    game.make_move((9, -1), 2)
+    path = str(tmp_path / "book.bin")
+    book = OpeningBook(path)
+    key, sym = game.book_key(True)
+    bomb_move = ((9, -2), None)
+    book.add(key, sym, bomb_move)
+    placement_key, placement_sym = game.book_key(False)
+    book.add(placement_key, placement_sym, ((1, -1), None))
+    book.save()
+
+    loaded = OpeningBook(path)
+    assert len(loaded) == 2
+    assert loaded.lookup(key, sym) == bomb_move
+    assert loaded.lookup(placement_key, placement_sym) == ((1, -1), None)
+    game.opening_book = loaded
+    assert game.book_move(True) == bomb_move
@@ -0,0 +1,36 @@
+import pytest
+
+import bench
+from main import NineMensMorris
+
+
+@pytest.fixture
+def game():
+    game = NineMensMorris()
+    game.quiet = True
+    game.search_workers = 2
+    game.search_time_limit = None
+    bench.load_position(game, next(e for e in bench.CORPUS if e['name'] == 'moving-mid'))
+    yield game
+    game._parallel_searcher.close()
+
+
+def test_zero_time_limit_stops_after_depth_one(game):
+    score, action = game.parallel_search(True, time_limit=0)
+    assert action is not None
+    assert game.search_depth_reached == 1
+
+
+def test_node_limit_bounds_the_search(game):
+    game.search_node_limit = 3000
+    score, action = game.parallel_search(True)
+    assert action is not None
+    assert 1 <= game.search_depth_reached < game.max_search_depth
+    assert game.nodes < 3 * game.search_node_limit
+
+
+def test_stop_search_ends_after_depth_one(game):
+    game.stop_search = True
+    score, action = game.parallel_search(True, max_depth=8)
+    assert action is not None
+    assert game.search_depth_reached == 1
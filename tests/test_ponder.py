@@ -0,0 +1,18 @@
+from main import NineMensMorris
+from ponder import Ponderer
+
+
+def test_ponder_without_time_limit():
+    game = NineMensMorris()
+    game.quiet = True
+    game.opening_book = None
+    game.search_time_limit = None
+    game.max_search_depth = 2
+    ponderer = Ponderer(game)
+    ponderer.start(game, 1)
+    ponderer._thread.join(timeout=60)
+    assert not ponderer._thread.is_alive()
+    assert ponderer.replies > 0
+    game.make_move((0, -1), 1)
+    score, full_move, depth = ponderer.finish(game, 2)
+    assert full_move is not None and depth == 2
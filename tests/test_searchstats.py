@@ -0,0 +1,14 @@
+import bench
+from main import NineMensMorris
+
+
+def test_movegen_time_counts_staged_generation():
+    game = NineMensMorris()
+    game.quiet = True
+    player = bench.load_position(game, next(e for e in bench.CORPUS if e['name'] == 'moving-mid'))
+    game.collect_stats = True
+    game.iterative_deepening(player == 2, time_limit=None, node_limit=None, max_depth=4)
+    stats = game.last_search_stats
+    assert stats.movegen_calls > 0
+    assert stats.movegen_time > 0
+    assert '_staged_moves' not in game.__dict__
@@ -0,0 +1,30 @@
+import tablebase
+from bitboard import BIT
+from main import WIN_SCORE, NineMensMorris
+
+
+class _LosingTable:
+    # Says the side to move loses in one, whatever the position.
+    def probe(self, stm, opp):
+        return tablebase.LOSS, 1
+
+
+def _endgame(player_bomb, ai_bomb):
+    game = NineMensMorris()
+    game.quiet = True
+    game.opening_book = None
+    player_bb = BIT[0] | BIT[1] | BIT[9]
+    ai_bb = BIT[3] | BIT[4] | BIT[21]
+    game.load_compact((player_bb, ai_bb, 0, 0, player_bomb, ai_bomb, 0, ()))
+    game.tablebase = _LosingTable()
+    return game
+
+
+def test_table_used_once_both_bombs_are_spent():
+    assert _endgame(False, False).tablebase_score(True) == -(WIN_SCORE - 1)
+
+
+def test_table_skipped_while_a_bomb_can_be_armed():
+    # An unarmed bomb can change the result, so the bomb-free table must not decide it.
+    assert _endgame(False, True).tablebase_score(True) is None
+    assert _endgame(True, False).tablebase_score(True) is None
@@ -0,0 +1,67 @@
+# Zobrist keys and a fixed-size transposition table for alpha_beta_search.
+import random
+
+_rng = random.Random(0x9E3779B97F4A7C15)
+def _key(): return _rng.getrandbits(64)
+
+# PIECE_KEYS[player][pos]; index 0 (empty) hashes to nothing.
+PIECE_KEYS = [[0] * 24] + [[_key() for _ in range(24)] for _ in (1, 2)]
+# PLACE_KEYS[player][pieces_to_place]
+PLACE_KEYS = [[0] * 10] + [[_key() for _ in range(10)] for _ in (1, 2)]
+SIDE_KEY = _key()  # set when the AI (maximizing side) is to move
+BOMB_AVAILABLE_KEYS = [0, _key(), _key()]
+BOMB_TIMERS = 8
+# BOMB_KEYS[owner][pos][timer]
+BOMB_KEYS = [[[0] * BOMB_TIMERS for _ in range(24)]] + \
+    [[[_key() for _ in range(BOMB_TIMERS)] for _ in range(24)] for _ in (1, 2)]
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+def board_key(board):
+    key = 0
+    for pos, value in enumerate(board):
+        key ^= PIECE_KEYS[value][pos]
+    return key
+
+
+class TranspositionTable:
+    # Rough CPython footprint of one stored entry (key, tuple, move tuples).
+    ENTRY_BYTES = 256
+
+    def __init__(self, size_mb=16):
+        slots = max(1, int(size_mb * 1024 * 1024) // self.ENTRY_BYTES)
+        size = 1 << (slots.bit_length() - 1)
+        self.mask = size - 1
+        self.entries = [None] * size
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def new_search(self):
+        # Entries from earlier searches become preferred victims for replacement.
+        self.generation += 1
+
+    def clear(self):
+        self.entries = [None] * len(self.entries)
+        self.generation = 0
+
+    def probe(self, key):
+        self.probes += 1
+        entry = self.entries[key & self.mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, depth, bound, score, best_move):
+        # Entry layout: (key, depth, bound, score, best_move, generation).
+        index = key & self.mask
+        old = self.entries[index]
+        if old is None or old[0] == key or old[5] != self.generation or depth >= old[1]:
+            self.entries[index] = (key, depth, bound, score, best_move, self.generation)
+            self.stores += 1
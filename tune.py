@@ -0,0 +1,191 @@
+# Texel-style tuning of the evaluate_board weights from self-play (needs numpy).
+#
+#     python arena.py --games 20000 --record selfplay.nmr           # play the games
+#     python tune.py extract selfplay.nmr -o selfplay.npy          # positions -> feature matrix
+#     python tune.py fit selfplay.npy --save-profile tuned          # fit, add to eval_profiles.json
+#     python arena.py --engine-a eval=tuned --engine-b eval=default # check it plays better
+#
+# extract replays every recorded game and stores one int8 row per position after each ply:
+# the unweighted evaluation terms (batcheval.features, columns in evalprofile.WEIGHT_NAMES
+# order) and the game result from the AI's side (0 loss, 1 draw, 2 win). Decided positions
+# are dropped. fit memory-maps the matrix and streams it in chunks: it first picks the
+# scale K that best maps the starting profile's scores to results, then runs Adam on the
+# mean squared error between sigmoid(K * score) and the result, scoring against rows held
+# out at the end of the file.
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+import batcheval
+import evalprofile
+import gamerecord
+from bitboard import BIT
+
+N_WEIGHTS = len(evalprofile.WEIGHT_NAMES)
+LABEL_SCALE = 2   # results are stored doubled so a draw fits an integer
+
+
+def _game_rows(record, skip_plies=0):
+    # (N, N_WEIGHTS + 1) int8 rows for one recorded game.
+    label = {gamerecord.AI_WON: 2, gamerecord.DRAW: 1, gamerecord.PLAYER_WON: 0}[record.result]
+    player_bbs, ai_bbs, player_places, ai_places, bombs = [], [], [], [], []
+    for ply, (_, _, game) in enumerate(record.replay()):
+        if ply < skip_plies: continue
+        player_bbs.append(game.bitboards[1]); ai_bbs.append(game.bitboards[2])
+        player_places.append(game.player_pieces_to_place); ai_places.append(game.ai_pieces_to_place)
+        mask = 0
+        for bomb in game.bombs_on_board: mask |= BIT[bomb['position']]
+        bombs.append(mask)
+    if not player_bbs: return np.zeros((0, N_WEIGHTS + 1), dtype=np.int8)
+    bomb_rows = batcheval.mask_rows(bombs) if any(bombs) else None
+    terms, finished, _ = batcheval.features_bitboards(player_bbs, ai_bbs, player_places, ai_places, bomb_rows)
+    terms = terms[~finished]
+    if len(terms) and np.abs(terms).max() > 127: raise ValueError(f"game {record.index}: feature out of int8 range")
+    rows = np.empty((len(terms), N_WEIGHTS + 1), dtype=np.int8)
+    rows[:, :N_WEIGHTS] = terms
+    rows[:, N_WEIGHTS] = label
+    return rows
+
+
+def _extract_task(task):
+    path, start, stop, skip_plies = task
+    with gamerecord.GameReader(path) as reader:
+        return np.concatenate([_game_rows(reader[i], skip_plies) for i in range(start, stop)] or
+                              [np.zeros((0, N_WEIGHTS + 1), dtype=np.int8)])
+
+
+def extract(paths, output, skip_plies=0, workers=1, chunk_games=500):
+    # Writes the feature matrix of every game in `paths` to `output` (.npy); returns its row count.
+    tasks = []
+    for path in paths:
+        with gamerecord.GameReader(path) as reader: games = len(reader)
+        tasks += [(path, start, min(games, start + chunk_games), skip_plies) for start in range(0, games, chunk_games)]
+    if workers > 1:
+        from multiprocessing import Pool
+        with Pool(workers) as pool: parts = pool.map(_extract_task, tasks)
+    else:
+        parts = [_extract_task(task) for task in tasks]
+    rows = np.concatenate(parts or [np.zeros((0, N_WEIGHTS + 1), dtype=np.int8)])
+    np.save(output, rows)
+    return len(rows)
+
+
+def _chunks(data, chunk_rows):
+    for start in range(0, len(data), chunk_rows):
+        block = np.asarray(data[start:start + chunk_rows], dtype=np.float64)
+        yield block[:, :N_WEIGHTS], block[:, N_WEIGHTS] / LABEL_SCALE
+
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-np.clip(x, -500, 500)))
+
+
+def loss(data, weights, k, chunk_rows=1 << 18):
+    # Mean squared error of sigmoid(k * score) against the results.
+    total, count = 0.0, 0
+    for features, results in _chunks(data, chunk_rows):
+        total += ((_sigmoid(k * (features @ weights)) - results) ** 2).sum()
+        count += len(results)
+    return total / max(1, count)
+
+
+def fit_k(data, weights, low=1e-5, high=1e-1, steps=30):
+    # Golden-section search for the scale in log space; the loss is unimodal in it.
+    ratio = (np.sqrt(5) - 1) / 2
+    a, b = np.log(low), np.log(high)
+    c, d = b - ratio * (b - a), a + ratio * (b - a)
+    fc, fd = loss(data, weights, np.exp(c)), loss(data, weights, np.exp(d))
+    for _ in range(steps):
+        if fc < fd: b, d, fd = d, c, fc; c = b - ratio * (b - a); fc = loss(data, weights, np.exp(c))
+        else: a, c, fc = c, d, fd; d = a + ratio * (b - a); fd = loss(data, weights, np.exp(d))
+    return float(np.exp((a + b) / 2))
+
+
+def fit(data, start=evalprofile.DEFAULT, k=None, epochs=10, batch_rows=1 << 12, learning_rate=1.0,
+        frozen=(), seed=0, progress=None):
+    # Adam over shuffled batches of `data` (rows as written by extract); returns (weights, k).
+    # Weights named in `frozen` keep their starting values.
+    weights = np.array(start[1:], dtype=np.float64)
+    if k is None: k = fit_k(data, weights)
+    free = np.array([name not in frozen for name in evalprofile.WEIGHT_NAMES], dtype=np.float64)
+    m = np.zeros(N_WEIGHTS); v = np.zeros(N_WEIGHTS)
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+    rng = np.random.default_rng(seed)
+    starts = np.arange(0, len(data), batch_rows)
+    step = 0
+    for epoch in range(epochs):
+        for start_row in rng.permutation(starts):
+            block = np.asarray(data[start_row:start_row + batch_rows], dtype=np.float64)
+            features, results = block[:, :N_WEIGHTS], block[:, N_WEIGHTS] / LABEL_SCALE
+            predicted = _sigmoid(k * (features @ weights))
+            gradient = (2 * k / len(results)) * (((predicted - results) * predicted * (1 - predicted)) @ features)
+            step += 1
+            m = beta1 * m + (1 - beta1) * gradient
+            v = beta2 * v + (1 - beta2) * gradient * gradient
+            weights -= free * learning_rate * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + eps)
+        if progress: progress(epoch, weights)
+    return weights, k
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune the evaluation weights on self-play positions.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    p = commands.add_parser("extract", help="build a feature matrix from game record files")
+    p.add_argument("records", nargs="+")
+    p.add_argument("-o", "--output", required=True, help=".npy file to write")
+    p.add_argument("--skip-plies", type=int, default=4, help="opening plies per game to leave out (default 4)")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="parallel replay processes")
+    p = commands.add_parser("fit", help="fit weights to a feature matrix")
+    p.add_argument("matrix")
+    p.add_argument("--start", default="default", help="profile to start from (default 'default')")
+    p.add_argument("--epochs", type=int, default=10)
+    p.add_argument("--batch-rows", type=int, default=1 << 12)
+    p.add_argument("--learning-rate", type=float, default=1.0, help="Adam step size in weight units")
+    p.add_argument("--k", type=float, help="fixed sigmoid scale (fitted to the start profile by default)")
+    p.add_argument("--freeze", default="", help="comma-separated weights to keep, e.g. piece,mill")
+    p.add_argument("--holdout", type=float, default=0.1, help="fraction of rows, from the end, kept out of the fit")
+    p.add_argument("--save-profile", metavar="NAME", help="store the result in eval_profiles.json under NAME")
+    p.add_argument("--profiles", default=evalprofile.DEFAULT_PATH, help="profile file to read and write")
+    args = parser.parse_args(argv)
+
+    if args.command == "extract":
+        started = time.time()
+        rows = extract(args.records, args.output, args.skip_plies, args.workers)
+        print(f"{rows} positions -> {args.output} in {time.time() - started:.1f}s")
+        return 0
+
+    try:
+        start = evalprofile.get_profile(args.start, args.profiles)
+    except ValueError as e:
+        parser.error(str(e))
+    frozen = set(filter(None, args.freeze.split(",")))
+    if frozen - set(evalprofile.WEIGHT_NAMES): parser.error(f"unknown weights: {', '.join(sorted(frozen - set(evalprofile.WEIGHT_NAMES)))}")
+    data = np.load(args.matrix, mmap_mode="r")
+    split = len(data) - int(len(data) * args.holdout)
+    train, test = data[:split], data[split:]
+    started = time.time()
+    initial = np.array(start[1:], dtype=np.float64)
+    k = args.k or fit_k(train, initial)
+    print(f"{len(train)} training / {len(test)} held-out positions, K = {k:.6g}")
+    print(f"  {start.name}: train {loss(train, initial, k):.6f}  held out {loss(test, initial, k):.6f}")
+
+    def progress(epoch, weights):
+        print(f"  epoch {epoch + 1}: train {loss(train, weights, k):.6f}  held out {loss(test, weights, k):.6f}", file=sys.stderr)
+
+    weights, k = fit(train, start, k, args.epochs, args.batch_rows, args.learning_rate, frozen, progress=progress)
+    rounded = np.round(weights)
+    print(f"  tuned: train {loss(train, rounded, k):.6f}  held out {loss(test, rounded, k):.6f}  "
+          f"({time.time() - started:.1f}s)")
+    for name, before, after in zip(evalprofile.WEIGHT_NAMES, initial, rounded):
+        print(f"    {name:<17} {before:>6.0f} -> {after:>6.0f}")
+    if args.save_profile:
+        evalprofile.save_profile(evalprofile.EvalProfile(args.save_profile, *rounded), args.profiles)
+        print(f"saved profile {args.save_profile!r} to {args.profiles}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())